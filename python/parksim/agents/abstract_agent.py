@@ -3,13 +3,11 @@ from typing import Callable, List
 
 import numpy as np
 
-from parksim.utils.rectangle_to_circles import v2c
+from parksim.utils.rectangle_to_circles import circles_collide
 
 from parksim.pytypes import VehicleState
 from parksim.vehicle_types import VehicleBody
 
-from itertools import product
-
 class AbstractAgent(ABC):
     """
     Abstract Agent Class
@@ -45,12 +43,8 @@ class AbstractAgent(ABC):
         this_state, other_state: The states of the two vehicles
         vehicle_body: The vehicle body of the two vehicles. Assuming they are the same
         """
-        circles_self = v2c(this_state, vehicle_body)
-        circles_other = v2c(other_state, vehicle_body)
+        this_pose = [this_state.x.x, this_state.x.y, this_state.e.psi]
+        other_pose = [other_state.x.x, other_state.x.y, other_state.e.psi]
 
-        for circle_a, circle_b in product(circles_self, circles_other):
-            dist = np.linalg.norm([circle_a[0]-circle_b[0], circle_a[1]-circle_b[1]])
-            if dist < circle_a[2] + circle_b[2]:
-                return True
+        return bool(circles_collide(this_pose, other_pose, vehicle_body))
 
-        return False
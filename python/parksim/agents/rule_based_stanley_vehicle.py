@@ -12,28 +12,37 @@ from parksim.path_planner.offline_maneuver import OfflineManeuver
 from parksim.agents.abstract_agent import AbstractAgent
 from parksim.controller.stanley_controller import StanleyController
 
-from parksim.pytypes import VehiclePrediction, VehicleState
-from parksim.route_planner.a_star import AStarGraph, AStarPlanner
+from parksim.pytypes import PlanarState, VehiclePrediction, VehicleState
+from parksim.route_planner.a_star import AStarGraph
 from parksim.route_planner.graph import Vertex, WaypointsGraph
-from parksim.utils.get_corners import get_vehicle_corners
-from parksim.utils.interpolation import interpolate_states_inputs
+from parksim.route_planner.route_table import plan_route
+from parksim.utils.get_corners import get_vehicle_corners, get_vehicle_corners_batch
+from parksim.utils import map_assets
+from parksim.utils.rectangle_to_circles import circles_collide
+from parksim.utils.trajectory_recorder import TrajectoryRecorder
 from parksim.vehicle_types import VehicleBody, VehicleConfig, VehicleInfo, VehicleTask
 
 
 class RuleBasedStanleyVehicle(AbstractAgent):
-    def __init__(self, vehicle_id: int, vehicle_body: VehicleBody, vehicle_config: VehicleConfig, controller: StanleyController = StanleyController(), motion_predictor: StanleyController = StanleyController(), inst_centric_generator = None, intent_predictor = None):
+    def __init__(self, vehicle_id: int, vehicle_body: VehicleBody, vehicle_config: VehicleConfig, controller: StanleyController = StanleyController(), motion_predictor: StanleyController = StanleyController(), inst_centric_generator = None, intent_predictor = None, rng = None):
+        """
+        rng: (Optional) np.random.Generator for the random choices of this vehicle. Defaults to a new unseeded generator
+        """
         self.vehicle_id = vehicle_id
+        self.rng = rng if rng is not None else np.random.default_rng()
 
         # State and Reference Waypoints
         self.state: VehicleState = VehicleState() # state
         self.info: VehicleInfo = VehicleInfo() # Info
+        self._info_ref_arrays = None # reference path arrays last converted into info, see get_info
         self.disp_text: str = str(self.vehicle_id)
         
-        self.state_hist: List[VehicleState] = [] # State history
+        self.state_hist = TrajectoryRecorder(max_length=vehicle_config.state_hist_length) # State history
 
-        self.x_ref = [] # x coordinates for waypoints
-        self.y_ref = [] # y coordinates for waypoints
-        self.yaw_ref = [] # yaws for waypoints
+        self.x_ref = np.zeros(0) # x coordinates for waypoints
+        self.y_ref = np.zeros(0) # y coordinates for waypoints
+        self.yaw_ref = np.zeros(0) # yaws for waypoints
+        self.ref_path_version = 0 # bumped on every set_ref_pose, tells caches that the path changed
         self.v_ref = 0 # target speed
 
         self.task_profile: List[VehicleTask] = []
@@ -80,6 +89,8 @@ class RuleBasedStanleyVehicle(AbstractAgent):
         # unparking stuff
         self.unparking_maneuver = None
         self.unparking_step = -1
+
+        self.maneuver_done = False # the last maneuver state has been set, the next task starts in post_step
         
         # braking stuff
         self.is_braking = False # are we braking?
@@ -107,11 +118,19 @@ class RuleBasedStanleyVehicle(AbstractAgent):
 
         # ============== Method to exchange information
         self.method_to_change_central_occupancy = None
-
-    def set_ref_pose(self, x_ref: List[float], y_ref: List[float], yaw_ref: List[float]):
-        self.x_ref = x_ref
-        self.y_ref = y_ref
-        self.yaw_ref = yaw_ref
+        self.method_to_update_state = None
+        self.method_to_set_state = None
+        self.look_ahead_cache = None
+        self.ref_path_cache = None
+        self.method_to_query_neighbors = None
+        self.fleet_snapshot = None
+
+    def set_ref_pose(self, x_ref: np.ndarray, y_ref: np.ndarray, yaw_ref: np.ndarray):
+        # Stored as contiguous float64 arrays. Arrays that already are one are kept as is, so cached paths are shared
+        self.x_ref = np.ascontiguousarray(x_ref, dtype=np.float64)
+        self.y_ref = np.ascontiguousarray(y_ref, dtype=np.float64)
+        self.yaw_ref = np.ascontiguousarray(yaw_ref, dtype=np.float64)
+        self.ref_path_version += 1
 
         self.controller.set_ref_pose(self.x_ref, self.y_ref, self.yaw_ref)
         self.target_idx = self.controller.calc_target_index(self.state)[0] # waypoint the vehicle is targeting
@@ -135,19 +154,18 @@ class RuleBasedStanleyVehicle(AbstractAgent):
             if heading is not None:
                 self.state.e.psi = heading
             else:
-                self.state.e.psi = np.pi / 2 if np.random.rand() < 0.5 else -np.pi / 2
+                self.state.e.psi = np.pi / 2 if self.rng.random() < 0.5 else -np.pi / 2
 
     def set_task_profile(self, task_profile):
         self.task_profile = task_profile
 
     def load_parking_spaces(self, spots_data_path: str):
         home_path = str(Path.home())
-        with open(home_path + spots_data_path, 'rb') as f:
-            data = pickle.load(f)
-            self.parking_spaces = data['parking_spaces']
-            self.overshoot_ranges = data['overshoot_ranges']
-            self.north_spot_idx_ranges = data['north_spot_idx_ranges']
-            self.spot_y_offset = data['spot_y_offset']
+        data = map_assets.get_spots_data(home_path + spots_data_path)
+        self.parking_spaces = data['parking_spaces']
+        self.overshoot_ranges = data['overshoot_ranges']
+        self.north_spot_idx_ranges = data['north_spot_idx_ranges']
+        self.spot_y_offset = data['spot_y_offset']
 
     def load_graph(self, waypoints_graph_path: str):
         """
@@ -155,17 +173,14 @@ class RuleBasedStanleyVehicle(AbstractAgent):
         entrance_coords: The (x,y) coordinates of the entrance
         """
         home_path = str(Path.home())
-        with open(home_path + waypoints_graph_path, 'rb') as f:
-            data = pickle.load(f)
-            self.graph = data['graph']
-            entrance_coords = data['entrance_coords']
-
-        # Default entrance vertex
-        self.entrance_vertex = self.graph.search(entrance_coords)
+        # Default entrance vertex is computed once per graph file
+        self.graph, _, self.entrance_vertex = map_assets.get_waypoints_graph(home_path + waypoints_graph_path)
 
     def load_maneuver(self, offline_maneuver_path: str):
         home_path = str(Path.home())
-        self.offline_maneuver = OfflineManeuver(pickle_file=home_path+offline_maneuver_path)
+        self.offline_maneuver = map_assets.get_offline_maneuver(home_path + offline_maneuver_path)
+        # Shared by all vehicles of the process, so this only resamples on the first load
+        self.offline_maneuver.resample_all(self.controller.dt)
 
     def load_intent_model(self, model_path: str):
         """
@@ -242,34 +257,78 @@ class RuleBasedStanleyVehicle(AbstractAgent):
 
         if task.target_spot_index is not None:
             # Going to a spot
-            
-            is_north_spot = any([abs(task.target_spot_index) >= r[0] and abs(
-                task.target_spot_index) <= r[1] for r in self.north_spot_idx_ranges])
-            y_offset = -self.spot_y_offset if is_north_spot else self.spot_y_offset
-            waypoint_coords = [self.parking_spaces[abs(
-                task.target_spot_index)][0], self.parking_spaces[abs(task.target_spot_index)][1] + y_offset]
-
-            graph_sol = AStarPlanner(
-                self.graph.vertices[start_vertex_idx], self.graph.vertices[self.graph.search(waypoint_coords)]).solve()
-
-            x_ref, y_ref, yaw_ref = self.compute_ref_path(
-                graph_sol=graph_sol, spot_index=task.target_spot_index)
+            x_ref, y_ref, yaw_ref = self.plan_ref_path_to_spot(start_vertex_idx, task.target_spot_index)
 
         elif task.target_coords is not None:
             # Travel to a coordinates
-            graph_sol = AStarPlanner(
-                self.graph.vertices[start_vertex_idx], self.graph.vertices[self.graph.search(task.target_coords)]).solve()
+            goal_vertex_idx = self.graph.search(task.target_coords)
 
-            if len(graph_sol.edges) == 0: # just go to a waypoint
+            if goal_vertex_idx == start_vertex_idx: # just go to a waypoint
                 x_ref = [self.state.x.x, task.target_coords[0]]
                 y_ref = [self.state.x.y, task.target_coords[1]]
                 yaw_ref = [self.state.e.psi, self.state.e.psi]
             else: # compute a-star path
-                x_ref, y_ref, yaw_ref = self.compute_ref_path(graph_sol=graph_sol, spot_index=None)
+                x_ref, y_ref, yaw_ref = self.plan_ref_path_to_vertex(start_vertex_idx, goal_vertex_idx)
 
         self.set_ref_pose(x_ref, y_ref, yaw_ref)
         self.set_ref_v(0)
 
+    def plan_ref_path_to_spot(self, start_vertex_idx: int, spot_index: int):
+        """
+        reference path from a graph vertex to a parking spot. Sets should_overshoot. Taken from the ref path cache if there is one
+        """
+        key = ('spot', start_vertex_idx, spot_index, self.vehicle_config.offset)
+        if self.ref_path_cache is not None:
+            entry = self.ref_path_cache.get(self.graph, key)
+            if entry is not None:
+                self.should_overshoot = entry[3]
+                return entry[:3]
+
+        is_north_spot = any([abs(spot_index) >= r[0] and abs(
+            spot_index) <= r[1] for r in self.north_spot_idx_ranges])
+        y_offset = -self.spot_y_offset if is_north_spot else self.spot_y_offset
+        waypoint_coords = [self.parking_spaces[abs(
+            spot_index)][0], self.parking_spaces[abs(spot_index)][1] + y_offset]
+
+        graph_sol = plan_route(self.graph, start_vertex_idx, self.graph.search(waypoint_coords))
+
+        x_ref, y_ref, yaw_ref = self.compute_ref_path(
+            graph_sol=graph_sol, spot_index=spot_index)
+
+        if self.ref_path_cache is not None:
+            return self.ref_path_cache.put(self.graph, key, x_ref, y_ref, yaw_ref, self.should_overshoot)[:3]
+
+        return x_ref, y_ref, yaw_ref
+
+    def plan_ref_path_to_vertex(self, start_vertex_idx: int, goal_vertex_idx: int):
+        """
+        reference path between two different graph vertices. Taken from the ref path cache if there is one
+        """
+        key = ('vertex', start_vertex_idx, goal_vertex_idx, self.vehicle_config.offset)
+        if self.ref_path_cache is not None:
+            entry = self.ref_path_cache.get(self.graph, key)
+            if entry is not None:
+                return entry[:3]
+
+        graph_sol = plan_route(self.graph, start_vertex_idx, goal_vertex_idx)
+        x_ref, y_ref, yaw_ref = self.compute_ref_path(graph_sol=graph_sol, spot_index=None)
+
+        if self.ref_path_cache is not None:
+            return self.ref_path_cache.put(self.graph, key, x_ref, y_ref, yaw_ref)[:3]
+
+        return x_ref, y_ref, yaw_ref
+
+    def prewarm_ref_path_cache(self, start_vertex_idx: int, spot_indices: List[int]):
+        """
+        plan the reference paths from start_vertex_idx to all given spots into the ref path cache
+        """
+        assert self.ref_path_cache is not None, "Please run set_ref_path_cache first."
+
+        should_overshoot = self.should_overshoot
+        for spot_index in spot_indices:
+            self.plan_ref_path_to_spot(start_vertex_idx, spot_index)
+        self.should_overshoot = should_overshoot
+
     def execute_next_task(self):
         if len(self.task_profile) > 0:
             task = self.task_profile.pop(0)
@@ -317,6 +376,43 @@ class RuleBasedStanleyVehicle(AbstractAgent):
     def set_method_to_change_central_occupancy(self, method):
         self.method_to_change_central_occupancy = method
 
+    def set_method_to_update_state(self, method):
+        """
+        method(vehicle): if set, update_state hands the vehicle to this method instead of running the controller here. The simulator uses it to control and advance all cruising vehicles at once.
+
+        Whoever sets it applies the update after solve and must then call post_step.
+        """
+        self.method_to_update_state = method
+
+    def set_method_to_set_state(self, method):
+        """
+        method(vehicle, x, y, psi, v, u_a, u_steer): if set, the parking and unparking maneuvers hand their next state to this method instead of writing it here, so it can be applied together with the other vehicles.
+
+        Whoever sets it applies the state after solve and must then call post_step.
+        """
+        self.method_to_set_state = method
+
+    def defers_state_update(self):
+        return callable(self.method_to_update_state) or callable(self.method_to_set_state)
+
+    def set_look_ahead_cache(self, look_ahead_cache):
+        """
+        look_ahead_cache: LookAheadCache shared by all vehicles. If set, will_crash_with takes the look-ahead trajectories from it instead of rolling out every nearby vehicle itself
+        """
+        self.look_ahead_cache = look_ahead_cache
+
+    def set_ref_path_cache(self, ref_path_cache):
+        """
+        ref_path_cache: RefPathCache shared by all vehicles on the same graph. If set, cruise_planning reuses reference paths planned before instead of solving A* and fitting a spline again
+        """
+        self.ref_path_cache = ref_path_cache
+
+    def set_method_to_query_neighbors(self, method):
+        """
+        method(x, y, radius): if set, update_nearby_vehicles only checks the vehicle ids returned by this method instead of all other vehicles. It must return every vehicle that may be within radius of (x, y)
+        """
+        self.method_to_query_neighbors = method
+
     def get_central_occupancy(self, occupancy):
         """
         Get the parking occupancy
@@ -335,9 +431,13 @@ class RuleBasedStanleyVehicle(AbstractAgent):
             method[idx] = new_value
 
     def get_info(self):
-        self.info.ref_pose.x = array.array('d', self.x_ref)
-        self.info.ref_pose.y = array.array('d', self.y_ref)
-        self.info.ref_pose.psi = array.array('d', self.yaw_ref)
+        ref_arrays = (self.x_ref, self.y_ref, self.yaw_ref)
+        if self._info_ref_arrays is None or any(a is not b for a, b in zip(ref_arrays, self._info_ref_arrays)):
+            # The reference path only changes on replanning, so it is converted for publishing once per path
+            self.info.ref_pose.x = array.array('d', self.x_ref.tobytes())
+            self.info.ref_pose.y = array.array('d', self.y_ref.tobytes())
+            self.info.ref_pose.psi = array.array('d', self.yaw_ref.tobytes())
+            self._info_ref_arrays = ref_arrays
         self.info.ref_v = self.v_ref
         self.info.target_idx = self.target_idx
         self.info.priority = self.priority
@@ -359,10 +459,32 @@ class RuleBasedStanleyVehicle(AbstractAgent):
 
         return self.info
 
+    def attach_fleet_snapshot(self, fleet_snapshot):
+        """
+        Read other vehicles through a shared FleetSnapshot. The other_* dicts are replaced by mappings on the snapshot columns, and get_other_info only needs to update the set of other vehicles
+        """
+        self.fleet_snapshot = fleet_snapshot
+
+        self.other_state = fleet_snapshot.views['state']
+        self.other_ref_pose = fleet_snapshot.views['ref_pose']
+        self.other_ref_v = fleet_snapshot.views['ref_v']
+        self.other_target_idx = fleet_snapshot.views['target_idx']
+        self.other_priority = fleet_snapshot.views['priority']
+        self.other_task = fleet_snapshot.views['task']
+        self.other_parking_progress = fleet_snapshot.views['parking_progress']
+        self.other_parking_start_time = fleet_snapshot.views['parking_start_time']
+        self.other_is_braking = fleet_snapshot.views['is_braking']
+        self.other_waiting_for = fleet_snapshot.views['waiting_for']
+        self.other_is_all_done = fleet_snapshot.views['is_all_done']
+
     def get_other_info(self, active_vehicles: Dict[int, AbstractAgent]):
         """
         The equavilence of ROS subscribers
         """
+        if self.fleet_snapshot is not None:
+            self.other_vehicles = self.fleet_snapshot.active_ids - {self.vehicle_id}
+            return
+
         active_ids = set([id for id in active_vehicles if id != self.vehicle_id])
         
         self.other_vehicles.update(active_ids)
@@ -407,9 +529,29 @@ class RuleBasedStanleyVehicle(AbstractAgent):
     def will_crash_with(self) -> Set[int]:
         will_crash_with = set()
 
+        if not self.nearby_vehicles:
+            return will_crash_with
+
+        # The cached trajectories can be used if they were rolled out like this vehicle's motion_predictor would
+        if (self.look_ahead_cache is not None and self.look_ahead_cache.look_ahead_timesteps == self.vehicle_config.look_ahead_timesteps
+            and self.look_ahead_cache.predicts_like(self.motion_predictor, [self.vehicle_id] + list(self.nearby_vehicles))):
+
+            nearby_vehicles = list(self.nearby_vehicles)
+            this_trajectory = self.look_ahead_cache.get(self.vehicle_id)
+            # (T, K, 3), one column per nearby vehicle
+            other_trajectories = np.stack([self.look_ahead_cache.get(id) for id in nearby_vehicles], axis=1)
+
+            # NOTE: Here we assume all other vehicles have the same vehicle body as us
+            collide = circles_collide(this_trajectory[:, None, :], other_trajectories, self.vehicle_body)
+            for id, will_crash in zip(nearby_vehicles, np.any(collide, axis=0)):
+                if will_crash:
+                    will_crash_with.add(id)
+
+            return will_crash_with
+
         # create states for looking ahead
-        look_ahead_state = self.state.copy()
-        other_look_ahead_states = [self.other_state[id].copy() for id in self.nearby_vehicles]
+        look_ahead_state = PlanarState.from_state(self.state)
+        other_look_ahead_states = [PlanarState.from_state(self.other_state[id]) for id in self.nearby_vehicles]
 
         # for each time step, looking ahead
         for _ in range(self.vehicle_config.look_ahead_timesteps):
@@ -454,26 +596,24 @@ class RuleBasedStanleyVehicle(AbstractAgent):
         parking_dist_away: additional check, if this_id's x-coordinate is parking_dist_away past other_id's x-coordinate 
         """
         if this_id is None or this_id == self.vehicle_id:
-            this_corners = self.get_corners()
             this_state = self.state
-            this_psi = this_state.e.psi
         else:
-            this_corners = self.get_corners(self.other_state[this_id])
             this_state = self.other_state[this_id]
-            this_psi = this_state.e.psi
+        this_psi = this_state.e.psi
         
         if other_id is None or other_id == self.vehicle_id:
-            other_corners = self.get_corners()
             other_state = self.state
         else:
-            other_corners = self.get_corners(self.other_state[other_id]) # NOTE: For now, assume the other vehicle has the same vehicle body
             other_state = self.other_state[other_id]
 
-        for this_corner in [this_corners[0], this_corners[1]]:
-            for other_corner in [other_corners[2], other_corners[3]]:
-                ang = ((np.arctan2(other_corner[1] - this_corner[1], other_corner[0] - this_corner[0]) - this_psi) + (2*np.pi)) % (2*np.pi)
-                if ang < (np.pi/2) or ang > (3*np.pi)/2:
-                    return False
+        # NOTE: For now, assume the other vehicle has the same vehicle body
+        this_corners, other_corners = get_vehicle_corners_batch([this_state.x.x, other_state.x.x], [this_state.x.y, other_state.x.y], [this_psi, other_state.e.psi], self.vehicle_body)
+
+        # Rear corners of the other vehicle relative to the front corners of this one, (2, 2, 2)
+        diff = other_corners[None, 2:4, :] - this_corners[0:2, None, :]
+        ang = ((np.arctan2(diff[..., 1], diff[..., 0]) - this_psi) + (2*np.pi)) % (2*np.pi)
+        if np.any((ang < (np.pi/2)) | (ang > (3*np.pi)/2)):
+            return False
         if parking_dist_away is not None:
             if this_psi > np.pi / 2 and this_psi < np.pi * 3 / 2: # facing west
                 if this_state.x.x - other_state.x.x > -parking_dist_away:
@@ -492,6 +632,11 @@ class RuleBasedStanleyVehicle(AbstractAgent):
             return dist < self.vehicle_config.parking_radius
 
     def update_state(self):
+        if callable(self.method_to_update_state):
+            # control and state update are done together with the other vehicles
+            self.method_to_update_state(self)
+            return
+
         self.controller.set_ref_pose(self.x_ref, self.y_ref, self.yaw_ref)
         self.controller.set_ref_v(self.v_ref)
         self.controller.set_target_idx(self.target_idx)
@@ -508,34 +653,22 @@ class RuleBasedStanleyVehicle(AbstractAgent):
                 location = 'right' if (direction == 'east') else 'left' # we are designed to overshoot the spot
             else:
                 location = 'left' if (direction == 'east') else 'right' # we are designed to undershoot the spot
-            pointing = 'up' if np.random.rand() < 0.5 else 'down' # random for diversity
+            pointing = 'up' if self.rng.random() < 0.5 else 'down' # random for diversity
             spot = 'north' if any([self.spot_index >= r[0] and self.spot_index <= r[1] for r in self.north_spot_idx_ranges]) else 'south'
             
-            # get parking maneuver
-            offline_maneuver = self.offline_maneuver.get_maneuver([self.park_start_coords[0] - 4 if location == 'right' else self.park_start_coords[0] + 4, self.park_start_coords[1]], direction, location, spot, pointing)
-
-            time_seq = np.arange(start=offline_maneuver.t[0], stop=offline_maneuver.t[-1], step=self.controller.dt)
-            
-            self.parking_maneuver = interpolate_states_inputs(offline_maneuver, time_seq)
+            # get parking maneuver, already resampled at the controller time step
+            self.parking_maneuver = self.offline_maneuver.get_resampled_maneuver([self.park_start_coords[0] - 4 if location == 'right' else self.park_start_coords[0] + 4, self.park_start_coords[1]], direction, location, spot, pointing, self.controller.dt)
 
             self.parking_start_time = time.time()
             
             
         step = self.parking_step
         # set state
-        self.state.x.x = self.parking_maneuver.x[step]
-        self.state.x.y = self.parking_maneuver.y[step]
-        self.state.e.psi = self.parking_maneuver.psi[step]
-        self.state.v.v = self.parking_maneuver.v[step]
-
-        self.state.u.u_a = self.parking_maneuver.u_a[step]
-        self.state.u.u_steer = self.parking_maneuver.u_steer[step]
+        self.set_maneuver_state(self.parking_maneuver, step)
         
         if self.parking_step >= len(self.parking_maneuver.x) - 1:
-            # done parking
-            self.reset_parking_related()
-
-            self.execute_next_task()
+            # done parking, the next task starts in post_step
+            self.maneuver_done = True
         else:
             # update parking step if advancing
             self.parking_step += 1 if advance else 0
@@ -544,16 +677,12 @@ class RuleBasedStanleyVehicle(AbstractAgent):
         if self.unparking_maneuver is None: # start unparking
             # get unparking parameters
             direction = 'west' if self.x_ref[0] > self.x_ref[1] else 'east' # if first direction of travel is left, face west
-            location = 'right' if np.random.rand() < 0.5 else 'left' # random for diversity
+            location = 'right' if self.rng.random() < 0.5 else 'left' # random for diversity
             pointing = 'up' if self.state.e.psi > 0 else 'down' # determine from state
             spot = 'north' if any([abs(self.spot_index) >= r[0] and abs(self.spot_index) <= r[1] for r in self.north_spot_idx_ranges]) else 'south'
             
-            # get parking maneuver
-            offline_maneuver = self.offline_maneuver.get_maneuver([self.state.x.x if location == 'right' else self.state.x.x, self.state.x.y - 6.25 if spot == 'north' else self.state.x.y + 6.25], direction, location, spot, pointing)
-
-            time_seq = np.arange(start=offline_maneuver.t[0], stop=offline_maneuver.t[-1], step=self.controller.dt)
-            
-            self.unparking_maneuver = interpolate_states_inputs(offline_maneuver, time_seq)
+            # get parking maneuver, already resampled at the controller time step
+            self.unparking_maneuver = self.offline_maneuver.get_resampled_maneuver([self.state.x.x if location == 'right' else self.state.x.x, self.state.x.y - 6.25 if spot == 'north' else self.state.x.y + 6.25], direction, location, spot, pointing, self.controller.dt)
             
             # set initial unparking state
             self.unparking_step = len(self.unparking_maneuver.x) - 1
@@ -564,23 +693,40 @@ class RuleBasedStanleyVehicle(AbstractAgent):
         step = self.unparking_step
             
         # set state
-        self.state.x.x = self.unparking_maneuver.x[step]
-        self.state.x.y = self.unparking_maneuver.y[step]
-        self.state.e.psi = self.unparking_maneuver.psi[step]
-        self.state.v.v = self.unparking_maneuver.v[step]
-
-        self.state.u.u_a = self.unparking_maneuver.u_a[step]
-        self.state.u.u_steer = self.unparking_maneuver.u_steer[step]
+        self.set_maneuver_state(self.unparking_maneuver, step)
         
-        if self.unparking_step == 0: # done unparking
-            self.change_central_occupancy(self.spot_index, False)
-            
-            self.reset_parking_related()
-            self.execute_next_task()
+        if self.unparking_step == 0: # done unparking, the next task starts in post_step
+            self.maneuver_done = True
         else:
             # update parking step if advancing
             self.unparking_step -= 1 if advance else 0
 
+    def set_maneuver_state(self, maneuver: VehiclePrediction, step: int):
+        """
+        set the state to one step of a parking or unparking maneuver
+        """
+        if callable(self.method_to_set_state):
+            self.method_to_set_state(self, maneuver.x[step], maneuver.y[step], maneuver.psi[step], maneuver.v[step], maneuver.u_a[step], maneuver.u_steer[step])
+            return
+
+        self.state.x.x = maneuver.x[step]
+        self.state.x.y = maneuver.y[step]
+        self.state.e.psi = maneuver.psi[step]
+        self.state.v.v = maneuver.v[step]
+
+        self.state.u.u_a = maneuver.u_a[step]
+        self.state.u.u_steer = maneuver.u_steer[step]
+
+    def finish_maneuver(self):
+        """
+        called once the last state of a parking or unparking maneuver has been applied
+        """
+        if self.current_task == "UNPARK":
+            self.change_central_occupancy(self.spot_index, False)
+
+        self.reset_parking_related()
+        self.execute_next_task()
+
     def reset_parking_related(self):
         # inf means haven't start parking or unparking. Anything above 0 is parking
         self.parking_start_time = float('inf')
@@ -593,6 +739,7 @@ class RuleBasedStanleyVehicle(AbstractAgent):
         self.unparking_step = -1
 
         self.park_start_coords = None
+        self.maneuver_done = False
 
     def get_corners(self, state: VehicleState=None, vehicle_body: VehicleBody=None):
         """
@@ -649,7 +796,12 @@ class RuleBasedStanleyVehicle(AbstractAgent):
 
         self.nearby_vehicles.clear()
 
-        for id in self.other_vehicles:
+        if callable(self.method_to_query_neighbors):
+            candidates = [id for id in self.method_to_query_neighbors(self.state.x.x, self.state.x.y, radius) if id != self.vehicle_id and id in self.other_vehicles]
+        else:
+            candidates = self.other_vehicles
+
+        for id in candidates:
             if self.other_is_all_done[id]:
                 continue
             
@@ -804,7 +956,17 @@ class RuleBasedStanleyVehicle(AbstractAgent):
         else: 
             self.update_state()
 
-        self.state_hist.append(self.state.copy())
+        if not self.defers_state_update():
+            self.post_step(time)
+
+    def post_step(self, time=None):
+        """
+        Finish the tick once the state update of solve has been applied: start the next task if a maneuver has ended, and record the new state
+        """
+        if self.maneuver_done:
+            self.finish_maneuver()
+
+        self.state_hist.record(time, self.state, self.current_task, self.is_braking)
         self.logger.append(f't = {time}: x = {self.state.x.x:.2f}, y = {self.state.x.y:.2f}')
 
     def predict_intent(self, vehicle_id, history):
@@ -823,5 +985,5 @@ class RuleBasedStanleyVehicle(AbstractAgent):
         return state_dict
 
     def get_other_vehicles(self):
-        other_states = {i : self.other_state[i] for i in self.other_state}
+        other_states = {i : self.other_state[i] for i in self.other_state if i != self.vehicle_id}
         return other_states
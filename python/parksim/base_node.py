@@ -199,6 +199,12 @@ class MPClabNode(Node):
                     target_type = type(msg.__getattribute__(key))
                     if type(new_data) == target_type:
                         msg.__setattr__(key, new_data)
+                    elif isinstance(new_data, np.ndarray) and target_type == array.array:
+                        # copy the buffer at once instead of converting element by element
+                        typecode = msg.__getattribute__(key).typecode
+                        converted_data = array.array(typecode)
+                        converted_data.frombytes(np.ascontiguousarray(new_data, dtype=typecode).tobytes())
+                        msg.__setattr__(key, converted_data)
                     else:
                         converter_str = '__' + target_type.__name__ + '__'
                         # already in try-except so just try getting the converter
@@ -0,0 +1,209 @@
+"""
+
+Stanley controller for many vehicles at once.
+
+Same control law as StanleyController, but every quantity is an array with one entry per vehicle. Reference paths of different lengths are padded into (N, L) arrays so that target indices, cross-track errors, steering and acceleration are computed for all vehicles in a single NumPy pass.
+
+"""
+from typing import List
+import numpy as np
+
+from parksim.controller_types import StanleyParams
+from parksim.controller.stanley_controller import normalize_angles
+from parksim.vehicle_types import VehicleBody, VehicleConfig
+
+class BatchStanleyController(object):
+    """
+    Batched Stanley Controller
+    """
+    def __init__(self, control_params: StanleyParams=StanleyParams(), vehicle_body: VehicleBody=VehicleBody(), vehicle_config: VehicleConfig=VehicleConfig()):
+        """Instantiate the object."""
+        super().__init__()
+
+        self.k = control_params.k
+        self.Kp = control_params.Kp
+        self.Kp_braking = control_params.Kp_braking
+        self.dt = control_params.dt
+        self.search_window = control_params.search_window
+        self.search_behind = control_params.search_behind
+
+        self.L = vehicle_body.wb
+
+        self.max_steer = vehicle_config.delta_max
+
+        # Padded reference paths, (N, L). Unused entries of x_ref, y_ref are inf so they are never the nearest point
+        self.x_ref = np.zeros((0, 0))
+        self.y_ref = np.zeros((0, 0))
+        self.yaw_ref = np.zeros((0, 0))
+        self.ref_len = np.zeros(0, dtype=int)
+        self.v_ref = np.zeros(0)
+
+        self.target_idx = np.zeros(0, dtype=int)
+
+        # The paths the padded arrays were built from, and their array versions by id()
+        self._ref_paths = []
+        self._path_arrays = {}
+
+    def _as_array(self, path, cache):
+        """
+        Convert a reference path to a float array, reusing the conversion from the last call if the same path object is given again
+        """
+        key = id(path)
+        if key in self._path_arrays and self._path_arrays[key][0] is path:
+            cache[key] = self._path_arrays[key]
+        else:
+            # Keep a reference to the path so its id() cannot be reused while cached
+            cache[key] = (path, np.asarray(path, dtype=float))
+
+        return cache[key][1]
+
+    def set_ref_pose(self, x_refs: List[List[float]], y_refs: List[List[float]], yaw_refs: List[List[float]]):
+        """
+        x_refs, y_refs, yaw_refs: one reference path per vehicle. Paths can have different lengths
+        """
+        paths = list(zip(x_refs, y_refs, yaw_refs))
+
+        # Target indices of the last vehicles do not apply to the new ones, set_target_idx gives the right ones
+        self.target_idx = np.zeros(0, dtype=int)
+
+        if len(paths) == len(self._ref_paths) and all(
+            p[0] is q[0] and p[1] is q[1] and p[2] is q[2] for p, q in zip(paths, self._ref_paths)):
+            # Same paths as last time, padded arrays are still valid
+            return
+
+        cache = {}
+        arrays = [[self._as_array(path, cache) for path in p] for p in paths]
+        self._path_arrays = cache
+
+        num = len(paths)
+        self.ref_len = np.array([len(a[0]) for a in arrays], dtype=int)
+        max_len = self.ref_len.max() if num > 0 else 0
+
+        self.x_ref = np.full((num, max_len), np.inf)
+        self.y_ref = np.full((num, max_len), np.inf)
+        self.yaw_ref = np.zeros((num, max_len))
+
+        for i, (x_ref, y_ref, yaw_ref) in enumerate(arrays):
+            self.x_ref[i, :len(x_ref)] = x_ref
+            self.y_ref[i, :len(y_ref)] = y_ref
+            self.yaw_ref[i, :len(yaw_ref)] = yaw_ref
+
+        self._ref_paths = paths
+
+    def set_ref_v(self, v_ref: np.ndarray):
+        self.v_ref = np.asarray(v_ref, dtype=float)
+
+    def set_target_idx(self, target_idx: np.ndarray):
+        self.target_idx = np.asarray(target_idx, dtype=int)
+
+    def _search_nearest(self, fx: np.ndarray, fy: np.ndarray, rows: np.ndarray, start: np.ndarray, width: int, end: np.ndarray):
+        """
+        For each vehicle in rows, search the waypoint closest to (fx, fy) among indices [start, min(start + width, end))
+
+        :return: (np.ndarray of int, np.ndarray, np.ndarray) index relative to start, dx and dy to that waypoint
+        """
+        cols = start[:, None] + np.arange(width)[None, :]
+        valid = cols < end[:, None]
+        # Keep the gather in bounds. Invalid entries are masked out below
+        cols = np.minimum(cols, self.x_ref.shape[1] - 1)
+
+        dx = fx[:, None] - self.x_ref[rows[:, None], cols]
+        dy = fy[:, None] - self.y_ref[rows[:, None], cols]
+        d = np.where(valid, np.hypot(dx, dy), np.inf)
+        idx = np.argmin(d, axis=1)
+
+        k = np.arange(len(rows))
+        return idx, dx[k, idx], dy[k, idx]
+
+    def calc_target_index(self, x: np.ndarray, y: np.ndarray, psi: np.ndarray):
+        """
+        Compute index in the trajectory list of the target for every vehicle.
+
+        Same windowed search as StanleyController.calc_target_index: only the waypoints from search_behind before to search_window after the last target index are searched, and vehicles whose closest point is on either end of the window or is the last waypoint fall back to searching their whole path.
+
+        :param x, y, psi: (np.ndarray) rear axle pose of each vehicle
+        :return: (np.ndarray of int, np.ndarray of float)
+        """
+        num = len(x)
+        if num == 0:
+            return np.zeros(0, dtype=int), np.zeros(0)
+
+        # Calc front axle position, given state and L (distance b/w front and rear wheels)
+        fx = x + self.L * np.cos(psi)
+        fy = y + self.L * np.sin(psi)
+
+        # Search nearest point index
+        rows = np.arange(num)
+        if len(self.target_idx) == num:
+            last_idx = np.clip(self.target_idx, 0, self.ref_len - 1)
+        else:
+            last_idx = np.zeros(num, dtype=int)
+        start = np.maximum(last_idx - self.search_behind, 0)
+        end = np.minimum(last_idx + self.search_window, self.ref_len)
+
+        # Windows near the start of a path are shorter, their extra columns lie past end and are masked out
+        idx, dx, dy = self._search_nearest(fx, fy, rows, start, self.search_behind + self.search_window, end)
+        target_idx = start + idx
+
+        in_window = ((start == 0) & (end == self.ref_len)) | (((idx > 0) | (start == 0)) & (idx < end - start - 1))
+        full = np.flatnonzero(~in_window)
+        if full.size > 0:
+            idx, dx[full], dy[full] = self._search_nearest(fx[full], fy[full], full, np.zeros(full.size, dtype=int), self.x_ref.shape[1], self.ref_len[full])
+            target_idx[full] = idx
+
+        # Project RMS error onto front axle vector
+        front_axle_vec_x = -np.cos(psi + np.pi / 2)
+        front_axle_vec_y = -np.sin(psi + np.pi / 2)
+        # this is cross-track error
+        error_front_axle = dx * front_axle_vec_x + dy * front_axle_vec_y
+
+        return target_idx, error_front_axle
+
+    def pid_control(self, target: np.ndarray, current: np.ndarray, braking: np.ndarray):
+        """
+        Proportional control for the speed, with the braking gain where braking is True
+        """
+        return np.where(braking, self.Kp_braking * (target - current), self.Kp * (target - current))
+
+    def stanley_control(self, x: np.ndarray, y: np.ndarray, psi: np.ndarray, v: np.ndarray):
+        """
+        Stanley steering control.
+
+        :return: (np.ndarray of float, np.ndarray of int)
+        """
+        current_target_idx, error_front_axle = self.calc_target_index(x, y, psi)
+
+        # if we're moving forward, cool, otherwise keep going to where we were going before
+        current_target_idx = np.maximum(self.target_idx, current_target_idx)
+
+        # theta_e corrects the heading error
+        rows = np.arange(len(current_target_idx))
+        theta_e = normalize_angles(self.yaw_ref[rows, current_target_idx] - psi)
+        # theta_d corrects based on the cross track error
+        theta_d = np.arctan2(self.k * error_front_axle, v)
+
+        delta = theta_e + theta_d
+
+        return delta, current_target_idx
+
+    def solve(self, x: np.ndarray, y: np.ndarray, psi: np.ndarray, v: np.ndarray, braking: np.ndarray):
+        a = self.pid_control(self.v_ref, v, braking)
+        d, current_target_idx = self.stanley_control(x, y, psi, v)
+
+        return a, d, current_target_idx
+
+    def step(self, x: np.ndarray, y: np.ndarray, psi: np.ndarray, v: np.ndarray, acceleration: np.ndarray, delta: np.ndarray):
+        """
+        Advance all vehicles with the bicycle model.
+
+        :return: (x, y, psi, v) new arrays
+        """
+        # don't turn too much
+        delta = np.clip(delta, -self.max_steer, self.max_steer)
+
+        new_x = x + v * np.cos(psi) * self.dt
+        new_y = y + v * np.sin(psi) * self.dt
+        new_psi = normalize_angles(psi + v / self.L * np.tan(delta) * self.dt)
+        new_v = v + acceleration * self.dt
+
+        return new_x, new_y, new_psi, new_v
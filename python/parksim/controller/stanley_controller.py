@@ -31,6 +31,19 @@ def normalize_angle(angle):
 
     return angle
 
+def normalize_angles(angles: np.ndarray):
+    """
+    Vectorized version of normalize_angle.
+
+    :param angles: (np.ndarray)
+    :return: (np.ndarray) Angles in radian in [-pi, pi]. Entries already in range are returned unchanged
+    """
+    angles = np.array(angles, dtype=float)
+    outside = np.abs(angles) > np.pi
+    angles[outside] = (angles[outside] + np.pi) % (2.0 * np.pi) - np.pi
+
+    return angles
+
 class StanleyController(object):
     """
     Stanley Controller
@@ -43,6 +56,8 @@ class StanleyController(object):
         self.Kp = control_params.Kp
         self.Kp_braking = control_params.Kp_braking
         self.dt = control_params.dt
+        self.search_window = control_params.search_window
+        self.search_behind = control_params.search_behind
 
         self.L = vehicle_body.wb
 
@@ -56,6 +71,9 @@ class StanleyController(object):
         self.target_idx = None
 
     def set_ref_pose(self, x_ref: List[float], y_ref: List[float], yaw_ref: List[float]):
+        # The last target index may belong to another vehicle on the same path, set_target_idx restores the right one
+        self.target_idx = None
+
         self.x_ref = x_ref
         self.y_ref = y_ref
         self.yaw_ref = yaw_ref
@@ -66,31 +84,53 @@ class StanleyController(object):
     def set_target_idx(self, target_idx: int):
         self.target_idx = target_idx
 
+    def _search_nearest(self, fx: float, fy: float, start: int, end: int):
+        """
+        Search the waypoint closest to (fx, fy) among indices [start, end)
+
+        :return: (int, float, float) index relative to start, dx and dy to that waypoint
+        """
+        dx = fx - np.asarray(self.x_ref[start:end], dtype=float)
+        dy = fy - np.asarray(self.y_ref[start:end], dtype=float)
+        d = np.hypot(dx, dy)
+        idx = np.argmin(d)
+
+        return idx, dx[idx], dy[idx]
+
     def calc_target_index(self, state: VehicleState):
         """
         Compute index in the trajectory list of the target.
 
+        Only the waypoints from search_behind before to search_window after the last target index are searched. The window reaches behind the last target index, so a stopped or slow vehicle, whose closest point usually is the last target index itself, stays inside it. If the closest point in the window is on either end of the window, or is the last waypoint of the path, the vehicle may be outside of the window (or past the end of the path) and the whole path is searched instead, unless the window already is the whole path.
+
+        Unlike a search of the whole path, this keeps tracking the current part of the path where the path later comes back within reach of the vehicle, instead of jumping ahead to the later part.
+
         :param state: (VehicleState object)
-        :param cx: [float]
-        :param cy: [float]
         :return: (int, float)
         """
         # Calc front axle position, given state and L (distance b/w front and rear wheels)
         fx = state.x.x + self.L * np.cos(state.e.psi)
         fy = state.x.y + self.L * np.sin(state.e.psi)
 
+        num_waypoints = len(self.x_ref)
+
         # Search nearest point index
         # returns index of point that is closest to front axle
-        dx = [fx - icx for icx in self.x_ref]
-        dy = [fy - icy for icy in self.y_ref]
-        d = np.hypot(dx, dy)
-        target_idx = np.argmin(d)
+        last_idx = 0 if self.target_idx is None else min(max(self.target_idx, 0), num_waypoints - 1)
+        start = max(last_idx - self.search_behind, 0)
+        end = min(last_idx + self.search_window, num_waypoints)
+
+        idx, dx, dy = self._search_nearest(fx, fy, start, end)
+        if (start == 0 and end == num_waypoints) or ((idx > 0 or start == 0) and idx < end - start - 1):
+            target_idx = start + idx
+        else:
+            target_idx, dx, dy = self._search_nearest(fx, fy, 0, num_waypoints)
 
         # Project RMS error onto front axle vector
         front_axle_vec = [-np.cos(state.e.psi + np.pi / 2),
                         -np.sin(state.e.psi + np.pi / 2)] # this is equivalent to [sin(yaw), -cos(yaw)]
         # this is cross-track error
-        error_front_axle = np.dot([dx[target_idx], dy[target_idx]], front_axle_vec)
+        error_front_axle = np.dot([dx, dy], front_axle_vec)
 
         return target_idx, error_front_axle
 
@@ -11,4 +11,6 @@ class StanleyParams(PythonMsg):
     k: float = field(default=0.5)  # control gain
     Kp: float = field(default=1.0)  # speed proportional gain
     Kp_braking: float = field(default=5.0) # braking gain
-    dt: float = field(default=0.1) # [s] time difference
\ No newline at end of file
+    dt: float = field(default=0.1) # [s] time difference
+    search_window: int = field(default=100) # number of waypoints ahead of the last target index to search for the nearest point
+    search_behind: int = field(default=10) # number of waypoints behind the last target index that are searched as well
\ No newline at end of file
@@ -45,11 +45,14 @@ def get_data_for_instance(inst_token, frame, extractor, ds):
     
     
     
+    # One shortest path tree from the instance covers every spot
+    astar_dists, astar_dirs, _ = extractor.compute_Astar_dist_dir_batch(inst_token, spot_centers)
+
     for spot_idx, spot in enumerate(all_spots):
         label = get_label_for_index(spot_idx, selected_spot_index)
         
         """Computes features for current spot"""
-        astar_dist, astar_dir, _ = extractor.compute_Astar_dist_dir(inst_token, spot_centers[spot_idx])
+        astar_dist, astar_dir = astar_dists[spot_idx], astar_dirs[spot_idx]
         
         marked_img = extractor.label_spot(spot, inst_token, frame)
         img_data = np.array(marked_img)
@@ -5,7 +5,8 @@ from torchvision import transforms
 import numpy as np
 from parksim.intent_predict.cnn.data_processing.create_dataset import ENTRANCE_TO_PARKING_LOT
 from parksim.route_planner.a_star import WaypointsGraph
-from parksim.route_planner.a_star import AStarGraph, AStarPlanner
+from parksim.route_planner.a_star import AStarGraph
+from parksim.route_planner.route_table import plan_route, plan_dist_dir_batch
 import PIL
 import cv2
 import os
@@ -117,9 +118,12 @@ class Predictor:
         
         
         
+        # One shortest path tree from the vehicle covers every spot
+        astar_dists, astar_dirs = self.compute_Astar_dist_dir_batch(global_position, spot_centers, heading)
+
         for spot_idx, spot in enumerate(all_spots):        
             """Computes features for current spot"""
-            astar_dist, astar_dir = self.compute_Astar_dist_dir(global_position, spot_centers[spot_idx], heading)
+            astar_dist, astar_dir = astar_dists[spot_idx], astar_dirs[spot_idx]
             
             marked_img = self.label_spot(instance_centric_view, spot)
             img_data = np.array(marked_img)
@@ -201,10 +205,7 @@ class Predictor:
             astar_dir = 0
             astar_graph = AStarGraph([])
         else:
-            planner = AStarPlanner(
-                self.waypoints.vertices[current_vertex_idx], 
-                self.waypoints.vertices[spot_vertex_idx])
-            astar_graph = planner.solve()
+            astar_graph = plan_route(self.waypoints, current_vertex_idx, spot_vertex_idx)
 
             astar_dist = astar_graph.path_cost()
 
@@ -215,6 +216,14 @@ class Predictor:
 
         return astar_dist, astar_dir
 
+    def compute_Astar_dist_dir_batch(self, vehicle_coords, target_coords_list, heading):
+        """
+        compute_Astar_dist_dir for many targets, from one shortest path tree of the vehicle vertex
+
+        target_coords_list: the coordinates of goals. list of np array (x, y)
+        """
+        return plan_dist_dir_batch(self.waypoints, vehicle_coords, heading, target_coords_list)
+
 
     def get_time_spent_in_lot(self, ds, agent_token, inst_token):
         SAMPLING_RATE_IN_MINUTES = 0.04 / 60
@@ -10,7 +10,7 @@ import matplotlib.pyplot as plt
 import pandas as pd
 
 from parksim.pytypes import VehicleState
-from parksim.utils.get_corners import get_vehicle_corners, get_vehicle_corners_from_dict
+from parksim.utils.get_corners import get_vehicle_corners, get_vehicle_corners_from_dict, get_vehicle_corners_from_dicts
 
 _ROOT = Path(os.path.abspath(os.path.dirname(__file__)))
 # Load parking map
@@ -351,15 +351,21 @@ class InstanceCentricGenerator:
         len_history = len(instance_timeline) - 1
         max_steps = np.floor( len_history / stride).astype(int)
 
-        # History configuration
+        # History configuration, oldest first, then the current configuration
+        state_dicts = []
+        fills = []
         for idx_step in range(max_steps, 0, -1):
             idx_history = len_history - idx_step * stride
-            instance_state_dict = instance_timeline[idx_history][agent_index]
-            self.plot_instance_from_state_dict(draw=draw, fill=color_band[-1-idx_step], state_dict=instance_state_dict)
+            state_dicts.append(instance_timeline[idx_history][agent_index])
+            fills.append(color_band[-1-idx_step])
 
-        # Current configuration
-        instance_state_dict = instance_timeline[-1][agent_index]
-        self.plot_instance_from_state_dict(draw=draw, fill=color_band[-1], state_dict=instance_state_dict)
+        state_dicts.append(instance_timeline[-1][agent_index])
+        fills.append(color_band[-1])
+
+        # Corners of all steps at once
+        corners_pixel = (get_vehicle_corners_from_dicts(state_dicts) / self.res).astype('int32')
+        for corners, fill in zip(corners_pixel, fills):
+            draw.polygon([tuple(p) for p in corners], fill=fill)
 
     def _color_transition(self, max_color, steps):
         """
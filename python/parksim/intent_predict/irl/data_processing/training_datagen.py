@@ -61,21 +61,23 @@ def process(stride, path, scene_name):
                     # Phi matrix
                     feature = np.zeros((NUM_FEATURE, len(spot_centers)))
 
+                    # One shortest path tree from the instance covers every spot
+                    astar_dists, astar_dirs, astar_graphs = processor.compute_Astar_dist_dir_batch(inst_token, spot_centers)
+
                     for center_idx, center_coords in enumerate(spot_centers):
 
                         local_offset = processor.compute_relative_offset(inst_token, center_coords)
 
-                        astar_dist, astar_dir, astar_graph = processor.compute_Astar_dist_dir(inst_token, center_coords)
+                        astar_dist, astar_dir, astar_graph = astar_dists[center_idx], astar_dirs[center_idx], astar_graphs[center_idx]
 
                         nearby_agents = 0
 
                         # speed_list = []
-                        for center_agent in agent_centers:
-                            dist = astar_graph.dist_to_graph(center_agent)
-                            if dist < thres:
-                                nearby_agents += 1
-                                # agent_speed = processor.get_agent_speed(inst_token, center_agent)
-                                # speed_list.append(agent_speed)
+                        if len(agent_centers) > 0:
+                            dists = astar_graph.dist_to_graph_batch(np.array(agent_centers))
+                            nearby_agents = int(np.sum(dists < thres))
+                            # agent_speed = processor.get_agent_speed(inst_token, center_agent)
+                            # speed_list.append(agent_speed)
 
                         # max_agent_speed = np.amax(speed_list)
                         # min_agent_speed = np.amin(speed_list)
@@ -4,7 +4,8 @@ import pickle
 
 from parksim.spot_detector.detector import LocalDetector
 from parksim.route_planner.graph import WaypointsGraph
-from parksim.route_planner.a_star import AStarPlanner, AStarGraph
+from parksim.route_planner.a_star import AStarGraph
+from parksim.route_planner.route_table import plan_route, plan_dist_dir_batch
 
 from dlp.dataset import Dataset
 from dlp.visualizer import SemanticVisualizer
@@ -81,10 +82,7 @@ class IrlDataProcessor(object):
             astar_dir = 0
             astar_graph = AStarGraph([])
         else:
-            planner = AStarPlanner(
-                self.waypoints_graph.vertices[current_vertex_idx], 
-                self.waypoints_graph.vertices[spot_vertex_idx])
-            astar_graph = planner.solve()
+            astar_graph = plan_route(self.waypoints_graph, current_vertex_idx, spot_vertex_idx)
 
             astar_dist = astar_graph.path_cost()
 
@@ -95,6 +93,16 @@ class IrlDataProcessor(object):
 
         return astar_dist, astar_dir, astar_graph
 
+    def compute_Astar_dist_dir_batch(self, inst_token, target_coords_list: List[np.ndarray]):
+        """
+        compute_Astar_dist_dir for many targets, from one shortest path tree of the instance vertex
+
+        target_coords_list: the coordinates of goals. list of np array (x, y)
+        """
+        instance = self.ds.get('instance', inst_token)
+
+        return plan_dist_dir_batch(self.waypoints_graph, instance['coords'], instance['heading'], target_coords_list, return_paths=True)
+
     def get_agent_speed(self, inst_token, agent_coords: np.ndarray):
         """
         search the agent with the provided center coords and return its speed
@@ -1,6 +1,7 @@
 import numpy as np
 from abc import abstractmethod
 from dataclasses import dataclass, field
+from typing import List
 from matplotlib.patches import Polygon, Circle
 
 from parksim.pytypes import PythonMsg
@@ -48,6 +49,32 @@ class CircleObstacle(BaseObstacle):
         
         
         
+class _PolytopeRepresentation(object):
+    '''
+    Data descriptor for the derived fields (xy, V, A, b) of a BasePolytopeObstacle.
+
+    The value lives in the instance __dict__ and is computed by calc (e.g. "__calc_V__") the first time it is read after a change.
+    Assigning None drops the stored value so it is recomputed on the next read.
+    '''
+    def __init__(self, name, calc):
+        self.name = name
+        self.calc = calc
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return None
+        d = obj.__dict__
+        if self.name not in d:
+            getattr(obj, self.calc)()
+        return d[self.name]
+
+    def __set__(self, obj, value):
+        if value is None:
+            obj.__dict__.pop(self.name, None)
+        else:
+            obj.__dict__[self.name] = value
+
+
 @dataclass
 class BasePolytopeObstacle(BaseObstacle):
     '''
@@ -56,23 +83,33 @@ class BasePolytopeObstacle(BaseObstacle):
     R = conv(V)               (Vertex Form)
     R = {x : Ab*x <= b}       (Hyperplane form)
     R = {x : l <= A*x <= u}   (OSQP)
+
+    xy, V, A and b are computed lazily: setting any other field only marks them stale, and they are recomputed the next time they are read.
     '''
     
     V: np.ndarray = field(default = None)   # vertices - N x 2 shape np.array
     A: np.ndarray = field(default = None)  # single ended constraints
     b: np.ndarray = field(default = None)
     
+    _derived_fields = ('xy', 'V', 'A', 'b')
+
     def __setattr__(self,key,value):
         '''
-        Reuse PythonMsg checks however update internal representations afterwards.
+        Reuse PythonMsg checks however mark internal representations stale afterwards.
         
         Internal updates must use object.__setattr__(self,key,value) to avoid recursive infinite loops.
         '''
+        if key in self._derived_fields:
+            # hasattr() would compute the value, possibly from a half-initialized object
+            object.__setattr__(self,key,value)
+            return
+
         PythonMsg.__setattr__(self,key,value)
         
-        # now update dependent fields
-        self.__calc_V__()
-        self.__calc_A_b__()
+        # now drop dependent fields, they are recomputed when read
+        d = self.__dict__
+        for name in self._derived_fields:
+            d.pop(name, None)
         return
         
     @abstractmethod
@@ -99,7 +136,46 @@ class BasePolytopeObstacle(BaseObstacle):
         p = Polygon(self.xy, color = 'red')
         ax.add_patch(p)
         return
-    
+
+# installed after @dataclass so that the generated __init__ still defaults these fields to None
+for _name, _calc in (('xy', '__calc_V__'), ('V', '__calc_V__'), ('A', '__calc_A_b__'), ('b', '__calc_A_b__')):
+    setattr(BasePolytopeObstacle, _name, _PolytopeRepresentation(_name, _calc))
+
+
+def rectangle_vertices(xc, yc, w, h, psi) -> np.ndarray:
+    '''
+    vertices of K rectangles as a K x 5 x 2 array, with the first vertex repeated at the end
+    '''
+    xc, yc, w, h, psi = np.broadcast_arrays(*[np.atleast_1d(np.asarray(a, dtype=float)) for a in (xc, yc, w, h, psi)])
+    c = np.cos(psi)[:, None]
+    s = np.sin(psi)[:, None]
+
+    # corners in the rectangle frame, in the same order as RectangleObstacle.xy
+    lx = np.array([-0.5, -0.5, 0.5, 0.5, -0.5]) * w[:, None]
+    ly = np.array([-0.5, 0.5, 0.5, -0.5, -0.5]) * h[:, None]
+
+    # row vector times R() = [[c, s], [-s, c]]
+    return np.stack([lx * c - ly * s + xc[:, None], lx * s + ly * c + yc[:, None]], axis=-1)
+
+def rectangle_halfspaces(xc, yc, w, h, psi):
+    '''
+    (A, b) of K rectangles as K x 4 x 2 and K x 4 arrays, P = {x : A @ x <= b}
+    '''
+    xc, yc, w, h, psi = np.broadcast_arrays(*[np.atleast_1d(np.asarray(a, dtype=float)) for a in (xc, yc, w, h, psi)])
+    c = np.cos(psi)
+    s = np.sin(psi)
+
+    # rows of [[1,0],[0,1],[-1,0],[0,-1]] @ R()
+    r0 = np.stack([c, s], axis=-1)
+    r1 = np.stack([-s, c], axis=-1)
+    A = np.stack([r0, r1, -r0, -r1], axis=1)
+
+    # R() is a rotation, so solving with R().T is a product with R()
+    center = np.stack([c * xc + s * yc, -s * xc + c * yc], axis=-1)
+    half = np.stack([w / 2, h / 2], axis=-1)
+    b = np.concatenate([center + half, -center + half], axis=-1)
+
+    return A, b
 
 @dataclass
 class RectangleObstacle(BasePolytopeObstacle):
@@ -116,17 +192,31 @@ class RectangleObstacle(BasePolytopeObstacle):
     h: float = field(default = 0)
     psi: float = field(default = 0)
     
-    
-    def __post_init__(self):
-        self.__calc_V__()
-        self.__calc_A_b__()
-        return
+    @classmethod
+    def from_arrays(cls, xc, yc, w, h, psi = 0) -> List['RectangleObstacle']:
+        '''
+        build many rectangles at once; every argument is a scalar or a length K array.
+        The polytope representations of all of them are computed in one batch
+        '''
+        xc, yc, w, h, psi = np.broadcast_arrays(*[np.atleast_1d(np.asarray(a, dtype=float)) for a in (xc, yc, w, h, psi)])
+        xy = rectangle_vertices(xc, yc, w, h, psi)
+        A, b = rectangle_halfspaces(xc, yc, w, h, psi)
+
+        obstacles = []
+        for k in range(len(xc)):
+            obs = cls.__new__(cls)
+            # bypass __init__ and __setattr__, which would mark the precomputed fields stale again
+            obs.__dict__.update(xc = float(xc[k]), yc = float(yc[k]), w = float(w[k]), h = float(h[k]), psi = float(psi[k]),
+                                xy = xy[k], V = xy[k, :-1], A = A[k], b = b[k])
+            obstacles.append(obs)
+
+        return obstacles
         
     def R(self):
         return np.array([[np.cos(self.psi), np.sin(self.psi)],[-np.sin(self.psi), np.cos(self.psi)]]) 
     
     def __calc_V__(self):
-        xy = np.array([[- self.w/2,- self.h/2], [- self.w/2,+ self.h/2], [+ self.w/2,+ self.h/2], [+ self.w/2,- self.h/2], [- self.w/2,- self.h/2]]) @ self.R() + np.array([[self.xc, self.yc]])
+        xy = rectangle_vertices(self.xc, self.yc, self.w, self.h, self.psi)[0]
         
         V = xy[:-1,:]
                            
@@ -135,21 +225,25 @@ class RectangleObstacle(BasePolytopeObstacle):
         return
         
     def __calc_A_b__(self):
-        A = np.array([[1,0],
-                      [0,1],
-                      [-1,0],
-                      [0,-1]])  @ self.R()
-        
-        #TODO: there is probably a more efficient version of this.                    
-        R = self.R()
-        l = np.linalg.solve(R.T, np.array([[-self.xc], [-self.yc]])).squeeze() + np.array([self.w/2, self.h/2])
-        u = np.linalg.solve(R.T, np.array([[self.xc], [self.yc]])).squeeze() + np.array([self.w/2, self.h/2])
-        b = np.concatenate([u,l])
-        
-        object.__setattr__(self,'A',A)
-        object.__setattr__(self,'b',b)
+        A, b = rectangle_halfspaces(self.xc, self.yc, self.w, self.h, self.psi)
+        
+        object.__setattr__(self,'A',A[0])
+        object.__setattr__(self,'b',b[0])
         return
 
+def rasterize_obstacles(obstacles: List[BasePolytopeObstacle], grid_size: float):
+    '''
+    points spaced about grid_size apart along the edges of the obstacles, as (ox, oy) lists for hybrid A*
+    '''
+    ox, oy = [], []
+    for obs in obstacles:
+        xy = obs.xy
+        lengths = np.linalg.norm(np.diff(xy, axis=0), axis=1)
+        for i, num_steps in enumerate((lengths / grid_size).astype(int)):
+            ox.extend(np.linspace(xy[i, 0], xy[i+1, 0], num_steps).tolist())
+            oy.extend(np.linspace(xy[i, 1], xy[i+1, 1], num_steps).tolist())
+
+    return ox, oy
 
         
 
@@ -7,7 +7,7 @@ import matplotlib.pyplot as plt
 
 from parksim.pytypes import PythonMsg, VehicleState, VehiclePrediction
 from parksim.vehicle_types import VehicleBody, VehicleConfig
-from parksim.obstacle_types import GeofenceRegion, RectangleObstacle
+from parksim.obstacle_types import GeofenceRegion, RectangleObstacle, rasterize_obstacles
 
 from parksim.path_planner.hybrid_astar.hybrid_a_star import hybrid_a_star_planning, hybrid_a_star_plotting
 
@@ -55,14 +55,7 @@ class HobcaPlanner():
 
         obs_grid_size = self.vehicle_body.w / 4.
 
-        ox, oy = [], []
-
-        for obs in obstacles:
-            for i in range(4):
-                num_steps = int(np.linalg.norm(obs.xy[i] - obs.xy[i+1])/obs_grid_size)
-                for x, y in zip(np.linspace(obs.xy[i, 0], obs.xy[i+1, 0], num_steps), np.linspace(obs.xy[i, 1], obs.xy[i+1, 1], num_steps)):
-                    ox.append(x)
-                    oy.append(y)
+        ox, oy = rasterize_obstacles(obstacles, obs_grid_size)
 
         start = [x0.x.x, x0.x.y, x0.q.to_yaw()]
         goal = [xf.x.x, xf.x.y, xf.q.to_yaw()]
@@ -294,10 +287,7 @@ def main():
     vehicle_config = VehicleConfig()
     region = GeofenceRegion(x_max=8, x_min=-8, y_max=11, y_min=-11)
     
-    obstacles = [RectangleObstacle(xc = -3.8,   yc = -6.11, w = 5, h = 5.22),
-                 RectangleObstacle(xc = 3.8, yc = -6.11, w = 5, h = 5.22),
-                 RectangleObstacle(xc = -3.8, yc = 6.11, w = 5, h = 5.22),
-                 RectangleObstacle(xc = 3.8, yc = 6.11, w = 5, h = 5.22)]
+    obstacles = RectangleObstacle.from_arrays(xc = [-3.8, 3.8, -3.8, 3.8], yc = [-6.11, -6.11, 6.11, 6.11], w = 5, h = 5.22)
     
     planner = HobcaPlanner(config=config, vehicle_body=vehicle_body, vehicle_config=vehicle_config, region=region)
     
@@ -331,10 +321,7 @@ def datagen():
     vehicle_config = VehicleConfig()
     region = GeofenceRegion(x_max=8, x_min=-8, y_max=11, y_min=-11)
     
-    obstacles = [RectangleObstacle(xc = -3.8,   yc = -6.11, w = 5, h = 5.22),
-                 RectangleObstacle(xc = 3.8, yc = -6.11, w = 5, h = 5.22),
-                 RectangleObstacle(xc = -3.8, yc = 6.11, w = 5, h = 5.22),
-                 RectangleObstacle(xc = 3.8, yc = 6.11, w = 5, h = 5.22)]
+    obstacles = RectangleObstacle.from_arrays(xc = [-3.8, 3.8, -3.8, 3.8], yc = [-6.11, -6.11, 6.11, 6.11], w = 5, h = 5.22)
     
     planner = HobcaPlanner(config=config, vehicle_body=vehicle_body, vehicle_config=vehicle_config, region=region)
 
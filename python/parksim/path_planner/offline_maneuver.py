@@ -1,8 +1,10 @@
 import pickle
 import matplotlib.pyplot as plt
+import numpy as np
 import random
 
 from parksim.pytypes import VehiclePrediction
+from parksim.utils.interpolation import interpolate_states_inputs
 
 random.seed(0)
 
@@ -10,9 +12,19 @@ class OfflineManeuver(object):
     """
     Library of offline maneuver
     """
-    def __init__(self, pickle_file):
-        with open(pickle_file, 'rb') as handle:
-            self.lib = pickle.load(handle)
+    def __init__(self, pickle_file=None, lib=None):
+        """
+        pickle_file: path to the maneuver library pickle
+        lib: (Optional) an already loaded library, used instead of pickle_file
+        """
+        if lib is not None:
+            self.lib = lib
+        else:
+            with open(pickle_file, 'rb') as handle:
+                self.lib = pickle.load(handle)
+
+        # (driving_dir, x_position, spot, heading, dt) -> maneuver resampled at dt without offset
+        self.resampled = {}
 
     def get_maneuver(self, xy_offset=[0,0], 
                         driving_dir=random.choice(['east', 'west']), 
@@ -21,8 +33,50 @@ class OfflineManeuver(object):
                         heading=random.choice(['up', 'down'])) -> VehiclePrediction:
         print('Trajectory requested:', (driving_dir, x_position, spot, heading))
         
-        traj = self.lib[(driving_dir, x_position, spot, heading)]
+        return self._to_prediction(self.lib[(driving_dir, x_position, spot, heading)], xy_offset)
+
+    def get_resampled_maneuver(self, xy_offset, driving_dir, x_position, spot, heading, dt) -> VehiclePrediction:
+        """
+        The maneuver resampled at time step dt, as interpolate_states_inputs would do it. Each maneuver is resampled once per dt, a request only adds the offset to x and y. The other arrays are shared and read-only
+        """
+        key = (driving_dir, x_position, spot, heading, dt)
+        base = self.resampled.get(key)
+        if base is None:
+            base = self._resample(key)
+
+        res = VehiclePrediction()
+        res.t = base.t
+        res.x = base.x + xy_offset[0]
+        res.y = base.y + xy_offset[1]
+        res.psi = base.psi
+        res.v = base.v
+
+        res.u_a = base.u_a
+        res.u_steer = base.u_steer
+
+        return res
+
+    def resample_all(self, dt):
+        """
+        resample every maneuver in the library at time step dt ahead of time
+        """
+        for maneuver_key in self.lib.keys():
+            key = tuple(maneuver_key) + (dt,)
+            if key not in self.resampled:
+                self._resample(key)
+
+    def _resample(self, key) -> VehiclePrediction:
+        traj = self._to_prediction(self.lib[key[:4]], [0, 0])
+        time_seq = np.arange(start=traj.t[0], stop=traj.t[-1], step=key[4])
+
+        base = interpolate_states_inputs(traj, time_seq)
+        for name in ['t', 'x', 'y', 'psi', 'v', 'u_a', 'u_steer']:
+            getattr(base, name).setflags(write=False)
+
+        self.resampled[key] = base
+        return base
 
+    def _to_prediction(self, traj, xy_offset) -> VehiclePrediction:
         res = VehiclePrediction()
         res.t = traj[0, :]
         res.x = traj[1, :] + xy_offset[0]
@@ -4,6 +4,8 @@ import array
 import numpy as np
 import pdb
 import copy
+import operator
+from typing import Dict, List, Sequence
 import matplotlib.pyplot as plt
 
 #DEFAULT_VEHICLE_TYPE = 'barc'
@@ -80,6 +82,75 @@ class PythonMsg:
     def copy(self):
         return copy.deepcopy(self)
 
+    @classmethod
+    def pack_arrays(cls, msgs: Sequence['PythonMsg'], fields: Sequence[str] = None) -> Dict[str, np.ndarray]:
+        '''
+        Packs a sequence of messages of this class into a struct-of-arrays: one np.array per numeric field, keyed by its dotted name (e.g. "x.x" for state.x.x)
+
+        fields: dotted names to pack, all numeric fields by default. Values are stored as float64 (bool fields as bool), None as nan
+
+        usage: arrays = VehicleState.pack_arrays(list_of_VehicleState)
+        '''
+        accessors = _msg_field_accessors(cls)
+        names = accessors.keys() if fields is None else fields
+
+        arrays = {}
+        for name in names:
+            getter, _, _, dtype, _ = accessors[name]
+            try:
+                arrays[name] = np.fromiter(map(getter, msgs), dtype=dtype, count=len(msgs))
+            except TypeError:
+                # None values
+                arrays[name] = np.array(list(map(getter, msgs)), dtype=float)
+
+        return arrays
+
+    @classmethod
+    def unpack_arrays(cls, arrays: Dict[str, np.ndarray]) -> List['PythonMsg']:
+        '''
+        Inverse of pack_arrays: creates one message per row. Fields missing from arrays keep their defaults, and nan is unpacked as None for fields that default to None
+        '''
+        accessors = _msg_field_accessors(cls)
+        N = len(next(iter(arrays.values()))) if arrays else 0
+        msgs = [cls() for _ in range(N)]
+
+        for name, values in arrays.items():
+            _, parent_getter, attr, _, none_default = accessors[name]
+            values = np.asarray(values)
+            if none_default and values.dtype.kind == 'f':
+                values = np.where(np.isnan(values), None, values.astype(object))
+            for parent, value in zip(map(parent_getter, msgs), values.tolist()):
+                object.__setattr__(parent, attr, value)
+
+        return msgs
+
+_MSG_FIELD_ACCESSORS = {}
+
+def _msg_field_accessors(msg_type) -> Dict[str, tuple]:
+    '''
+    (getter, parent getter, attribute name, dtype, defaults to None) of every numeric field of a PythonMsg class, nested messages included.
+    Computed once per class from a default instance
+    '''
+    accessors = _MSG_FIELD_ACCESSORS.get(msg_type)
+    if accessors is not None:
+        return accessors
+
+    accessors = {}
+    def collect(msg, prefix):
+        for key, val in vars(msg).items():
+            name = prefix + key
+            if isinstance(val, PythonMsg):
+                collect(val, name + '.')
+            elif val is None or isinstance(val, (bool, int, float, np.number)):
+                # defaults are often written as ints (e.g. x = 0), so everything but bools is packed as float64
+                dtype = bool if isinstance(val, bool) else np.float64
+                parent_getter = operator.attrgetter(prefix[:-1]) if prefix else (lambda msg: msg)
+                accessors[name] = (operator.attrgetter(name), parent_getter, key, dtype, val is None)
+
+    collect(msg_type(), '')
+    _MSG_FIELD_ACCESSORS[msg_type] = accessors
+    return accessors
+
 @dataclass
 class NodeParamTemplate:
     '''
@@ -347,19 +418,17 @@ class VehicleState(PythonMsg):
 
     def pack_list(self, use_numpy = False):
         '''
-        Takes in a list or array of VehicleState objects and creates a single VehicleState object where each field is a np.array of the fields of the original list
+        Takes in a list or array of VehicleState objects and creates a single VehicleState object where each numeric field (e.g. msg.x.x) is a np.array, or a list, of that field of the original list
 
         usage: pytypes.VehicleState.pack_list(array_of_VehicleState)
         '''
         msg = VehicleState()
-        N = len(self)
-        for key in vars(msg).keys():
-            msg.__setattr__(key,[])
-
-            for i in range(N):
-                msg.__getattribute__(key).append(self[i].__getattribute__(key))
-            if use_numpy:
-                msg.__setattr__(key, np.array(msg.__getattribute__(key)))
+        accessors = _msg_field_accessors(VehicleState)
+        for name, values in VehicleState.pack_arrays(self).items():
+            _, parent_getter, attr, _, none_default = accessors[name]
+            if not use_numpy:
+                values = [None if none_default and v != v else v for v in values.tolist()]
+            object.__setattr__(parent_getter(msg), attr, values)
 
         return msg
 
@@ -372,6 +441,73 @@ class VehicleState(PythonMsg):
         destination.u_steer = self.u.u_steer
         return
 
+class PlanarPosition(object):
+    __slots__ = ('x', 'y')
+
+    def __init__(self, x: float = 0, y: float = 0):
+        self.x = x
+        self.y = y
+
+class PlanarOrientation(object):
+    __slots__ = ('psi',)
+
+    def __init__(self, psi: float = 0):
+        self.psi = psi
+
+class PlanarVelocity(object):
+    __slots__ = ('v',)
+
+    def __init__(self, v: float = 0):
+        self.v = v
+
+class PlanarActuation(object):
+    __slots__ = ('u_a', 'u_steer')
+
+    def __init__(self, u_a: float = 0, u_steer: float = 0):
+        self.u_a = u_a
+        self.u_steer = u_steer
+
+class PlanarState(object):
+    '''
+    Compact planar vehicle state with the same nested access as VehicleState (state.x.x, state.x.y, state.e.psi, state.v.v, state.u.u_a, state.u.u_steer).
+
+    Only holds the fields the simulator, controllers and collision checks use, in __slots__ objects, so creating and copying it is cheap.
+    Convert with to_vehicle_state / from_state where a full VehicleState is needed, e.g. for ROS messages
+    '''
+    __slots__ = ('t', 'x', 'e', 'v', 'u')
+
+    def __init__(self, x: float = 0, y: float = 0, psi: float = 0, v: float = 0, u_a: float = 0, u_steer: float = 0, t: float = None):
+        self.t = t
+        self.x = PlanarPosition(x, y)
+        self.e = PlanarOrientation(psi)
+        self.v = PlanarVelocity(v)
+        self.u = PlanarActuation(u_a, u_steer)
+
+    @staticmethod
+    def from_state(state) -> 'PlanarState':
+        '''
+        planar part of a VehicleState, or of anything with the same nested fields
+        '''
+        return PlanarState(state.x.x, state.x.y, state.e.psi, state.v.v, state.u.u_a, state.u.u_steer, getattr(state, 't', None))
+
+    def to_vehicle_state(self) -> VehicleState:
+        state = VehicleState()
+        state.t = self.t
+        state.x.x = self.x.x
+        state.x.y = self.x.y
+        state.e.psi = self.e.psi
+        state.v.v = self.v.v
+        state.u.u_a = self.u.u_a
+        state.u.u_steer = self.u.u_steer
+
+        return state
+
+    def copy(self) -> 'PlanarState':
+        return PlanarState(self.x.x, self.x.y, self.e.psi, self.v.v, self.u.u_a, self.u.u_steer, self.t)
+
+    def __repr__(self):
+        return 'PlanarState(x=%r, y=%r, psi=%r, v=%r, u_a=%r, u_steer=%r, t=%r)' % (self.x.x, self.x.y, self.e.psi, self.v.v, self.u.u_a, self.u.u_steer, self.t)
+
 # TODO: Change to array of VehicleState
 @dataclass
 class VehiclePrediction(PythonMsg):
@@ -414,15 +550,49 @@ class VehiclePrediction(PythonMsg):
     global_state_covariance: array.array = field(default = None) # Vectorized upper triangular part of covariance matrix with main diagonal order [x, y, psi, v_long, v_tran, psidot]
 
     def update_body_velocity_from_global(self):
-        self.v_long =  (np.multiply(self.v_x, np.cos(self.psi)) + np.multiply(self.v_y, np.sin(self.psi))).tolist()
-        self.v_tran = (-np.multiply(self.v_x, np.sin(self.psi)) + np.multiply(self.v_y, np.cos(self.psi))).tolist()
-        self.a_long =  (np.multiply(self.a_x, np.cos(self.psi)) + np.multiply(self.a_y, np.sin(self.psi))).tolist()
-        self.a_tran = (-np.multiply(self.a_y, np.sin(self.psi)) + np.multiply(self.a_y, np.cos(self.psi))).tolist()
+        c, s = np.cos(self.psi), np.sin(self.psi)
+        self.v_long =  (np.multiply(self.v_x, c) + np.multiply(self.v_y, s)).tolist()
+        self.v_tran = (-np.multiply(self.v_x, s) + np.multiply(self.v_y, c)).tolist()
+        self.a_long =  (np.multiply(self.a_x, c) + np.multiply(self.a_y, s)).tolist()
+        self.a_tran = (-np.multiply(self.a_y, s) + np.multiply(self.a_y, c)).tolist()
 
     def update_global_velocity_from_body(self):
-        self.v_x =  (np.multiply(self.v_long, np.cos(self.psi)) - np.multiply(self.v_tran, np.sin(self.psi))).tolist()
-        self.v_y =  (np.multiply(self.v_long, np.sin(self.psi)) + np.multiply(self.v_tran, np.cos(self.psi))).tolist()
-        self.a_x =  (np.multiply(self.a_long, np.cos(self.psi)) - np.multiply(self.a_tran, np.sin(self.psi))).tolist()
-        self.a_y =  (np.multiply(self.a_long, np.sin(self.psi)) + np.multiply(self.a_tran, np.cos(self.psi))).tolist()
+        c, s = np.cos(self.psi), np.sin(self.psi)
+        self.v_x =  (np.multiply(self.v_long, c) - np.multiply(self.v_tran, s)).tolist()
+        self.v_y =  (np.multiply(self.v_long, s) + np.multiply(self.v_tran, c)).tolist()
+        self.a_x =  (np.multiply(self.a_long, c) - np.multiply(self.a_tran, s)).tolist()
+        self.a_y =  (np.multiply(self.a_long, s) + np.multiply(self.a_tran, c)).tolist()
+
+    def to_states(self) -> List[VehicleState]:
+        '''
+        Unpacks the per-step fields of the prediction into a list of VehicleState
+        '''
+        N = len(self.x)
+        arrays = {}
+        for name, state_field in PREDICTION_STATE_FIELDS.items():
+            values = self.__getattribute__(name)
+            if values is not None and np.ndim(values) == 1 and len(values) == N:
+                arrays[state_field] = np.asarray(values, dtype=float)
+
+        return VehicleState.unpack_arrays(arrays)
+
+# Field of VehicleState that each per-step field of VehiclePrediction corresponds to
+PREDICTION_STATE_FIELDS = {
+    't': 't',
+    'x': 'x.x',
+    'y': 'x.y',
+    'v': 'v.v',
+    'psi': 'e.psi',
+    'psidot': 'w.w_psi',
+    'v_long': 'v.v_long',
+    'v_tran': 'v.v_tran',
+    'a_long': 'a.a_long',
+    'a_tran': 'a.a_tran',
+    'e_psi': 'p.e_psi',
+    's': 'p.s',
+    'x_tran': 'p.x_tran',
+    'u_a': 'u.u_a',
+    'u_steer': 'u.u_steer',
+}
 
 
@@ -1,10 +1,10 @@
+import heapq
 from itertools import count
 from typing import List
-from queue import PriorityQueue
 
 import numpy as np
 
-from parksim.route_planner.graph import Vertex, Edge, WaypointsGraph
+from parksim.route_planner.graph import Vertex, Edge, GraphArrays, WaypointsGraph
 from parksim.utils.spline import calc_spline_course
 
 class AStarGraph(WaypointsGraph):
@@ -47,22 +47,15 @@ class AStarGraph(WaypointsGraph):
 
     def compute_ref_path(self, offset: float = 0):
         """
-        Compute vehicle ref path with offset from the center line
+        Compute vehicle ref path with offset from the center line, as contiguous float64 arrays
         """
-        # collect x, y, yaw from A* solution
-        axs = []
-        ays = []
+        # collect x, y of the A* solution
+        coords = np.array([v.coords for v in self.vertices], dtype=float).reshape(-1, 2)
 
         # calculate splines
-
-        # generate list of x, y waypoints
-        for v in self.vertices:
-            axs.append(v.coords[0])
-            ays.append(v.coords[1])
-
-        cxs, cys, cyaws, _, _ = calc_spline_course(axs, ays, ds=0.1)
-        cxs = [cxs[j] + offset * np.sin(cyaws[j]) for j in range(len(cxs))]
-        cys = [cys[j] - offset * np.cos(cyaws[j]) for j in range(len(cys))]
+        cxs, cys, cyaws, _, _ = calc_spline_course(coords[:, 0], coords[:, 1], ds=0.1)
+        cxs = cxs + offset * np.sin(cyaws)
+        cys = cys - offset * np.cos(cyaws)
 
         return cxs, cys, cyaws
 
@@ -70,39 +63,80 @@ class AStarPlanner(object):
     """
     A* planner for planning shortest path on the graph
     """
-    def __init__(self, v_start: 'Vertex', v_goal: 'Vertex'):
+    def __init__(self, v_start: 'Vertex', v_goal: 'Vertex', graph: WaypointsGraph = None):
+        """
+        v_start, v_goal: start and goal vertices
+        graph: (Optional) the graph the vertices belong to. Its integer-indexed arrays are cached and reused across plans. Without it, the reachable part of the graph is indexed for this plan only
+        """
         self.v_start = v_start
         self.v_goal = v_goal
 
-        self.fringe = PriorityQueue()
-        self.closed = set()
-        
-        # A counter object to prevent nodes with same cost
-        self.counter = count()
+        self.arrays: GraphArrays = None
+        if graph is not None:
+            self.arrays = graph.get_arrays()
+            if id(v_start) not in self.arrays.index:
+                self.arrays = None
 
-        # (Vertex, Path, Cost-along-path)
-        start = (self.v_start, [], 0)
-        self.fringe.put((0, next(self.counter), start))
+        if self.arrays is None:
+            self.arrays = GraphArrays.reachable_from(v_start)
 
     def solve(self):
         """
         solve the path
         """
-        while not self.fringe.empty():
-            _, _, (v, path, cost) = self.fringe.get()
+        arrays = self.arrays
+        indptr = arrays.indptr
+        indices = arrays.indices
+        costs = arrays.costs
+
+        goal_coords = np.asarray(self.v_goal.coords, dtype=float)
+        # Goal test by coordinates, like Vertex.__eq__
+        is_goal = np.all(arrays.coords == goal_coords, axis=1).tolist() if goal_coords.shape == (2,) else [False] * len(arrays.vertices)
+        # Heuristic: straight line distance to the goal
+        diff = arrays.coords - goal_coords
+        heuristic = np.sqrt(np.einsum('ij,ij->i', diff, diff))
+
+        # CSR entry of the edge each expanded vertex was reached by, -1 for the start
+        parent_edge = [-1] * len(arrays.vertices)
+        closed = [False] * len(arrays.vertices)
+
+        # A counter to prevent nodes with same cost
+        counter = count()
+
+        # (A*-cost, counter, vertex id, cost-along-path, CSR entry of the last edge)
+        start = arrays.index[id(self.v_start)]
+        fringe = [(0, next(counter), start, 0, -1)]
 
-            if v == self.v_goal:
+        while fringe:
+            _, _, v, cost, edge_k = heapq.heappop(fringe)
+
+            if is_goal[v]:
                 # the returned path is a list of edges
-                # print("Solved")
-                return AStarGraph(path)
-            
-            if v not in self.closed:
-                self.closed.add(v)
-
-                for child, edge in zip(*v.get_children()):
-                    new_cost = cost + edge.c
-                    aStar_cost = new_cost + child.dist(self.v_goal)
-                    new_node = (child, path + [edge], new_cost)
-                    self.fringe.put((aStar_cost, next(self.counter), new_node))
-
-        raise Exception('Path is not found')
\ No newline at end of file
+                return AStarGraph(self._reconstruct(edge_k, parent_edge))
+
+            if not closed[v]:
+                closed[v] = True
+                parent_edge[v] = edge_k
+
+                for k in range(indptr[v], indptr[v+1]):
+                    child = indices[k]
+                    new_cost = cost + costs[k]
+                    aStar_cost = new_cost + heuristic[child]
+                    heapq.heappush(fringe, (aStar_cost, next(counter), child, new_cost, k))
+
+        raise Exception('Path is not found')
+
+    def _reconstruct(self, edge_k: int, parent_edge: List[int]) -> List['Edge']:
+        """
+        follow the parent edges back to the start
+        """
+        arrays = self.arrays
+        # CSR entry k belongs to the vertex v with indptr[v] <= k < indptr[v+1]
+        path = []
+        while edge_k >= 0:
+            path.append(arrays.edges[edge_k])
+            v = int(np.searchsorted(arrays.indptr, edge_k, side='right')) - 1
+            edge_k = parent_edge[v]
+
+        path.reverse()
+        return path
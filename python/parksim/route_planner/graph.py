@@ -1,7 +1,11 @@
+import heapq
+from itertools import count
+
 import numpy as np
 import matplotlib.pyplot as plt
+from scipy.spatial import cKDTree
 
-from dlp.visualizer import Visualizer
+from parksim.route_planner.segment_index import SegmentIndex
 
 class Vertex(object):
     """
@@ -60,6 +64,98 @@ class Edge(object):
         self.v2 = v2
         self.c = c
 
+class GraphArrays(object):
+    """
+    Integer-indexed arrays of a set of vertices, for planners that work on vertex ids
+
+    coords: (V, 2) vertex coordinates
+    indptr, indices, costs: CSR adjacency. The children of vertex i are indices[indptr[i]:indptr[i+1]] with edge costs costs[indptr[i]:indptr[i+1]], in the same order as Vertex.children
+    edges: the Edge object of every CSR entry
+    index: id(vertex) -> vertex id
+    """
+    def __init__(self, vertices: list):
+        self.vertices = vertices
+        self.index = {id(v): i for i, v in enumerate(vertices)}
+        self.coords = np.array([v.coords for v in vertices], dtype=float).reshape(-1, 2)
+
+        self.indptr = np.zeros(len(vertices) + 1, dtype=int)
+        indices = []
+        costs = []
+        self.edges = []
+        for i, v in enumerate(vertices):
+            for child, e in zip(v.children, v.edges):
+                indices.append(self.index[id(child)])
+                costs.append(e.c)
+                self.edges.append(e)
+            self.indptr[i + 1] = len(indices)
+
+        self.indices = np.array(indices, dtype=int)
+        self.costs = np.array(costs, dtype=float)
+
+    @staticmethod
+    def reachable_from(v_start: 'Vertex') -> 'GraphArrays':
+        """
+        arrays of all vertices reachable from v_start, with v_start as vertex 0
+        """
+        vertices = [v_start]
+        seen = {id(v_start)}
+        k = 0
+        while k < len(vertices):
+            for child in vertices[k].children:
+                if id(child) not in seen:
+                    seen.add(id(child))
+                    vertices.append(child)
+            k += 1
+
+        return GraphArrays(vertices)
+
+class ShortestPathTree(object):
+    """
+    Shortest paths from one source vertex to every vertex of a graph
+    """
+    def __init__(self, arrays: GraphArrays, source: int, dist: np.ndarray, first_hop: np.ndarray, parent_edge: np.ndarray):
+        """
+        arrays: the GraphArrays the tree was computed on
+        source: vertex id of the source
+        dist: (V,) shortest path distance to every vertex, inf if unreachable
+        first_hop: (V,) vertex after the source on the shortest path to every vertex, -1 for the source and unreachable vertices
+        parent_edge: (V,) CSR entry of the last edge on the shortest path to every vertex, -1 for the source and unreachable vertices
+        """
+        self.arrays = arrays
+        self.source = source
+        self.dist = dist
+        self.first_hop = first_hop
+        self.parent_edge = parent_edge
+
+    def directions(self, targets: np.ndarray) -> np.ndarray:
+        """
+        (N, 2) unit vectors along the first edge of the shortest path to every target. Zero for the source and unreachable targets
+        """
+        targets = np.asarray(targets, dtype=int).reshape(-1)
+        hops = self.first_hop[targets]
+        has_hop = hops >= 0
+
+        vectors = np.zeros((len(targets), 2))
+        vectors[has_hop] = self.arrays.coords[hops[has_hop]] - self.arrays.coords[self.source]
+        norms = np.linalg.norm(vectors, axis=1)
+
+        return np.divide(vectors, norms[:, None], out=np.zeros_like(vectors), where=norms[:, None] > 0)
+
+    def path_edges(self, target: int) -> list:
+        """
+        edges on the shortest path from the source to target. Empty for the source and unreachable targets
+        """
+        arrays = self.arrays
+        path = []
+        edge_k = self.parent_edge[target]
+        while edge_k >= 0:
+            e = arrays.edges[edge_k]
+            path.append(e)
+            edge_k = self.parent_edge[arrays.index[id(e.v1)]]
+
+        path.reverse()
+        return path
+
 class WaypointsGraph(object):
     """
     The connectivity graph of waypoints in the parking lot
@@ -71,20 +167,155 @@ class WaypointsGraph(object):
         self.vertices = []
         self.edges = []
 
+        self._kdtree = None
+        self._kdtree_key = None
+
+        self._segment_index = None
+        self._segment_index_key = None
+
+        self._arrays = None
+        self._arrays_key = None
+
+        # The last tree returned by shortest_path_tree, as (arrays, source, tree)
+        self._last_tree = None
+
+        # Optional all-pairs RouteTable, see parksim.route_planner.route_table
+        self.route_table = None
+
+    # Number of nearest candidates fetched from the KD-tree, to break distance ties by vertex index
+    _TIE_CANDIDATES = 8
+
+    def invalidate_search_index(self):
+        """
+        drop the KD-tree used by search, the segment index used by dist_to_graph and the arrays used by planners. Call this after changing vertices in place
+        """
+        self._kdtree = None
+        self._kdtree_key = None
+
+        self._segment_index = None
+        self._segment_index_key = None
+
+        self._arrays = None
+        self._arrays_key = None
+
+    def _get_kdtree(self) -> cKDTree:
+        """
+        KD-tree over the vertex coordinates, rebuilt when the vertex list has been replaced or resized.
+
+        Graphs loaded from old pickles (and AStarGraph) don't have the cache attributes, hence getattr
+        """
+        key = (id(self.vertices), len(self.vertices))
+        if getattr(self, '_kdtree', None) is None or getattr(self, '_kdtree_key', None) != key:
+            self._kdtree = cKDTree(np.array([v.coords for v in self.vertices], dtype=float).reshape(-1, 2))
+            self._kdtree_key = key
+
+        return self._kdtree
+
+    def get_arrays(self) -> GraphArrays:
+        """
+        integer-indexed arrays of the graph, rebuilt when the vertex or edge list has been replaced or resized
+        """
+        key = (id(self.vertices), len(self.vertices), id(self.edges), len(self.edges))
+        if getattr(self, '_arrays', None) is None or getattr(self, '_arrays_key', None) != key:
+            self._arrays = GraphArrays(self.vertices)
+            self._arrays_key = key
+
+        return self._arrays
+
+    def shortest_path_tree(self, source: int) -> ShortestPathTree:
+        """
+        Dijkstra from the vertex with id source to all vertices of the graph, for looking up many goals at once
+        """
+        arrays = self.get_arrays()
+        last = getattr(self, '_last_tree', None)
+        if last is not None and last[0] is arrays and last[1] == source:
+            return last[2]
+
+        indptr = arrays.indptr
+        indices = arrays.indices
+        costs = arrays.costs
+
+        num = len(arrays.vertices)
+        dist = np.full(num, np.inf)
+        first_hop = np.full(num, -1, dtype=int)
+        parent_edge = np.full(num, -1, dtype=int)
+        closed = [False] * num
+
+        counter = count()
+        # (cost-along-path, counter, vertex id, first hop, CSR entry of the last edge)
+        fringe = [(0, next(counter), source, -1, -1)]
+
+        while fringe:
+            cost, _, v, hop, edge_k = heapq.heappop(fringe)
+            if closed[v]:
+                continue
+
+            closed[v] = True
+            dist[v] = cost
+            first_hop[v] = hop
+            parent_edge[v] = edge_k
+
+            for k in range(indptr[v], indptr[v+1]):
+                child = indices[k]
+                if not closed[child]:
+                    heapq.heappush(fringe, (cost + costs[k], next(counter), child, child if v == source else hop, k))
+
+        tree = ShortestPathTree(arrays, source, dist, first_hop, parent_edge)
+        self._last_tree = (arrays, source, tree)
+
+        return tree
+
+    def _nearest(self, coords: np.ndarray, k: int):
+        """
+        indices and distances of the k closest vertices to each row of coords, with ties broken by the lower vertex index
+        """
+        tree = self._get_kdtree()
+        num = min(k + self._TIE_CANDIDATES - 1, len(self.vertices))
+
+        _, idx = tree.query(coords, k=num)
+        idx = idx.reshape(len(coords), num)
+
+        # Recompute the distances exactly like the original linear search, then sort stably by (distance, index)
+        diff = coords[:, None, :] - tree.data[idx]
+        dist = np.linalg.norm(diff, axis=-1)
+        order = np.lexsort((idx, dist), axis=-1)[:, :k]
+
+        rows = np.arange(len(coords))[:, None]
+        return idx[rows, order], dist[rows, order]
+
     def search(self, coords: np.ndarray):
         """
         search a waypoint that is the closest to the the given coordinates
         """
-        min_dist = np.inf
-        min_idx = None
+        if not self.vertices:
+            return None
 
-        for idx, v in enumerate(self.vertices):
-            dist = np.linalg.norm(np.array(coords)[:2] - v.coords)
-            if dist < min_dist:
-                min_idx = idx
-                min_dist = dist
+        idx, _ = self._nearest(np.array(coords, dtype=float)[None, :2], 1)
 
-        return min_idx
+        return int(idx[0, 0])
+
+    def search_batch(self, coords: np.ndarray) -> np.ndarray:
+        """
+        search the closest waypoint for every row of an (N, 2) array of coordinates
+        """
+        coords = np.array(coords, dtype=float).reshape(len(coords), -1)[:, :2]
+        if not self.vertices or len(coords) == 0:
+            return np.zeros(0, dtype=int) if len(coords) == 0 else np.full(len(coords), -1)
+
+        idx, _ = self._nearest(coords, 1)
+
+        return idx[:, 0]
+
+    def search_k(self, coords: np.ndarray, k: int):
+        """
+        search the k waypoints that are the closest to the given coordinates, closest first
+        """
+        if not self.vertices:
+            return []
+
+        idx, _ = self._nearest(np.array(coords, dtype=float)[None, :2], min(k, len(self.vertices)))
+
+        return [int(i) for i in idx[0]]
 
     def add_waypoint_list(self, waypoint_list: np.ndarray):
         """
@@ -115,6 +346,8 @@ class WaypointsGraph(object):
         # Add the list of vertices and edges to the graph
         self.vertices.extend(v_list)
         self.edges.extend(e_list)
+
+        self.invalidate_search_index()
             
     def connect(self, coords_v1: np.ndarray, coords_v2: np.ndarray):
         """
@@ -245,14 +478,27 @@ class WaypointsGraph(object):
 
         return dist
 
+    def _get_segment_index(self) -> SegmentIndex:
+        """
+        grid index over the edges, rebuilt when the edge list has been replaced or resized
+        """
+        key = (id(self.edges), len(self.edges))
+        if getattr(self, '_segment_index', None) is None or getattr(self, '_segment_index_key', None) != key:
+            v1 = np.array([e.v1.coords for e in self.edges], dtype=float).reshape(-1, 2)
+            v2 = np.array([e.v2.coords for e in self.edges], dtype=float).reshape(-1, 2)
+            self._segment_index = SegmentIndex(v1, v2)
+            self._segment_index_key = key
+
+        return self._segment_index
+
     def dist_to_graph(self, target_coords: np.ndarray):
         """
         calculate the minimal distance from a traget point to the entire graph
         """
-        min_dist = np.inf
-        for e in self.edges:
-            dist = self._dist_to_edge(target_coords, e)
-            if dist < min_dist:
-                min_dist = dist
+        return self._get_segment_index().query(target_coords)
 
-        return min_dist
\ No newline at end of file
+    def dist_to_graph_batch(self, target_coords: np.ndarray) -> np.ndarray:
+        """
+        calculate the minimal distance from every row of an (N, 2) array of points to the entire graph
+        """
+        return self._get_segment_index().query_batch(target_coords)
\ No newline at end of file
@@ -0,0 +1,87 @@
+from collections import OrderedDict
+from typing import Hashable, Tuple
+
+import numpy as np
+
+from parksim.route_planner.graph import WaypointsGraph
+
+class RefPathCache(object):
+    """
+    LRU cache of finished reference paths (x_ref, y_ref, yaw_ref) on one waypoints graph.
+
+    Most vehicles start from the entrance and drive to one of a few hundred spots, so the same A* solution and spline are computed again and again. Paths are stored as read-only float64 arrays together with any extra planning decisions (e.g. whether to overshoot the spot). The least recently used paths are dropped once either max_entries or max_bytes is exceeded.
+    """
+    def __init__(self, max_entries: int = 2048, max_bytes: int = 64 * 2**20):
+        """
+        max_entries: maximal number of cached paths
+        max_bytes: maximal total size of the cached arrays
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self.graph: WaypointsGraph = None
+        self.entries: OrderedDict = OrderedDict()
+        self.nbytes = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        self.entries.clear()
+        self.nbytes = 0
+
+    def _bind(self, graph: WaypointsGraph):
+        """
+        paths are only valid for the graph they were planned on
+        """
+        if graph is not self.graph:
+            self.clear()
+            self.graph = graph
+
+    def get(self, graph: WaypointsGraph, key: Hashable):
+        """
+        (x_ref, y_ref, yaw_ref, extra) stored for key, or None
+        """
+        self._bind(graph)
+
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+
+        return entry
+
+    def put(self, graph: WaypointsGraph, key: Hashable, x_ref: np.ndarray, y_ref: np.ndarray, yaw_ref: np.ndarray, extra=None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, object]:
+        """
+        store a path and return the stored entry. Float64 arrays are stored without copying and become read-only
+        """
+        self._bind(graph)
+
+        arrays = []
+        for a in (x_ref, y_ref, yaw_ref):
+            a = np.ascontiguousarray(a, dtype=np.float64)
+            a.setflags(write=False)
+            arrays.append(a)
+        entry = (arrays[0], arrays[1], arrays[2], extra)
+        size = sum(a.nbytes for a in arrays)
+
+        if key in self.entries:
+            self.nbytes -= sum(a.nbytes for a in self.entries.pop(key)[:3])
+
+        if size > self.max_bytes or self.max_entries <= 0:
+            return entry
+
+        self.entries[key] = entry
+        self.nbytes += size
+
+        while len(self.entries) > self.max_entries or self.nbytes > self.max_bytes:
+            _, old = self.entries.popitem(last=False)
+            self.nbytes -= sum(a.nbytes for a in old[:3])
+
+        return entry
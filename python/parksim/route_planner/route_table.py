@@ -0,0 +1,208 @@
+"""
+
+All-pairs shortest path table of a WaypointsGraph.
+
+The parking lot graph is static, so the shortest distance and the next vertex on the shortest path between every pair of vertices can be computed once offline. Routes are then read from the table in O(path length). Run this module to store the table of a graph pickle next to it, where parksim.utils.map_assets picks it up. The table records a signature of the graph it was built for; `plan_route` falls back to A* when the graph has been modified since.
+
+"""
+import argparse
+import os
+import pickle
+import zlib
+from pathlib import Path
+from typing import List
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import shortest_path
+
+from parksim.route_planner.a_star import AStarGraph, AStarPlanner
+from parksim.route_planner.graph import GraphArrays, WaypointsGraph
+
+def route_table_path(graph_path: str) -> str:
+    """
+    Where the route table of a waypoints graph pickle is stored: <name>_routes.npz next to the pickle
+    """
+    return os.path.splitext(graph_path)[0] + '_routes.npz'
+
+def graph_signature(arrays: GraphArrays) -> int:
+    """
+    Checksum of the vertex coordinates and the adjacency, to tell whether a table belongs to a graph
+    """
+    signature = zlib.crc32(np.ascontiguousarray(arrays.coords, dtype=np.float64).tobytes())
+    signature = zlib.crc32(np.ascontiguousarray(arrays.indptr, dtype=np.int64).tobytes(), signature)
+    signature = zlib.crc32(np.ascontiguousarray(arrays.indices, dtype=np.int64).tobytes(), signature)
+    signature = zlib.crc32(np.ascontiguousarray(arrays.costs, dtype=np.float64).tobytes(), signature)
+
+    return signature
+
+class RouteTable(object):
+    """
+    Shortest path distances and next hops between all pairs of vertices
+    """
+    def __init__(self, dist: np.ndarray, next_hop: np.ndarray, signature: int):
+        """
+        dist: (V, V) shortest path distances, inf if there is no path
+        next_hop: (V, V) vertex after s on the shortest path from s to t, -1 if there is no path or s == t
+        signature: graph_signature of the graph the table was built for
+        """
+        self.dist = dist
+        self.next_hop = next_hop
+        self.signature = int(signature)
+
+        # GraphArrays object that was last checked against the signature
+        self._checked_arrays = None
+
+    @staticmethod
+    def build(graph: WaypointsGraph) -> 'RouteTable':
+        """
+        Build the table with scipy's csgraph Dijkstra. Distances are the same as A*, but when several paths have the same cost, the table may choose a different one than A* does
+        """
+        arrays = graph.get_arrays()
+        num = len(arrays.vertices)
+
+        # Keep the cheapest of parallel edges. Explicit zero entries are kept as zero-cost edges by csgraph
+        rows = np.repeat(np.arange(num), np.diff(arrays.indptr))
+        order = np.lexsort((arrays.costs, arrays.indices, rows))
+        rows, cols, costs = rows[order], arrays.indices[order], arrays.costs[order]
+        first = np.ones(len(rows), dtype=bool)
+        first[1:] = (rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1])
+        rows, cols, costs = rows[first], cols[first], costs[first]
+
+        indptr = np.zeros(num + 1, dtype=np.int64)
+        np.add.at(indptr, rows + 1, 1)
+        matrix = csr_matrix((costs, cols, np.cumsum(indptr)), shape=(num, num))
+
+        # Dijkstra on the reversed graph: the predecessor of s in the tree rooted at t is the vertex after s on the shortest path from s to t
+        dist_rev, pred_rev = shortest_path(matrix.T.tocsr(), method='D', directed=True, return_predecessors=True)
+        dist = np.ascontiguousarray(dist_rev.T)
+        next_hop = np.ascontiguousarray(pred_rev.T)
+        next_hop[next_hop < 0] = -1
+
+        return RouteTable(dist, next_hop.astype(np.int32), graph_signature(arrays))
+
+    def matches(self, graph: WaypointsGraph) -> bool:
+        """
+        whether the table was built for the current state of the graph
+        """
+        arrays = graph.get_arrays()
+        if arrays is self._checked_arrays:
+            return True
+
+        if len(arrays.vertices) != len(self.dist) or graph_signature(arrays) != self.signature:
+            return False
+
+        self._checked_arrays = arrays
+        return True
+
+    def distance(self, start: int, goal: int) -> float:
+        return float(self.dist[start, goal])
+
+    def route(self, start: int, goal: int) -> List[int]:
+        """
+        vertex ids on the shortest path from start to goal, both included. Empty if there is no path
+        """
+        if start == goal:
+            return [start]
+        if not np.isfinite(self.dist[start, goal]):
+            return []
+
+        route = [start]
+        v = start
+        while v != goal:
+            v = int(self.next_hop[v, goal])
+            route.append(v)
+
+        return route
+
+    def first_direction(self, graph: WaypointsGraph, start: int, goal: int) -> np.ndarray:
+        """
+        unit vector along the first edge of the shortest path. Zero if start == goal or there is no path
+        """
+        if start == goal or self.next_hop[start, goal] < 0:
+            return np.zeros(2)
+
+        arrays = graph.get_arrays()
+        vector = arrays.coords[self.next_hop[start, goal]] - arrays.coords[start]
+
+        return vector / np.linalg.norm(vector)
+
+    def astar_graph(self, graph: WaypointsGraph, start: int, goal: int) -> AStarGraph:
+        """
+        the shortest path as an AStarGraph, like AStarPlanner.solve
+        """
+        route = self.route(start, goal)
+        if not route:
+            raise Exception('Path is not found')
+
+        arrays = graph.get_arrays()
+        edges = []
+        for u, v in zip(route[:-1], route[1:]):
+            # The cheapest edge from u to v
+            ks = range(arrays.indptr[u], arrays.indptr[u+1])
+            k = min((k for k in ks if arrays.indices[k] == v), key=lambda k: arrays.costs[k])
+            edges.append(arrays.edges[k])
+
+        return AStarGraph(edges)
+
+    def save(self, path: str):
+        np.savez(path, dist=self.dist, next_hop=self.next_hop, signature=np.array(self.signature, dtype=np.int64))
+
+    @staticmethod
+    def load(path: str) -> 'RouteTable':
+        data = np.load(path)
+        return RouteTable(data['dist'], data['next_hop'], int(data['signature']))
+
+def plan_route(graph: WaypointsGraph, start: int, goal: int) -> AStarGraph:
+    """
+    Shortest path between two vertex ids of the graph. Uses the route table attached to the graph if it still matches the graph, otherwise A*
+    """
+    table: RouteTable = getattr(graph, 'route_table', None)
+    if table is not None and table.matches(graph):
+        return table.astar_graph(graph, start, goal)
+
+    return AStarPlanner(graph.vertices[start], graph.vertices[goal], graph=graph).solve()
+
+def plan_dist_dir_batch(graph: WaypointsGraph, vehicle_coords: np.ndarray, heading: float, target_coords_list: List[np.ndarray], return_paths: bool = False):
+    """
+    Distance of the shortest path from the vertex nearest the vehicle to the vertex nearest each target, and the cosine between the vehicle heading and the first edge of that path (0 if the two vertices are the same). All targets are read from one shortest path tree of the vehicle vertex
+
+    target_coords_list: the coordinates of goals. list of np array (x, y)
+    return_paths: also return the AStarGraph of every path
+    """
+    if len(target_coords_list) == 0:
+        return (np.zeros(0), np.zeros(0), []) if return_paths else (np.zeros(0), np.zeros(0))
+
+    current_vertex_idx = graph.search(np.array(vehicle_coords))
+    spot_vertex_idx = graph.search_batch(np.array(target_coords_list))
+
+    tree = graph.shortest_path_tree(current_vertex_idx)
+
+    dists = tree.dist[spot_vertex_idx]
+    if not np.all(np.isfinite(dists)):
+        raise Exception('Path is not found')
+
+    heading_vector = np.array([np.cos(heading), np.sin(heading)])
+    dirs = tree.directions(spot_vertex_idx) @ heading_vector
+
+    if return_paths:
+        return dists, dirs, [AStarGraph(tree.path_edges(idx)) for idx in spot_vertex_idx]
+
+    return dists, dirs
+
+def main():
+    home_path = str(Path.home())
+
+    parser = argparse.ArgumentParser(description='Precompute the all-pairs route table of a waypoints graph pickle')
+    parser.add_argument('--graph', default=home_path + '/ParkSim/data/waypoints_graph.pickle')
+    args = parser.parse_args()
+
+    with open(args.graph, 'rb') as f:
+        graph = pickle.load(f)['graph']
+
+    output_path = route_table_path(args.graph)
+    RouteTable.build(graph).save(output_path)
+    print("Route table saved to %s" % output_path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+def point_to_segment_distances(points: np.ndarray, v1: np.ndarray, v2: np.ndarray) -> np.ndarray:
+    """
+    Distance from every point to every segment
+
+    points: (M, 2) coordinates
+    v1, v2: (E, 2) start and end points of the segments
+    :return: (M, E) distances
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    v1 = np.asarray(v1, dtype=float).reshape(-1, 2)
+    v2 = np.asarray(v2, dtype=float).reshape(-1, 2)
+
+    seg = v2 - v1 # (E, 2)
+    seg_len_sq = np.einsum('ij,ij->i', seg, seg)
+
+    # Projection of each point onto each segment, as a fraction of the segment length
+    rel = points[:, None, :] - v1[None, :, :] # (M, E, 2)
+    along = np.einsum('mei,ei->me', rel, seg)
+    frac = np.divide(along, seg_len_sq, out=np.zeros_like(along), where=seg_len_sq > 0)
+    frac = np.clip(frac, 0, 1)
+
+    closest = v1[None, :, :] + frac[:, :, None] * seg[None, :, :]
+
+    return np.linalg.norm(points[:, None, :] - closest, axis=-1)
+
+class SegmentIndex(object):
+    """
+    Uniform grid bucket index over line segments for nearest-segment distance queries
+    """
+    def __init__(self, v1: np.ndarray, v2: np.ndarray, cell_size: float = None):
+        """
+        v1, v2: (E, 2) start and end points of the segments
+        cell_size: side length of a grid cell. Defaults to twice the mean segment length
+        """
+        self.v1 = np.asarray(v1, dtype=float).reshape(-1, 2)
+        self.v2 = np.asarray(v2, dtype=float).reshape(-1, 2)
+
+        if cell_size is None:
+            mean_len = np.mean(np.linalg.norm(self.v2 - self.v1, axis=1)) if len(self.v1) > 0 else 0
+            cell_size = 2 * mean_len if mean_len > 0 else 1.0
+        self.cell_size = cell_size
+
+        # Put every segment in all cells covered by its bounding box
+        self.cells: Dict[Tuple[int, int], List[int]] = {}
+        lo = np.floor(np.minimum(self.v1, self.v2) / cell_size).astype(int)
+        hi = np.floor(np.maximum(self.v1, self.v2) / cell_size).astype(int)
+        for k, ((lx, ly), (hx, hy)) in enumerate(zip(lo.tolist(), hi.tolist())):
+            for cx in range(lx, hx + 1):
+                for cy in range(ly, hy + 1):
+                    self.cells.setdefault((cx, cy), []).append(k)
+
+        if self.cells:
+            keys = np.array(list(self.cells.keys()))
+            self.cell_min = keys.min(axis=0)
+            self.cell_max = keys.max(axis=0)
+
+    def _ring(self, cx: int, cy: int, r: int):
+        """
+        cells at Chebyshev distance exactly r from (cx, cy)
+        """
+        if r == 0:
+            yield (cx, cy)
+            return
+
+        for x in range(cx - r, cx + r + 1):
+            yield (x, cy - r)
+            yield (x, cy + r)
+        for y in range(cy - r + 1, cy + r):
+            yield (cx - r, y)
+            yield (cx + r, y)
+
+    def query(self, point: np.ndarray) -> float:
+        """
+        minimal distance from a point to all segments. inf if there are no segments
+        """
+        if not self.cells:
+            return np.inf
+
+        point = np.asarray(point, dtype=float)[:2]
+        cx, cy = np.floor(point / self.cell_size).astype(int).tolist()
+
+        # No need to go further than the ring that covers the whole grid
+        max_r = int(max(abs(cx - self.cell_min[0]), abs(cx - self.cell_max[0]), abs(cy - self.cell_min[1]), abs(cy - self.cell_max[1])))
+
+        best = np.inf
+        seen = set()
+        for r in range(max_r + 1):
+            candidates = []
+            for cell in self._ring(cx, cy, r):
+                for k in self.cells.get(cell, []):
+                    if k not in seen:
+                        seen.add(k)
+                        candidates.append(k)
+
+            if candidates:
+                best = min(best, point_to_segment_distances(point, self.v1[candidates], self.v2[candidates]).min())
+
+            # Segments outside rings 0..r are at least r cells away
+            if best <= r * self.cell_size:
+                break
+
+        return float(best)
+
+    def query_batch(self, points: np.ndarray) -> np.ndarray:
+        """
+        minimal distance from every point to all segments
+        """
+        points = np.asarray(points, dtype=float).reshape(len(points), -1)[:, :2]
+        if len(self.v1) == 0:
+            return np.full(len(points), np.inf)
+
+        if len(points) * len(self.v1) <= 1e6:
+            # Small enough to compare everything at once
+            return point_to_segment_distances(points, self.v1, self.v2).min(axis=1)
+
+        return np.array([self.query(p) for p in points])
@@ -0,0 +1,150 @@
+from collections.abc import Mapping
+from typing import Dict, Set
+
+import numpy as np
+
+class RefPoseHandle(object):
+    """
+    VehiclePrediction-like handle on the reference path of one slot of a FleetSnapshot. `x`, `y` and `psi` are the arrays stored in the snapshot, without copying
+    """
+    __slots__ = ('snapshot', 'slot')
+
+    def __init__(self, snapshot: 'FleetSnapshot', slot: int):
+        self.snapshot = snapshot
+        self.slot = slot
+
+    @property
+    def x(self):
+        return self.snapshot.x_ref[self.slot]
+
+    @property
+    def y(self):
+        return self.snapshot.y_ref[self.slot]
+
+    @property
+    def psi(self):
+        return self.snapshot.yaw_ref[self.slot]
+
+class SnapshotColumn(Mapping):
+    """
+    Read-only mapping from vehicle id to one column of a FleetSnapshot
+    """
+    def __init__(self, snapshot: 'FleetSnapshot', column: str):
+        self.snapshot = snapshot
+        self.column = column
+
+    def __getitem__(self, id):
+        return getattr(self.snapshot, self.column)[self.snapshot.slots[id]]
+
+    def __iter__(self):
+        return iter(self.snapshot.slots)
+
+    def __len__(self):
+        return len(self.snapshot.slots)
+
+    def __contains__(self, id):
+        return id in self.snapshot.slots
+
+def _parking_progress(vehicle) -> str:
+    if vehicle.is_parking():
+        return "PARKING"
+    elif vehicle.is_unparking():
+        return "UNPARKING"
+    else:
+        return ""
+
+class FleetSnapshot(object):
+    """
+    Shared, read-only table of what vehicles in a simulator know about each other, one row per vehicle slot.
+
+    Every vehicle used to copy the information of every other vehicle into its own `other_*` dicts each tick. Here the rows of all active vehicles are copied once at the start of a tick (`set_active`), and the row of a vehicle is copied again right after it is solved (`update`). Vehicles attached to the snapshot get `other_*` mappings that index these arrays, so each vehicle sees the same values as a copy made right before its turn, without any per-vehicle copying.
+    """
+    # Columns and their dtypes. Reference paths have different lengths and are kept as objects
+    COLUMNS = {
+        'state': object,
+        'x_ref': object,
+        'y_ref': object,
+        'yaw_ref': object,
+        'ref_pose': object,
+        'ref_v': float,
+        'target_idx': int,
+        'priority': float,
+        'task': object,
+        'parking_progress': object,
+        'parking_start_time': float,
+        'is_braking': bool,
+        'waiting_for': int,
+        'is_all_done': bool,
+    }
+
+    def __init__(self, capacity: int = 64):
+        """
+        capacity: initial number of slots. The arrays grow automatically
+        """
+        self.capacity = capacity
+        for column, dtype in self.COLUMNS.items():
+            setattr(self, column, np.empty(capacity, dtype=dtype))
+
+        # Slot of every vehicle id
+        self.slots: Dict[int, int] = {}
+        self.vehicles: Dict[int, object] = {}
+        self.active_ids: Set[int] = set()
+
+        # Mappings handed to the vehicles as their other_* attributes
+        self.views = {column: SnapshotColumn(self, column) for column in self.COLUMNS if column not in ['x_ref', 'y_ref', 'yaw_ref']}
+
+    def _grow(self):
+        """
+        double the capacity of all arrays
+        """
+        new_capacity = 2 * self.capacity
+        for column, dtype in self.COLUMNS.items():
+            new = np.empty(new_capacity, dtype=dtype)
+            new[:self.capacity] = getattr(self, column)
+            setattr(self, column, new)
+
+        self.capacity = new_capacity
+
+    def add(self, vehicle):
+        """
+        give a vehicle a slot and copy its row
+        """
+        if len(self.slots) == self.capacity:
+            self._grow()
+
+        slot = len(self.slots)
+        self.slots[vehicle.vehicle_id] = slot
+        self.vehicles[vehicle.vehicle_id] = vehicle
+        self.ref_pose[slot] = RefPoseHandle(self, slot)
+
+        self.update(vehicle)
+
+    def update(self, vehicle):
+        """
+        copy the current information of one vehicle into its row
+        """
+        slot = self.slots[vehicle.vehicle_id]
+
+        self.state[slot] = vehicle.state
+        self.x_ref[slot] = vehicle.x_ref
+        self.y_ref[slot] = vehicle.y_ref
+        self.yaw_ref[slot] = vehicle.yaw_ref
+        self.ref_v[slot] = vehicle.v_ref
+        self.target_idx[slot] = vehicle.target_idx
+        self.priority[slot] = vehicle.priority
+        self.task[slot] = vehicle.current_task
+        self.parking_progress[slot] = _parking_progress(vehicle)
+        self.parking_start_time[slot] = vehicle.parking_start_time
+        self.is_braking[slot] = vehicle.is_braking
+        self.waiting_for[slot] = vehicle.waiting_for
+        self.is_all_done[slot] = vehicle.is_all_done()
+
+    def set_active(self, active_vehicles: Dict[int, object]):
+        """
+        Start a new tick: set the vehicles that are active and copy their rows
+
+        active_vehicles: Dict[vehicle_id, vehicle]
+        """
+        self.active_ids = set(active_vehicles)
+        for vehicle in active_vehicles.values():
+            self.update(vehicle)
@@ -0,0 +1,206 @@
+import numpy as np
+
+from parksim.controller.stanley_controller import normalize_angles
+from parksim.pytypes import PlanarState, VehicleState
+
+class _FleetColumn(object):
+    """
+    Descriptor that reads and writes one column of a FleetState at the slot of the owning view
+    """
+    def __init__(self, column: str):
+        self.column = column
+
+    def __get__(self, view, owner=None):
+        if view is None:
+            return self
+        return getattr(view._fleet, self.column)[view._slot]
+
+    def __set__(self, view, value):
+        getattr(view._fleet, self.column)[view._slot] = value
+
+class _SlotView(object):
+    __slots__ = ('_fleet', '_slot')
+
+    def __init__(self, fleet: 'FleetState', slot: int):
+        self._fleet = fleet
+        self._slot = slot
+
+class _PositionView(_SlotView):
+    __slots__ = ()
+    x = _FleetColumn('x')
+    y = _FleetColumn('y')
+
+class _OrientationView(_SlotView):
+    __slots__ = ()
+    psi = _FleetColumn('psi')
+
+class _VelocityView(_SlotView):
+    __slots__ = ()
+    v = _FleetColumn('v')
+
+class _ActuationView(_SlotView):
+    __slots__ = ()
+    u_a = _FleetColumn('u_a')
+    u_steer = _FleetColumn('u_steer')
+
+class FleetStateView(object):
+    """
+    VehicleState-like handle on one slot of a FleetState.
+
+    `view.x.x`, `view.x.y`, `view.e.psi`, `view.v.v`, `view.u.u_a` and `view.u.u_steer` read and write the fleet arrays directly, so vehicles and controllers can use it in place of a VehicleState. `copy` gives a detached PlanarState, use `to_vehicle_state` at API boundaries that need a real VehicleState.
+    """
+    __slots__ = ('fleet', 'slot', 'x', 'e', 'v', 'u')
+
+    def __init__(self, fleet: 'FleetState', slot: int):
+        self.fleet = fleet
+        self.slot = slot
+
+        self.x = _PositionView(fleet, slot)
+        self.e = _OrientationView(fleet, slot)
+        self.v = _VelocityView(fleet, slot)
+        self.u = _ActuationView(fleet, slot)
+
+    def to_vehicle_state(self) -> VehicleState:
+        return self.fleet.get_state(self.slot)
+
+    def copy(self) -> PlanarState:
+        return self.fleet.get_planar_state(self.slot)
+
+class FleetState(object):
+    """
+    Structure-of-arrays store for the planar state of all vehicles in the simulator, indexed by vehicle slot.
+
+    Vehicles queue their control inputs (`queue_step`) or their next maneuver state (`queue_state`) during a tick, then `step` updates all of them at once. Every vehicle therefore decides against the same pre-tick states.
+    """
+    def __init__(self, capacity: int = 64):
+        """
+        capacity: initial number of slots. The arrays grow automatically
+        """
+        self.num_slots = 0
+        self.capacity = capacity
+
+        # State and input
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.psi = np.zeros(capacity)
+        self.v = np.zeros(capacity)
+        self.u_a = np.zeros(capacity)
+        self.u_steer = np.zeros(capacity)
+
+        # Per-vehicle model parameters
+        self.wb = np.ones(capacity)
+        self.max_steer = np.zeros(capacity)
+        self.dt = np.zeros(capacity)
+
+        # Slots that should be integrated at the next step()
+        self.step_pending = np.zeros(capacity, dtype=bool)
+
+        # States queued with queue_state, assigned at the next step()
+        self.next_state = np.zeros((capacity, 6))
+        self.state_pending = np.zeros(capacity, dtype=bool)
+
+    def _grow(self):
+        """
+        double the capacity of all arrays
+        """
+        new_capacity = 2 * self.capacity
+        for column in ['x', 'y', 'psi', 'v', 'u_a', 'u_steer', 'wb', 'max_steer', 'dt', 'step_pending', 'next_state', 'state_pending']:
+            old = getattr(self, column)
+            new = np.zeros((new_capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.capacity] = old
+            setattr(self, column, new)
+
+        self.capacity = new_capacity
+
+    def add(self, state: VehicleState, wb: float, max_steer: float, dt: float) -> FleetStateView:
+        """
+        add a vehicle to the fleet and return the view on its slot
+
+        state: the initial state of the vehicle
+        wb: wheelbase
+        max_steer: steering limit
+        dt: integration time step
+        """
+        if self.num_slots == self.capacity:
+            self._grow()
+
+        slot = self.num_slots
+        self.num_slots += 1
+
+        self.set_state(slot, state)
+        self.wb[slot] = wb
+        self.max_steer[slot] = max_steer
+        self.dt[slot] = dt
+
+        return FleetStateView(self, slot)
+
+    def set_state(self, slot: int, state: VehicleState):
+        self.x[slot] = state.x.x
+        self.y[slot] = state.x.y
+        self.psi[slot] = state.e.psi
+        self.v[slot] = state.v.v
+        self.u_a[slot] = state.u.u_a
+        self.u_steer[slot] = state.u.u_steer
+
+    def get_state(self, slot: int) -> VehicleState:
+        """
+        build a VehicleState snapshot of one slot
+        """
+        state = VehicleState()
+        state.x.x = float(self.x[slot])
+        state.x.y = float(self.y[slot])
+        state.e.psi = float(self.psi[slot])
+        state.v.v = float(self.v[slot])
+        state.u.u_a = float(self.u_a[slot])
+        state.u.u_steer = float(self.u_steer[slot])
+
+        return state
+
+    def get_planar_state(self, slot: int) -> PlanarState:
+        """
+        build a PlanarState snapshot of one slot
+        """
+        return PlanarState(float(self.x[slot]), float(self.y[slot]), float(self.psi[slot]), float(self.v[slot]), float(self.u_a[slot]), float(self.u_steer[slot]))
+
+    def queue_step(self, slot, acceleration, delta):
+        """
+        Store the inputs of one vehicle (or arrays of slots and inputs). The state is advanced at the next step()
+        """
+        self.u_a[slot] = acceleration
+        self.u_steer[slot] = delta
+        self.step_pending[slot] = True
+
+    def queue_state(self, slot: int, x: float, y: float, psi: float, v: float, u_a: float, u_steer: float):
+        """
+        Store the next state of one vehicle that follows a precomputed maneuver. It is assigned at the next step(), together with the integrated vehicles
+        """
+        self.next_state[slot] = (x, y, psi, v, u_a, u_steer)
+        self.state_pending[slot] = True
+
+    def step(self):
+        """
+        Advance all queued vehicles with the same bicycle model as StanleyController.step, and assign the queued maneuver states
+        """
+        idx = np.flatnonzero(self.state_pending[:self.num_slots])
+        if idx.size > 0:
+            for k, column in enumerate([self.x, self.y, self.psi, self.v, self.u_a, self.u_steer]):
+                column[idx] = self.next_state[idx, k]
+            self.state_pending[idx] = False
+
+        idx = np.flatnonzero(self.step_pending[:self.num_slots])
+        if idx.size == 0:
+            return
+
+        psi = self.psi[idx]
+        v = self.v[idx]
+        dt = self.dt[idx]
+
+        # don't turn too much
+        delta = np.clip(self.u_steer[idx], -self.max_steer[idx], self.max_steer[idx])
+
+        self.x[idx] += v * np.cos(psi) * dt
+        self.y[idx] += v * np.sin(psi) * dt
+        self.psi[idx] = normalize_angles(psi + v / self.wb[idx] * np.tan(delta) * dt)
+        self.v[idx] = v + self.u_a[idx] * dt
+
+        self.step_pending[idx] = False
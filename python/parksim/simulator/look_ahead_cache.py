@@ -0,0 +1,140 @@
+from typing import Dict
+
+import numpy as np
+
+from parksim.controller.stanley_controller import StanleyController
+from parksim.controller.batch_stanley_controller import BatchStanleyController
+from parksim.pytypes import PlanarState
+
+def predictor_params(predictor: StanleyController) -> tuple:
+    """
+    Everything a StanleyController rollout depends on besides the vehicle: gains, time step, search window, wheelbase and steering limit
+    """
+    return (predictor.k, predictor.Kp, predictor.Kp_braking, predictor.dt, predictor.search_window, predictor.search_behind, predictor.L, predictor.max_steer)
+
+class LookAheadCache(object):
+    """
+    Look-ahead trajectories of all active vehicles for the current tick, shared by every vehicle's crash check.
+
+    Without it, each vehicle re-simulates itself and all of its neighbors in will_crash_with, so the same rollout is computed once per observer. Here every trajectory is rolled out once per tick (all vehicles together with a BatchStanleyController) and stored as a (T, 3) array of x, y, psi. Each vehicle is rolled out with the parameters of its own motion_predictor. A vehicle that changes its plan, speed or state later in the tick is rolled out again the next time its trajectory is requested.
+    """
+    def __init__(self, look_ahead_timesteps: int):
+        """
+        look_ahead_timesteps: number of steps T in each trajectory
+        """
+        self.look_ahead_timesteps = look_ahead_timesteps
+
+        # Batch controllers by predictor_params, so vehicles with different predictors are rolled out with their own parameters
+        self.batch_predictors: Dict[tuple, BatchStanleyController] = {}
+
+        self.vehicles = {}
+        self.trajectories: Dict[int, np.ndarray] = {}
+        self.keys: Dict[int, tuple] = {}
+
+    def _batch_predictor(self, params: tuple) -> BatchStanleyController:
+        if params not in self.batch_predictors:
+            batch_predictor = BatchStanleyController()
+            (batch_predictor.k, batch_predictor.Kp, batch_predictor.Kp_braking, batch_predictor.dt,
+                batch_predictor.search_window, batch_predictor.search_behind, batch_predictor.L, batch_predictor.max_steer) = params
+            self.batch_predictors[params] = batch_predictor
+
+        return self.batch_predictors[params]
+
+    def predicts_like(self, predictor: StanleyController, vehicle_ids) -> bool:
+        """
+        True if the trajectories of these vehicles are what `predictor` would roll out, i.e. their motion predictors have the same parameters
+        """
+        params = predictor_params(predictor)
+        return all(predictor_params(self.vehicles[id].motion_predictor) == params for id in vehicle_ids)
+
+    def _key(self, vehicle):
+        """
+        Everything a rollout depends on. The trajectory is stale once this changes
+        """
+        state = vehicle.state
+        return (vehicle.ref_path_version, vehicle.v_ref, vehicle.is_braking, vehicle.target_idx,
+            state.x.x, state.x.y, state.e.psi, state.v.v)
+
+    def _rollout(self, vehicle) -> np.ndarray:
+        """
+        Roll out one vehicle, exactly like will_crash_with does
+        """
+        trajectory = np.empty((self.look_ahead_timesteps, 3))
+        look_ahead_state = PlanarState.from_state(vehicle.state)
+
+        if len(vehicle.x_ref) == 0:
+            # Nothing to follow
+            trajectory[:] = [look_ahead_state.x.x, look_ahead_state.x.y, look_ahead_state.e.psi]
+            return trajectory
+
+        motion_predictor = vehicle.motion_predictor
+        for t in range(self.look_ahead_timesteps):
+            motion_predictor.set_ref_pose(vehicle.x_ref, vehicle.y_ref, vehicle.yaw_ref)
+            motion_predictor.set_ref_v(vehicle.v_ref)
+            motion_predictor.set_target_idx(vehicle.target_idx)
+            ai, di, _ = motion_predictor.solve(look_ahead_state, vehicle.is_braking)
+            motion_predictor.step(look_ahead_state, ai, di)
+
+            trajectory[t] = [look_ahead_state.x.x, look_ahead_state.x.y, look_ahead_state.e.psi]
+
+        return trajectory
+
+    def update(self, vehicles: Dict):
+        """
+        Start a new tick: drop all trajectories and roll out every vehicle at once
+
+        vehicles: Dict[vehicle_id, vehicle] of the active vehicles
+        """
+        self.vehicles = vehicles
+        self.trajectories = {}
+        self.keys = {}
+
+        groups: Dict[tuple, list] = {}
+        for vehicle in vehicles.values():
+            if len(vehicle.x_ref) > 0:
+                groups.setdefault(predictor_params(vehicle.motion_predictor), []).append(vehicle)
+
+        for params, to_roll in groups.items():
+            self._roll_out_batch(self._batch_predictor(params), to_roll)
+
+    def _roll_out_batch(self, batch_predictor: BatchStanleyController, to_roll: list):
+        """
+        Roll out vehicles that share the same predictor parameters in one batch
+        """
+        x = np.array([vehicle.state.x.x for vehicle in to_roll], dtype=float)
+        y = np.array([vehicle.state.x.y for vehicle in to_roll], dtype=float)
+        psi = np.array([vehicle.state.e.psi for vehicle in to_roll], dtype=float)
+        v = np.array([vehicle.state.v.v for vehicle in to_roll], dtype=float)
+        braking = np.array([vehicle.is_braking for vehicle in to_roll], dtype=bool)
+        target_idx = np.array([vehicle.target_idx for vehicle in to_roll], dtype=int)
+
+        batch_predictor.set_ref_pose([vehicle.x_ref for vehicle in to_roll], [vehicle.y_ref for vehicle in to_roll], [vehicle.yaw_ref for vehicle in to_roll])
+        batch_predictor.set_ref_v([vehicle.v_ref for vehicle in to_roll])
+
+        trajectories = np.empty((len(to_roll), self.look_ahead_timesteps, 3))
+        for t in range(self.look_ahead_timesteps):
+            # will_crash_with starts every step from the vehicle's current target index
+            batch_predictor.set_target_idx(target_idx)
+            ai, di, _ = batch_predictor.solve(x, y, psi, v, braking)
+            x, y, psi, v = batch_predictor.step(x, y, psi, v, ai, di)
+
+            trajectories[:, t, 0] = x
+            trajectories[:, t, 1] = y
+            trajectories[:, t, 2] = psi
+
+        for vehicle, trajectory in zip(to_roll, trajectories):
+            self.trajectories[vehicle.vehicle_id] = trajectory
+            self.keys[vehicle.vehicle_id] = self._key(vehicle)
+
+    def get(self, vehicle_id: int) -> np.ndarray:
+        """
+        Get the (T, 3) look-ahead trajectory of a vehicle. Read only, the array is shared by all callers
+        """
+        vehicle = self.vehicles[vehicle_id]
+        key = self._key(vehicle)
+
+        if self.keys.get(vehicle_id) != key:
+            self.trajectories[vehicle_id] = self._rollout(vehicle)
+            self.keys[vehicle_id] = key
+
+        return self.trajectories[vehicle_id]
@@ -0,0 +1,71 @@
+class SimulatorObserver(object):
+    """
+    Base class for objects that watch a RuleBasedSimulator while it runs.
+
+    The simulator calls the hooks below once per tick. Nothing here is required to render anything, so a simulator without observers runs headless and steps as fast as the CPU allows.
+    """
+    def is_running(self) -> bool:
+        """
+        Return False to pause the simulation. The simulator keeps calling `wait` until every observer is running again.
+        """
+        return True
+
+    def wait(self):
+        """
+        Called repeatedly while the simulation is paused
+        """
+        return
+
+    def on_step(self, simulator):
+        """
+        Called after all vehicles have been solved for the current tick
+        """
+        return
+
+    def on_finish(self, simulator):
+        """
+        Called once when the simulation loop exits
+        """
+        return
+
+class VisualizerObserver(SimulatorObserver):
+    """
+    Draw the simulation in a RealtimeVisualizer (dearpygui) window
+    """
+    def __init__(self, vis):
+        """
+        vis: RealtimeVisualizer object
+        """
+        self.vis = vis
+
+    def is_running(self):
+        return self.vis.is_running()
+
+    def wait(self):
+        # Keep the GUI responsive while paused
+        self.vis.render()
+
+    def on_step(self, simulator):
+        self.vis.clear_frame()
+
+        fills = []
+        for vehicle in simulator.vehicles:
+
+            if vehicle.is_all_done():
+                fill = (0, 0, 0, 255)
+            elif vehicle.is_braking:
+                fill = (255, 0, 0, 255)
+            elif vehicle.current_task in ["PARK", "UNPARK"]:
+                fill = (255, 128, 0, 255)
+            else:
+                fill = (0, 255, 0, 255)
+
+            fills.append(fill)
+            # self.vis.draw_line(points=np.array([vehicle.x_ref, vehicle.y_ref]).T, color=(39,228,245, 193))
+            on_vehicle_text =  str(vehicle.vehicle_id) + ":"
+            on_vehicle_text += "N" if vehicle.priority is None else str(round(vehicle.priority, 3))
+            # self.vis.draw_text([vehicle.state.x.x - 2, vehicle.state.x.y + 2], on_vehicle_text, size=25)
+
+        self.vis.draw_vehicles(states=[vehicle.state for vehicle in simulator.vehicles], fills=fills)
+
+        self.vis.render()
@@ -1,31 +1,34 @@
 import time
+import argparse
 from typing import Dict, List
 
-from dlp.dataset import Dataset
-from dlp.visualizer import Visualizer as DlpVisualizer
-
 from pathlib import Path
 
 import pickle
 
 import numpy as np
-from parksim.pytypes import VehicleState
+from parksim.pytypes import PlanarState
 
 from parksim.vehicle_types import VehicleBody, VehicleConfig, VehicleTask
+from parksim.simulator_types import SimulatorParams
+from parksim.controller.batch_stanley_controller import BatchStanleyController
 from parksim.route_planner.graph import WaypointsGraph
-from parksim.visualizer.realtime_visualizer import RealtimeVisualizer
+from parksim.route_planner.ref_path_cache import RefPathCache
+from parksim.simulator.fleet_snapshot import FleetSnapshot
+from parksim.simulator.fleet_state import FleetState
+from parksim.simulator.look_ahead_cache import LookAheadCache
+from parksim.utils import map_assets
+from parksim.utils.spatial_grid import SpatialGrid
+from parksim.simulator.observers import SimulatorObserver, VisualizerObserver
 
 from parksim.agents.rule_based_stanley_vehicle import RuleBasedStanleyVehicle
 
-np.random.seed(39) # ones with interesting cases: 20, 33, 44, 60
-
 # These parameters should all become ROS param for simulator and vehicle
 spots_data_path = '/ParkSim/data/spots_data.pickle'
 offline_maneuver_path = '/ParkSim/data/parking_maneuvers.pickle'
 waypoints_graph_path = '/ParkSim/data/waypoints_graph.pickle'
 intent_model_path = '/ParkSim/data/smallRegularizedCNN_L0.068_01-29-2022_19-50-35.pth'
 entrance_coords = [14.38, 76.21]
-block_spots = [43, 44, 45]
 
 overshoot_ranges = {'pointed_right': [(42, 48), (67, 69), (92, 94), (113, 115), (134, 136), (159, 161), (184, 186), (205, 207), (226, 228), (251, 253), (276, 278), (297, 299), (318, 320), (343, 345)],
                     'pointed_left': [(64, 66), (89, 91), (156, 158), (181, 183), (248, 250), (273, 275), (340, 342)]}
@@ -34,19 +37,41 @@ north_spot_idx_ranges = [(0, 41), (67, 91), (113, 133), (159, 183), (205, 225),
 spot_y_offset = 5
 
 class RuleBasedSimulator(object):
-    def __init__(self, dataset: Dataset, vis: RealtimeVisualizer):
-        self.dlpvis = DlpVisualizer(dataset)
+    def __init__(self, dataset: 'Dataset' = None, vis: 'RealtimeVisualizer' = None, observers: List[SimulatorObserver] = None, params: SimulatorParams = SimulatorParams()):
+        """
+        dataset: (Optional) DLP dataset to take the parking spots, parked cars and waypoints from. Without it, the spots and the waypoints graph are read from the map asset files and all spots start empty, so dlp is not needed
+        vis: (Optional) RealtimeVisualizer to draw the simulation in
+        observers: (Optional) other SimulatorObserver objects. Without vis and observers, the simulator runs headless
+        params: spawning and scenario parameters. The simulator and its vehicles draw from one np.random.Generator seeded with params.seed
+        """
+        self.params = params
+        self.rng = np.random.default_rng(params.seed)
+
+        self.observers: List[SimulatorObserver] = [] if observers is None else list(observers)
+        if vis is not None:
+            self.observers.append(VisualizerObserver(vis))
+
+        if dataset is not None:
+            from dlp.visualizer import Visualizer as DlpVisualizer
+            self.dlpvis = DlpVisualizer(dataset)
+
+            self.parking_spaces, self.occupied = self._gen_occupancy()
+
+            self.graph = WaypointsGraph()
+            self.graph.setup_with_vis(self.dlpvis)
+            self.entrance_coords = entrance_coords
+        else:
+            self.dlpvis = None
 
-        self.vis = vis
+            home_path = str(Path.home())
+            self.parking_spaces = map_assets.get_spots_data(home_path + spots_data_path)['parking_spaces']
+            self.occupied = np.zeros(len(self.parking_spaces), dtype=bool)
 
-        self.parking_spaces, self.occupied = self._gen_occupancy()
+            self.graph, self.entrance_coords, _ = map_assets.get_waypoints_graph(home_path + waypoints_graph_path)
 
-        for idx in block_spots:
+        for idx in params.blocked_spots:
             self.occupied[idx] = True
 
-        self.graph = WaypointsGraph()
-        self.graph.setup_with_vis(self.dlpvis)
-
         # Save data to offline files
         # with open('waypoints_graph.pickle', 'wb') as f:
         #     data_to_save = {'graph': self.graph, 
@@ -61,23 +86,35 @@ class RuleBasedSimulator(object):
         #     pickle.dump(data_to_save, f)
 
         # spawn stuff
-        
-        spawn_interval_mean = 5 # Mean time for exp distribution
-        spawn_interval_min = 2 # Min time for each spawn
-
-        spawn_entering = 3 # number of vehicles to enter
-        spawn_exiting = 3 # number of vehicles to exit
+        self.spawn_entering_time = sorted(self.rng.exponential(params.spawn_interval_mean, params.spawn_entering))
+        for i in range(params.spawn_entering):
+            self.spawn_entering_time[i] += i * params.spawn_interval_min
 
-        self.spawn_entering_time = sorted(np.random.exponential(spawn_interval_mean, spawn_entering))
-        for i in range(spawn_entering):
-            self.spawn_entering_time[i] += i * spawn_interval_min
-
-        self.spawn_exiting_time = sorted(np.random.exponential(spawn_interval_mean, spawn_exiting))
+        self.spawn_exiting_time = sorted(self.rng.exponential(params.spawn_interval_mean, params.spawn_exiting))
 
         self.num_vehicles = 0
         self.vehicles: List[RuleBasedStanleyVehicle] = []
 
-        self.max_simulation_time = 150
+        # x, y, psi, v and inputs of all vehicles, integrated once per tick
+        self.fleet = FleetState()
+
+        # What vehicles know about each other, copied into one table per tick and after each vehicle is solved
+        self.fleet_snapshot = FleetSnapshot()
+
+        # Cruising vehicles queue themselves here during a tick and are controlled in one batch. Parking and unparking vehicles queue their next state in the fleet
+        self.batch_controller = BatchStanleyController()
+        self.pending_updates: List[RuleBasedStanleyVehicle] = []
+
+        # Look-ahead trajectories for crash checking, rolled out once per tick and shared by all vehicles
+        self.look_ahead_cache = LookAheadCache(look_ahead_timesteps=VehicleConfig().look_ahead_timesteps)
+
+        # Reference paths planned by any vehicle, reused by later vehicles with the same start vertex and goal
+        self.ref_path_cache = RefPathCache()
+
+        # Vehicle positions bucketed once per tick for nearby vehicle queries. No vehicle moves before update_states, so the grid stays exact for the whole tick
+        self.neighbor_grid = SpatialGrid(cell_size=VehicleConfig().crash_check_radius)
+
+        self.max_simulation_time = params.max_simulation_time
 
         self.time = 0.0
         self.loops = 0
@@ -86,6 +123,21 @@ class RuleBasedSimulator(object):
         self.did_crash = False
         self.crash_polytopes = None
 
+        if params.prewarm_ref_paths:
+            self.prewarm_ref_path_cache()
+
+    def prewarm_ref_path_cache(self, vehicle_config: VehicleConfig=VehicleConfig()):
+        """
+        plan the reference paths from the entrance vertex, where all entering vehicles start, to every free spot
+        """
+        planner = RuleBasedStanleyVehicle(vehicle_id=0, vehicle_body=VehicleBody(), vehicle_config=vehicle_config)
+        planner.load_parking_spaces(spots_data_path=spots_data_path)
+        planner.load_graph(waypoints_graph_path=waypoints_graph_path)
+        planner.set_ref_path_cache(self.ref_path_cache)
+
+        entrance_vertex_idx = planner.graph.search([self.entrance_coords[0] - vehicle_config.offset, self.entrance_coords[1]])
+        planner.prewarm_ref_path_cache(entrance_vertex_idx, np.nonzero(~self.occupied)[0].tolist())
+
     def _gen_occupancy(self):
 
         # Spot guide (note: NOT VERTICES) — the i in parking_spaces[i]
@@ -119,7 +171,7 @@ class RuleBasedSimulator(object):
         self.num_vehicles += 1
 
         # NOTE: These lines are here for now. In the ROS implementation, they will all be in the vehicle node, no the simulator node
-        vehicle = RuleBasedStanleyVehicle(vehicle_id=self.num_vehicles, vehicle_body=vehicle_body, vehicle_config=vehicle_config)
+        vehicle = RuleBasedStanleyVehicle(vehicle_id=self.num_vehicles, vehicle_body=vehicle_body, vehicle_config=vehicle_config, rng=self.rng)
         vehicle.load_parking_spaces(spots_data_path=spots_data_path)
         vehicle.load_graph(waypoints_graph_path=waypoints_graph_path)
         vehicle.load_maneuver(offline_maneuver_path=offline_maneuver_path)
@@ -132,50 +184,86 @@ class RuleBasedSimulator(object):
             park_task = VehicleTask(name="PARK", target_spot_index=spot_index)
             task_profile = [cruise_task, park_task]
 
-            state = VehicleState()
-            state.x.x = entrance_coords[0] - vehicle_config.offset
-            state.x.y = entrance_coords[1]
-            state.e.psi = - np.pi/2
+            state = PlanarState(x=self.entrance_coords[0] - vehicle_config.offset, y=self.entrance_coords[1], psi=- np.pi/2)
 
             vehicle.set_vehicle_state(state=state)
             vehicle.set_task_profile(task_profile=task_profile)
         else:
             unpark_task = VehicleTask(name="UNPARK")
             cruise_task = VehicleTask(
-                name="CRUISE", v_cruise=5, target_coords=np.array(entrance_coords))
+                name="CRUISE", v_cruise=5, target_coords=np.array(self.entrance_coords))
             task_profile = [unpark_task, cruise_task]
 
             vehicle.set_vehicle_state(spot_index=abs(spot_index))
             vehicle.set_task_profile(task_profile)
 
+        # Move the vehicle state into the fleet arrays
+        state_view = self.fleet.add(vehicle.state, wb=vehicle.controller.L, max_steer=vehicle.controller.max_steer, dt=vehicle.controller.dt)
+        vehicle.set_vehicle_state(state=state_view)
+        vehicle.set_method_to_update_state(self.pending_updates.append)
+        vehicle.set_method_to_set_state(self.queue_state)
+        vehicle.set_look_ahead_cache(self.look_ahead_cache)
+        vehicle.set_ref_path_cache(self.ref_path_cache)
+        vehicle.set_method_to_query_neighbors(self.neighbor_grid.query)
+        self.fleet_snapshot.add(vehicle)
+        vehicle.attach_fleet_snapshot(self.fleet_snapshot)
+
         vehicle.execute_next_task()
 
         self.vehicles.append(vehicle)
     
 
+    def queue_state(self, vehicle: RuleBasedStanleyVehicle, x: float, y: float, psi: float, v: float, u_a: float, u_steer: float):
+        """
+        Next state of a vehicle that follows a parking or unparking maneuver, applied in update_states
+        """
+        self.fleet.queue_state(vehicle.state.slot, x, y, psi, v, u_a, u_steer)
+
+    def update_states(self):
+        """
+        Run the Stanley controller for all vehicles queued during this tick, then advance the fleet. Maneuver states queued during the tick are applied in the same step
+        """
+        vehicles = self.pending_updates
+
+        if vehicles:
+            slots = np.array([vehicle.state.slot for vehicle in vehicles])
+
+            self.batch_controller.set_ref_pose([vehicle.x_ref for vehicle in vehicles], [vehicle.y_ref for vehicle in vehicles], [vehicle.yaw_ref for vehicle in vehicles])
+            self.batch_controller.set_ref_v([vehicle.v_ref for vehicle in vehicles])
+            self.batch_controller.set_target_idx([vehicle.target_idx for vehicle in vehicles])
+
+            braking = np.array([vehicle.is_braking for vehicle in vehicles])
+            ai, di, target_idx = self.batch_controller.solve(self.fleet.x[slots], self.fleet.y[slots], self.fleet.psi[slots], self.fleet.v[slots], braking)
+
+            for vehicle, idx in zip(vehicles, target_idx):
+                vehicle.set_target_idx(int(idx))
+
+            self.fleet.queue_step(slots, ai, di)
+
+            vehicles.clear()
+
+        self.fleet.step()
+
     def run(self):
         # while not run out of time and we have not reached the last waypoint yet
         while self.max_simulation_time >= self.time:
 
-            if not self.vis.is_running():
-                self.vis.render()
+            if not all(observer.is_running() for observer in self.observers):
+                for observer in self.observers:
+                    observer.wait()
                 continue
-
-            # clear visualizer
-            self.vis.clear_frame()
-
             
             # spawn vehicles
             if self.spawn_entering_time and self.time > self.spawn_entering_time[0]:
                 empty_spots = [i for i in range(len(self.occupied)) if not self.occupied[i]]
-                chosen_spot = np.random.choice(empty_spots)
+                chosen_spot = self.rng.choice(empty_spots)
                 self.add_vehicle(chosen_spot)
                 self.occupied[chosen_spot] = True
                 self.spawn_entering_time.pop(0)
             
             if self.spawn_exiting_time and self.time > self.spawn_exiting_time[0]:
                 empty_spots = [i for i in range(len(self.occupied)) if not self.occupied[i]]
-                chosen_spot = np.random.choice(empty_spots)
+                chosen_spot = self.rng.choice(empty_spots)
                 self.add_vehicle(-1 * chosen_spot)
                 self.occupied[chosen_spot] = True
                 self.spawn_exiting_time.pop(0)
@@ -200,6 +288,12 @@ class RuleBasedSimulator(object):
             # intent_pred_results = []
             # ===========
 
+            self.fleet_snapshot.set_active(active_vehicles)
+            self.look_ahead_cache.update(active_vehicles)
+
+            active_slots = [vehicle.state.slot for vehicle in active_vehicles.values()]
+            self.neighbor_grid.build(list(active_vehicles.keys()), self.fleet.x[active_slots], self.fleet.y[active_slots])
+
             for vehicle_id in active_vehicles:
                 vehicle = active_vehicles[vehicle_id]
 
@@ -208,32 +302,26 @@ class RuleBasedSimulator(object):
                 vehicle.set_method_to_change_central_occupancy(self.occupied)
 
                 vehicle.solve(time=self.time)
+                # Vehicles solved after this one see its new decisions, as with a copy made right before their turn
+                self.fleet_snapshot.update(vehicle)
                 # ========== For real-time prediction only
                 # result = vehicle.predict_intent()
                 # intent_pred_results.append(result)
                 # ===========
+
+            # Control and advance all vehicles in one vectorized update, so every vehicle solved against the same snapshot
+            self.update_states()
+
+            # Record the new states and start the tasks that follow finished maneuvers
+            for vehicle in active_vehicles.values():
+                vehicle.post_step(time=self.time)
             
             self.loops += 1
             self.time += 0.1
 
-            # Visualize
-            for vehicle in self.vehicles:
+            for observer in self.observers:
+                observer.on_step(self)
 
-                if vehicle.is_all_done():
-                    fill = (0, 0, 0, 255)
-                elif vehicle.is_braking:
-                    fill = (255, 0, 0, 255)
-                elif vehicle.current_task in ["PARK", "UNPARK"]:
-                    fill = (255, 128, 0, 255)
-                else:
-                    fill = (0, 255, 0, 255)
-
-                self.vis.draw_vehicle(state=vehicle.state, fill=fill)
-                # self.vis.draw_line(points=np.array([vehicle.x_ref, vehicle.y_ref]).T, color=(39,228,245, 193))
-                on_vehicle_text =  str(vehicle.vehicle_id) + ":"
-                on_vehicle_text += "N" if vehicle.priority is None else str(round(vehicle.priority, 3))
-                # self.vis.draw_text([vehicle.state.x.x - 2, vehicle.state.x.y + 2], on_vehicle_text, size=25)
-                
             # ========== For real-time prediction only
             # likelihood_radius = 15
             # for result in intent_pred_results:
@@ -244,10 +332,17 @@ class RuleBasedSimulator(object):
             #         self.vis.draw_circle(center=coords, radius=likelihood_radius*distribution[i], color=(255,65,255,255))
             #         self.vis.draw_text([coords[0]-2, coords[1]], prob, 15)
             # ===========
-    
-            self.vis.render()
+
+        for observer in self.observers:
+            observer.on_finish(self)
 
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--headless', help='run without the realtime visualizer, as fast as possible', action='store_true')
+    args = parser.parse_args()
+
+    from dlp.dataset import Dataset
+
     # Load dataset
     ds = Dataset()
 
@@ -256,11 +351,18 @@ def main():
     ds.load(home_path + '/dlp-dataset/data/DJI_0012')
     print("Dataset loaded.")
 
-    vis = RealtimeVisualizer(ds, VehicleBody())
+    if args.headless:
+        vis = None
+    else:
+        # Only import dearpygui when we actually render
+        from parksim.visualizer.realtime_visualizer import RealtimeVisualizer
+        vis = RealtimeVisualizer(ds, VehicleBody())
 
     simulator = RuleBasedSimulator(dataset=ds, vis=vis)
 
+    start_time = time.time()
     simulator.run()
+    print("Simulated %.1f s in %.1f s of wall time." % (simulator.time, time.time() - start_time))
 
 
 
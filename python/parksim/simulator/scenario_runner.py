@@ -0,0 +1,188 @@
+"""
+
+Run many RuleBasedSimulator scenarios in parallel and collect their KPIs.
+
+Each scenario is a SimulatorParams with its own seed. Scenarios are fanned out over a ProcessPoolExecutor; every worker loads the dataset (if any) once and gives each scenario its own np.random.Generator, so results do not depend on which worker ran them or in what order.
+
+"""
+import argparse
+import csv
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from parksim.simulator.observers import SimulatorObserver
+from parksim.simulator.rule_based_simulator import RuleBasedSimulator
+from parksim.simulator_types import SimulatorParams
+from parksim.utils.rectangle_to_circles import circles_collide
+from parksim.vehicle_types import VehicleBody
+
+class KPIObserver(SimulatorObserver):
+    """
+    Collect per-run KPIs: crashes, throughput, time to park and deadlocks
+    """
+    # Tasks in which a stopped vehicle is blocked. Vehicles waiting to unpark or idling are stopped on purpose
+    DRIVING_TASKS = ["CRUISE", "PARK"]
+
+    def __init__(self, vehicle_body: VehicleBody = VehicleBody(), stall_speed: float = 0.1, deadlock_time: float = 10.0):
+        """
+        vehicle_body: body used to check crashes between vehicles
+        stall_speed: vehicles slower than this are considered stopped
+        deadlock_time: a vehicle that has been stopped in a driving task this long when the run ends counts as deadlocked
+        """
+        self.vehicle_body = vehicle_body
+        self.stall_speed = stall_speed
+        self.deadlock_time = deadlock_time
+
+        self.spawn_time: Dict[int, float] = {}
+        self.done_time: Dict[int, float] = {}
+        # Last time each vehicle was moving or not in a driving task
+        self.last_moving_time: Dict[int, float] = {}
+        self.crashed_pairs = set()
+
+        self.kpis: Dict[str, float] = {}
+
+    def on_step(self, simulator):
+        now = simulator.time
+
+        active = []
+        for vehicle in simulator.vehicles:
+            id = vehicle.vehicle_id
+            if id not in self.spawn_time:
+                self.spawn_time[id] = now
+                self.last_moving_time[id] = now
+
+            if vehicle.is_all_done():
+                self.done_time.setdefault(id, now)
+                continue
+
+            active.append(vehicle)
+            if abs(vehicle.state.v.v) > self.stall_speed or vehicle.current_task not in self.DRIVING_TASKS:
+                self.last_moving_time[id] = now
+
+        if len(active) < 2:
+            return
+
+        # Check all pairs of active vehicles at once
+        ids = [vehicle.vehicle_id for vehicle in active]
+        poses = np.array([[vehicle.state.x.x, vehicle.state.x.y, vehicle.state.e.psi] for vehicle in active])
+        collide = circles_collide(poses[:, None, :], poses[None, :, :], self.vehicle_body)
+        for i, j in zip(*np.nonzero(np.triu(collide, k=1))):
+            self.crashed_pairs.add((ids[i], ids[j]))
+
+    def on_finish(self, simulator):
+        vehicles = {vehicle.vehicle_id: vehicle for vehicle in simulator.vehicles}
+
+        # Entering vehicles are the ones whose last task is PARK
+        park_times = [self.done_time[id] - self.spawn_time[id] for id, vehicle in vehicles.items()
+            if id in self.done_time and vehicle.task_history and vehicle.task_history[-1].name == "PARK"]
+
+        deadlocked = [id for id, vehicle in vehicles.items()
+            if vehicle.current_task in self.DRIVING_TASKS and simulator.time - self.last_moving_time.get(id, simulator.time) >= self.deadlock_time]
+
+        self.kpis = {
+            'sim_time': simulator.time,
+            'num_vehicles': len(vehicles),
+            'completed': len(self.done_time),
+            'throughput_per_min': 60 * len(self.done_time) / simulator.time if simulator.time > 0 else 0.0,
+            'crashes': len(self.crashed_pairs),
+            'mean_time_to_park': float(np.mean(park_times)) if park_times else float('nan'),
+            'deadlocks': len(deadlocked),
+        }
+
+# Dataset of this worker process, loaded once by _init_worker. None runs the scenarios on the map asset files
+_dataset: 'Dataset' = None
+
+def _init_worker(dataset_path: str):
+    global _dataset
+    if dataset_path is None:
+        _dataset = None
+        return
+
+    from dlp.dataset import Dataset
+    _dataset = Dataset()
+    _dataset.load(dataset_path)
+
+def run_scenario(params: SimulatorParams) -> Dict:
+    """
+    Run one scenario headless in this worker and return its parameters and KPIs as one row
+    """
+    kpi_observer = KPIObserver()
+    simulator = RuleBasedSimulator(dataset=_dataset, observers=[kpi_observer], params=params)
+
+    start_time = time.time()
+    simulator.run()
+
+    row = {
+        'seed': params.seed,
+        'spawn_entering': params.spawn_entering,
+        'spawn_exiting': params.spawn_exiting,
+        'spawn_interval_mean': params.spawn_interval_mean,
+        'blocked_spots': ' '.join(str(spot) for spot in params.blocked_spots),
+    }
+    row.update(kpi_observer.kpis)
+    row['wall_time'] = time.time() - start_time
+
+    return row
+
+def make_sweep(seeds: List[int], spawn_entering: List[int] = [3], spawn_exiting: List[int] = [3], spawn_interval_mean: List[float] = [5], blocked_spots: List[List[int]] = [[43, 44, 45]], max_simulation_time: float = 150) -> List[SimulatorParams]:
+    """
+    All combinations of the given seeds and spawn parameters
+    """
+    return [SimulatorParams(spawn_entering=n_enter, spawn_exiting=n_exit, spawn_interval_mean=interval, blocked_spots=list(blocked), max_simulation_time=max_simulation_time, seed=seed)
+        for n_enter, n_exit, interval, blocked, seed in product(spawn_entering, spawn_exiting, spawn_interval_mean, blocked_spots, seeds)]
+
+def run_scenarios(scenarios: List[SimulatorParams], dataset_path: str = None, max_workers: int = None) -> List[Dict]:
+    """
+    Run scenarios in a process pool. The results are in the same order as the scenarios
+
+    dataset_path: path of the DLP scene to load in every worker. None uses the map asset files, which does not need dlp
+    max_workers: number of processes. None uses one per CPU
+    """
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(dataset_path,)) as executor:
+        return list(executor.map(run_scenario, scenarios))
+
+def write_results(results: List[Dict], path: str):
+    """
+    Save the results table as csv
+    """
+    if not results:
+        return
+
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(results[0].keys()))
+        writer.writeheader()
+        writer.writerows(results)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seeds', help='number of seeds per parameter combination', type=int, default=8)
+    parser.add_argument('--spawn-entering', help='numbers of entering vehicles to sweep', type=int, nargs='+', default=[3])
+    parser.add_argument('--spawn-exiting', help='numbers of exiting vehicles to sweep', type=int, nargs='+', default=[3])
+    parser.add_argument('--spawn-interval-mean', help='mean spawn intervals to sweep', type=float, nargs='+', default=[5])
+    parser.add_argument('--blocked-spots', help='spots to block, the same in every scenario', type=int, nargs='*', default=[43, 44, 45])
+    parser.add_argument('--max-simulation-time', type=float, default=150)
+    parser.add_argument('--workers', help='number of worker processes', type=int, default=None)
+    parser.add_argument('--output', help='csv file to write the results to', default='scenario_results.csv')
+    args = parser.parse_args()
+
+    home_path = str(Path.home())
+    dataset_path = home_path + '/dlp-dataset/data/DJI_0012'
+
+    scenarios = make_sweep(seeds=list(range(args.seeds)), spawn_entering=args.spawn_entering, spawn_exiting=args.spawn_exiting,
+        spawn_interval_mean=args.spawn_interval_mean, blocked_spots=[args.blocked_spots], max_simulation_time=args.max_simulation_time)
+
+    print("Running %d scenarios..." % len(scenarios))
+    start_time = time.time()
+    results = run_scenarios(scenarios, dataset_path, max_workers=args.workers)
+    print("Done in %.1f s of wall time." % (time.time() - start_time))
+
+    write_results(results, args.output)
+    print("Results saved to %s" % args.output)
+
+if __name__ == "__main__":
+    main()
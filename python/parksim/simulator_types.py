@@ -0,0 +1,22 @@
+from dataclasses import dataclass, field
+from typing import List
+
+from parksim.pytypes import PythonMsg
+
+@dataclass
+class SimulatorParams(PythonMsg):
+    """
+    Parameters of a RuleBasedSimulator scenario
+    """
+    spawn_entering: int = field(default=3) # number of vehicles to enter
+    spawn_exiting: int = field(default=3) # number of vehicles to exit
+    spawn_interval_mean: float = field(default=5) # Mean time for exp distribution
+    spawn_interval_min: float = field(default=2) # Min time for each spawn
+    blocked_spots: List[int] = field(default=None) # spots that are marked occupied at the start
+    max_simulation_time: float = field(default=150)
+    seed: int = field(default=39) # seed of the scenario's random generator. None seeds it from the OS. Ones with interesting cases: 20, 33, 44, 60
+    prewarm_ref_paths: bool = field(default=False) # plan the paths from the entrance to all free spots when the simulator is created
+
+    def __post_init__(self):
+        if self.blocked_spots is None:
+            self.blocked_spots = [43, 44, 45]
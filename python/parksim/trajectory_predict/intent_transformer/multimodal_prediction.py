@@ -45,10 +45,12 @@ def find_n_best_lanes(start_coords, global_heading, graph: WaypointsGraph, vis:
             if child not in visited:
                 fringe.append(child)
 
+    all_lanes = list(all_lanes)
+    astar_dists, astar_dirs = predictor.compute_Astar_dist_dir_batch(
+        current_state, [lane.coords for lane in all_lanes], global_heading)
+
     lanes = []
-    for lane in all_lanes:
-        astar_dist, astar_dir = predictor.compute_Astar_dist_dir(
-            current_state, lane.coords, global_heading)
+    for lane, astar_dist, astar_dir in zip(all_lanes, astar_dists, astar_dirs):
         heapq.heappush(lanes, (-astar_dir, astar_dist, lane.coords))
 
     return lanes
@@ -2,25 +2,52 @@ import numpy as np
 from parksim.pytypes import VehicleState
 from parksim.vehicle_types import VehicleBody
 
+def get_vehicle_corners_batch(x, y, psi, body) -> np.ndarray:
+    """
+    Corners of many vehicles at once
+
+    x, y, psi: arrays of shape (N,) with the center and heading of each vehicle
+    body: VehicleBody (or other polytope with vertices V) shared by all vehicles, or the body corners in the vehicle frame as a (4, 2) or (N, 4, 2) array
+    :return: (N, 4, 2) corners in the global frame
+    """
+    x = np.asarray(x, dtype=float).reshape(-1)
+    y = np.asarray(y, dtype=float).reshape(-1)
+    psi = np.asarray(psi, dtype=float).reshape(-1)
+    body_shape = np.asarray(getattr(body, 'V', body), dtype=float)
+
+    c = np.cos(psi)[:, None]
+    s = np.sin(psi)[:, None]
+    bx = body_shape[..., 0]
+    by = body_shape[..., 1]
+
+    corners = np.empty((len(x), 4, 2))
+    corners[..., 0] = c * bx - s * by + x[:, None]
+    corners[..., 1] = s * bx + c * by + y[:, None]
+
+    return corners
+
 def get_vehicle_corners(state: VehicleState=None, vehicle_body: VehicleBody=None) -> np.ndarray:
     
-    state_dict = {}
-    state_dict['center-x'] = state.x.x
-    state_dict['center-y'] = state.x.y
-    state_dict['heading'] = state.e.psi
-    state_dict['corners'] = vehicle_body.V
-
-    return get_vehicle_corners_from_dict(state_dict)
+    return get_vehicle_corners_batch(state.x.x, state.x.y, state.e.psi, vehicle_body)[0]
 
 def get_vehicle_corners_from_dict(state_dict):
     x = state_dict['center-x']
     y = state_dict['center-y']
     psi = state_dict['heading']
     body_shape = state_dict['corners']
-    center = np.array([x, y])
 
-    R = np.array([[np.cos(psi), -np.sin(psi)], [np.sin(psi), np.cos(psi)]])
+    return get_vehicle_corners_batch(x, y, psi, body_shape)[0]
+
+def get_vehicle_corners_from_dicts(state_dicts) -> np.ndarray:
+    """
+    (N, 4, 2) corners of a list of state dicts, like get_vehicle_corners_from_dict for each of them
+    """
+    if len(state_dicts) == 0:
+        return np.zeros((0, 4, 2))
 
-    corners = (R @ body_shape.T).T
+    x = [d['center-x'] for d in state_dicts]
+    y = [d['center-y'] for d in state_dicts]
+    psi = [d['heading'] for d in state_dicts]
+    body_shape = np.stack([np.asarray(d['corners'], dtype=float) for d in state_dicts])
 
-    return corners + center
\ No newline at end of file
+    return get_vehicle_corners_batch(x, y, psi, body_shape)
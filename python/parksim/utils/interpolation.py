@@ -14,7 +14,8 @@ def interpolate_states_inputs(states: VehiclePrediction, new_t: np.ndarray):
     result.v = np.interp(result.t, states.t, states.v)
 
     sparse_time, sparse_psi = remove_close_timesteps(states.t, states.psi)
-    old_r = R.from_euler('z', sparse_psi, degrees=False)
+    # One angle per rotation, as an (N, 1) array
+    old_r = R.from_euler('z', np.reshape(sparse_psi, (-1, 1)), degrees=False)
     slerp = Slerp(sparse_time, old_r)
 
     result.psi = slerp(new_t).as_euler('xyz', degrees=False)[:, 2]
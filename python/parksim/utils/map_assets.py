@@ -0,0 +1,111 @@
+"""
+
+Process-wide store of the map assets: parking spots data, waypoints graph and offline maneuver library.
+
+Each file is unpickled the first time it is requested and the same objects are handed out to every caller afterwards, so all vehicles of a simulator share one copy. The assets are treated as immutable: callers must not modify them. Call `invalidate` after the files on disk change.
+
+A route table saved next to a graph pickle as `<name>_routes.npz` (run parksim.route_planner.route_table to write it) is attached to the graph.
+
+Paths ending in MAP_FILE_EXTENSION are read from a binary map file (see parksim.utils.map_file) instead of a pickle. The same map file can be given for all three assets; it is memory-mapped once.
+
+"""
+import os
+import pickle
+import threading
+from typing import Dict, Tuple
+
+import numpy as np
+
+from parksim.path_planner.offline_maneuver import OfflineManeuver
+from parksim.route_planner.graph import WaypointsGraph
+from parksim.route_planner.route_table import RouteTable, route_table_path
+from parksim.utils.map_file import MAP_FILE_EXTENSION, MapFile
+
+_assets: Dict[Tuple[str, str], object] = {}
+_lock = threading.RLock()
+
+def _get(kind: str, path: str, loader):
+    """
+    Return the asset of this kind at path, loading it with loader(path) if it is not in the store yet
+    """
+    key = (kind, path)
+    with _lock:
+        if key not in _assets:
+            _assets[key] = loader(path)
+        return _assets[key]
+
+def _is_map_file(path: str) -> bool:
+    return path.endswith(MAP_FILE_EXTENSION)
+
+def get_map_file(path: str) -> MapFile:
+    """
+    path: absolute path to a binary map file
+    """
+    return _get('map_file', path, MapFile)
+
+def _load_spots_data(path: str) -> Dict:
+    if _is_map_file(path):
+        return get_map_file(path).spots_data()
+
+    with open(path, 'rb') as f:
+        data = pickle.load(f)
+
+    # Shared by all vehicles, so make accidental writes fail loudly
+    data['parking_spaces'] = np.asarray(data['parking_spaces'])
+    data['parking_spaces'].setflags(write=False)
+
+    return data
+
+def _load_waypoints_graph(path: str) -> Tuple[WaypointsGraph, list, int]:
+    if _is_map_file(path):
+        graph, entrance_coords = get_map_file(path).build_graph()
+    else:
+        with open(path, 'rb') as f:
+            data = pickle.load(f)
+
+        graph = data['graph']
+        entrance_coords = data['entrance_coords']
+
+        table_path = route_table_path(path)
+        if os.path.exists(table_path):
+            graph.route_table = RouteTable.load(table_path)
+
+    return graph, entrance_coords, graph.search(entrance_coords)
+
+def get_spots_data(path: str) -> Dict:
+    """
+    Dict with 'parking_spaces', 'overshoot_ranges', 'north_spot_idx_ranges' and 'spot_y_offset'
+
+    path: absolute path to the spots data pickle
+    """
+    return _get('spots_data', path, _load_spots_data)
+
+def get_waypoints_graph(path: str) -> Tuple[WaypointsGraph, list, int]:
+    """
+    (graph, entrance_coords, entrance_vertex), where entrance_vertex is the index of the vertex closest to the entrance
+
+    path: absolute path to the waypoints graph pickle
+    """
+    return _get('waypoints_graph', path, _load_waypoints_graph)
+
+def get_offline_maneuver(path: str) -> OfflineManeuver:
+    """
+    path: absolute path to the parking maneuvers pickle
+    """
+    if _is_map_file(path):
+        return _get('offline_maneuver', path, lambda path: get_map_file(path).offline_maneuver())
+
+    return _get('offline_maneuver', path, OfflineManeuver)
+
+def invalidate(path: str = None):
+    """
+    Drop assets from the store so that they are loaded from disk again on the next request. Objects already handed out are not changed
+
+    path: only drop the assets loaded from this path. None drops everything
+    """
+    with _lock:
+        if path is None:
+            _assets.clear()
+        else:
+            for key in [key for key in _assets if key[1] == path]:
+                del _assets[key]
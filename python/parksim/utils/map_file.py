@@ -0,0 +1,226 @@
+"""
+
+Versioned binary map format for the ParkSim assets.
+
+One file holds the waypoints graph as CSR adjacency arrays, the parking spot table and the offline maneuver library. Layout:
+
+    8 bytes     magic b'PARKSIM\\0'
+    8 bytes     little-endian uint64, length of the JSON header
+    n bytes     JSON header: format version, metadata and the dtype, shape and offset of every array
+    ...         raw arrays, each aligned to ALIGNMENT bytes
+
+Arrays are read through np.memmap, so processes that load the same file share its pages.
+
+"""
+import argparse
+import json
+import pickle
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+
+from parksim.path_planner.offline_maneuver import OfflineManeuver
+from parksim.route_planner.graph import Edge, Vertex, WaypointsGraph
+from parksim.route_planner.route_table import RouteTable
+
+MAGIC = b'PARKSIM\x00'
+VERSION = 1
+ALIGNMENT = 64
+MAP_FILE_EXTENSION = '.pmap'
+
+def _aligned(n: int) -> int:
+    return (n + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def graph_to_arrays(graph: WaypointsGraph) -> Dict[str, np.ndarray]:
+    """
+    Convert a WaypointsGraph to arrays
+
+    vertex_coords: (V, 2) coordinates
+    indptr, indices, edge_cost: CSR adjacency. The children of vertex i are indices[indptr[i]:indptr[i+1]], in the same order as Vertex.children
+    edge_order: position of each CSR entry in graph.edges
+    """
+    vertex_idx = {id(v): i for i, v in enumerate(graph.vertices)}
+    edge_idx = {id(e): i for i, e in enumerate(graph.edges)}
+
+    indptr = np.zeros(len(graph.vertices) + 1, dtype=np.int64)
+    indices = []
+    edge_cost = []
+    edge_order = []
+    for i, v in enumerate(graph.vertices):
+        for child, e in zip(v.children, v.edges):
+            indices.append(vertex_idx[id(child)])
+            edge_cost.append(e.c)
+            edge_order.append(edge_idx[id(e)])
+        indptr[i + 1] = len(indices)
+
+    return {
+        'vertex_coords': np.array([v.coords for v in graph.vertices], dtype=np.float64).reshape(-1, 2),
+        'indptr': indptr,
+        'indices': np.array(indices, dtype=np.int64),
+        'edge_cost': np.array(edge_cost, dtype=np.float64),
+        'edge_order': np.array(edge_order, dtype=np.int64),
+    }
+
+def arrays_to_graph(vertex_coords: np.ndarray, indptr: np.ndarray, indices: np.ndarray, edge_cost: np.ndarray, edge_order: np.ndarray) -> WaypointsGraph:
+    """
+    Rebuild a WaypointsGraph from the arrays of graph_to_arrays
+    """
+    graph = WaypointsGraph()
+    graph.vertices = [Vertex(coords) for coords in vertex_coords]
+
+    edges = [None] * len(indices)
+    for i, v in enumerate(graph.vertices):
+        for k in range(indptr[i], indptr[i + 1]):
+            child = graph.vertices[indices[k]]
+            e = Edge(v1=v, v2=child, c=float(edge_cost[k]))
+            v.add_child(v=child, e=e)
+            edges[edge_order[k]] = e
+
+    graph.edges = edges
+
+    return graph
+
+def write_map_file(path: str, arrays: Dict[str, np.ndarray], meta: Dict):
+    """
+    Write arrays and JSON-serializable metadata to a map file
+    """
+    arrays = {name: np.ascontiguousarray(a) for name, a in arrays.items()}
+
+    # Offsets are relative to the start of the data section, which starts right after the aligned header
+    layout = {}
+    offset = 0
+    for name, a in arrays.items():
+        layout[name] = {'dtype': a.dtype.str, 'shape': list(a.shape), 'offset': offset}
+        offset = _aligned(offset + a.nbytes)
+
+    header = json.dumps({'version': VERSION, 'meta': meta, 'arrays': layout}).encode('utf-8')
+    data_start = _aligned(len(MAGIC) + 8 + len(header))
+
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(header)).astype('<u8').tobytes())
+        f.write(header)
+        for name, a in arrays.items():
+            f.seek(data_start + layout[name]['offset'])
+            f.write(a.tobytes())
+        # Pad the file so the last array is fully inside the mapped region
+        f.truncate(data_start + offset)
+
+class MapFile(object):
+    """
+    A loaded map file. The arrays are read-only views on a memory map of the file
+    """
+    def __init__(self, path: str):
+        self.path = path
+
+        with open(path, 'rb') as f:
+            magic = f.read(len(MAGIC))
+            if magic != MAGIC:
+                raise ValueError("%s is not a ParkSim map file" % path)
+            header_len = int(np.frombuffer(f.read(8), dtype='<u8')[0])
+            header = json.loads(f.read(header_len).decode('utf-8'))
+
+        if header['version'] != VERSION:
+            raise ValueError("%s has map format version %d, but only version %d is supported" % (path, header['version'], VERSION))
+
+        self.version = header['version']
+        self.meta = header['meta']
+
+        data_start = _aligned(len(MAGIC) + 8 + header_len)
+        buffer = np.memmap(path, dtype=np.uint8, mode='r')
+
+        self.arrays: Dict[str, np.ndarray] = {}
+        for name, spec in header['arrays'].items():
+            dtype = np.dtype(spec['dtype'])
+            count = int(np.prod(spec['shape'], dtype=np.int64))
+            start = data_start + spec['offset']
+            self.arrays[name] = buffer[start:start + count * dtype.itemsize].view(dtype).reshape(spec['shape'])
+
+    def build_graph(self) -> Tuple[WaypointsGraph, list]:
+        """
+        (graph, entrance_coords). The route table is attached to the graph if the file has one
+        """
+        graph = arrays_to_graph(self.arrays['vertex_coords'], self.arrays['indptr'], self.arrays['indices'], self.arrays['edge_cost'], self.arrays['edge_order'])
+
+        if 'route_dist' in self.arrays:
+            graph.route_table = RouteTable(self.arrays['route_dist'], self.arrays['route_next_hop'], self.meta['route_signature'])
+
+        return graph, self.meta['entrance_coords']
+
+    def spots_data(self) -> Dict:
+        """
+        The same dict as the spots data pickle
+        """
+        return {
+            'parking_spaces': self.arrays['parking_spaces'],
+            'overshoot_ranges': {key: [tuple(r) for r in ranges] for key, ranges in self.meta['overshoot_ranges'].items()},
+            'north_spot_idx_ranges': [tuple(r) for r in self.meta['north_spot_idx_ranges']],
+            'spot_y_offset': self.meta['spot_y_offset'],
+        }
+
+    def maneuver_library(self) -> Dict[Tuple[str, str, str, str], np.ndarray]:
+        """
+        The same dict as the parking maneuvers pickle. Every maneuver is a (7, T) view into the file
+        """
+        data = self.arrays['maneuver_data']
+        offsets = self.arrays['maneuver_offsets']
+
+        return {tuple(key): data[:, offsets[k]:offsets[k+1]] for k, key in enumerate(self.meta['maneuver_keys'])}
+
+    def offline_maneuver(self) -> OfflineManeuver:
+        return OfflineManeuver(lib=self.maneuver_library())
+
+def convert_pickles(spots_data_path: str, waypoints_graph_path: str, offline_maneuver_path: str, output_path: str, route_table: bool = True):
+    """
+    Convert the three asset pickles into one map file
+
+    route_table: also precompute the all-pairs route table of the graph and store it in the file
+    """
+    with open(spots_data_path, 'rb') as f:
+        spots_data = pickle.load(f)
+    with open(waypoints_graph_path, 'rb') as f:
+        graph_data = pickle.load(f)
+    with open(offline_maneuver_path, 'rb') as f:
+        maneuver_lib = pickle.load(f)
+
+    arrays = graph_to_arrays(graph_data['graph'])
+    arrays['parking_spaces'] = np.asarray(spots_data['parking_spaces'], dtype=np.float64)
+
+    keys = list(maneuver_lib.keys())
+    trajs = [np.asarray(maneuver_lib[key], dtype=np.float64) for key in keys]
+    arrays['maneuver_offsets'] = np.cumsum([0] + [traj.shape[1] for traj in trajs]).astype(np.int64)
+    arrays['maneuver_data'] = np.concatenate(trajs, axis=1) if trajs else np.zeros((7, 0))
+
+    meta = {
+        'entrance_coords': [float(c) for c in graph_data['entrance_coords']],
+        'overshoot_ranges': {key: [[int(i) for i in r] for r in ranges] for key, ranges in spots_data['overshoot_ranges'].items()},
+        'north_spot_idx_ranges': [[int(i) for i in r] for r in spots_data['north_spot_idx_ranges']],
+        'spot_y_offset': float(spots_data['spot_y_offset']),
+        'maneuver_keys': [list(key) for key in keys],
+    }
+
+    if route_table:
+        table = RouteTable.build(graph_data['graph'])
+        arrays['route_dist'] = table.dist
+        arrays['route_next_hop'] = table.next_hop
+        meta['route_signature'] = table.signature
+
+    write_map_file(output_path, arrays, meta)
+
+def main():
+    home_path = str(Path.home())
+
+    parser = argparse.ArgumentParser(description='Convert the ParkSim asset pickles into one memory-mappable map file')
+    parser.add_argument('--spots', default=home_path + '/ParkSim/data/spots_data.pickle')
+    parser.add_argument('--graph', default=home_path + '/ParkSim/data/waypoints_graph.pickle')
+    parser.add_argument('--maneuvers', default=home_path + '/ParkSim/data/parking_maneuvers.pickle')
+    parser.add_argument('--output', default=home_path + '/ParkSim/data/parking_lot' + MAP_FILE_EXTENSION)
+    parser.add_argument('--no-route-table', help='do not precompute the all-pairs route table', action='store_true')
+    args = parser.parse_args()
+
+    convert_pickles(args.spots, args.graph, args.maneuvers, args.output, route_table=not args.no_route_table)
+    print("Map file saved to %s" % args.output)
+
+if __name__ == "__main__":
+    main()
@@ -13,16 +13,7 @@ def v2c(state: VehicleState, vehicle_body: VehicleBody):
     """
     radius = vehicle_body.w/2
 
-    start_offset = vehicle_body.cr
-    start_xc = state.x.x - start_offset * np.cos(state.e.psi)
-    start_yc = state.x.y - start_offset * np.sin(state.e.psi)
-
-    end_offset = vehicle_body.cf
-    end_xc = state.x.x + end_offset * np.cos(state.e.psi)
-    end_yc = state.x.y + end_offset * np.sin(state.e.psi)
-
-    xcs = np.linspace(start_xc, end_xc, vehicle_body.num_circles, endpoint=True)
-    ycs = np.linspace(start_yc, end_yc, vehicle_body.num_circles, endpoint=True)
+    xcs, ycs = circle_centers(np.array([state.x.x, state.x.y, state.e.psi]), vehicle_body)
 
     circles = []
     for xc, yc in zip(xcs, ycs):
@@ -30,6 +21,41 @@ def v2c(state: VehicleState, vehicle_body: VehicleBody):
 
     return circles
 
+def circle_centers(poses: np.ndarray, vehicle_body: VehicleBody):
+    """
+    Centers of the v2c circles for an array of poses
+
+    poses: (..., 3) array of x, y, psi
+    :return: (xcs, ycs), each of shape (..., num_circles)
+    """
+    poses = np.asarray(poses, dtype=float)
+    # Signed distance of each circle center from the pose along the heading
+    offsets = np.linspace(-vehicle_body.cr, vehicle_body.cf, vehicle_body.num_circles, endpoint=True)
+
+    x = poses[..., 0, None]
+    y = poses[..., 1, None]
+    psi = poses[..., 2, None]
+
+    return x + offsets * np.cos(psi), y + offsets * np.sin(psi)
+
+def circles_collide(this_poses: np.ndarray, other_poses: np.ndarray, vehicle_body: VehicleBody) -> np.ndarray:
+    """
+    Circle-circle collision check between two sets of poses, all at once
+
+    this_poses, other_poses: (..., 3) arrays of x, y, psi. Leading dimensions are broadcast against each other, e.g. (M, 1, 3) and (M, K, 3) for M time steps of one vehicle against K others
+    vehicle_body: The vehicle body of all vehicles. Assuming they are the same
+    :return: boolean array of the broadcast leading shape, True where the two vehicles collide
+    """
+    this_xcs, this_ycs = circle_centers(this_poses, vehicle_body)
+    other_xcs, other_ycs = circle_centers(other_poses, vehicle_body)
+
+    # Squared distances between every pair of circles, (..., num_circles, num_circles)
+    dx = this_xcs[..., :, None] - other_xcs[..., None, :]
+    dy = this_ycs[..., :, None] - other_ycs[..., None, :]
+
+    # Both circles have radius w/2
+    return np.any(dx**2 + dy**2 < vehicle_body.w**2, axis=(-2, -1))
+
 
 def main():
     state = VehicleState()
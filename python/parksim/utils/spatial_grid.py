@@ -0,0 +1,48 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+class SpatialGrid(object):
+    """
+    Uniform grid over vehicle positions for fast neighbor queries.
+
+    Rebuild it with `build` whenever the positions change (e.g. once per simulator tick). `query` returns the ids in all cells that overlap the query circle, i.e. a superset of the ids within the radius. Callers do the exact distance check on the candidates.
+    """
+    def __init__(self, cell_size: float):
+        """
+        cell_size: side length of a grid cell. Queries are cheapest when it is close to the query radius
+        """
+        self.cell_size = cell_size
+
+        self.cells: Dict[Tuple[int, int], List[int]] = {}
+
+    def build(self, ids: List[int], x: np.ndarray, y: np.ndarray):
+        """
+        Put every id into the cell containing its position
+
+        ids: id of each point
+        x, y: position of each point
+        """
+        self.cells = {}
+
+        cell_x = np.floor(np.asarray(x, dtype=float) / self.cell_size).astype(int)
+        cell_y = np.floor(np.asarray(y, dtype=float) / self.cell_size).astype(int)
+
+        for id, cx, cy in zip(ids, cell_x.tolist(), cell_y.tolist()):
+            self.cells.setdefault((cx, cy), []).append(id)
+
+    def query(self, x: float, y: float, radius: float) -> List[int]:
+        """
+        Ids that may be within radius of (x, y)
+        """
+        min_cx = int(np.floor((x - radius) / self.cell_size))
+        max_cx = int(np.floor((x + radius) / self.cell_size))
+        min_cy = int(np.floor((y - radius) / self.cell_size))
+        max_cy = int(np.floor((y + radius) / self.cell_size))
+
+        candidates = []
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                candidates.extend(self.cells.get((cx, cy), []))
+
+        return candidates
@@ -1,123 +1,102 @@
-import math
 import numpy as np
-import bisect
+from scipy.linalg import solve_banded
 
 
 class Spline:
     """
     Cubic Spline class
+
+    calc, calcd and calcdd accept a scalar or an array of t. A scalar outside of the input x gives None, array entries outside of it give nan
     """
 
     def __init__(self, x, y):
-        self.b, self.c, self.d, self.w = [], [], [], []
-
         self.x = x
         self.y = y
 
         self.nx = len(x)  # dimension of x
-        h = np.diff(x)
+        self._x = np.asarray(x, dtype=float)
+        h = np.diff(self._x)
 
-        # calc coefficient c
-        self.a = [iy for iy in y]
+        # calc coefficient a
+        self.a = np.asarray(y, dtype=float)
 
         # calc coefficient c
-        A = self.__calc_A(h)
-        B = self.__calc_B(h)
-        self.c = np.linalg.solve(A, B)
-        #  print(self.c1)
+        self.c = self.__solve_c(h)
 
         # calc spline coefficient b and d
-        for i in range(self.nx - 1):
-            self.d.append((self.c[i + 1] - self.c[i]) / (3.0 * h[i]))
-            tb = (self.a[i + 1] - self.a[i]) / h[i] - h[i] * \
-                (self.c[i + 1] + 2.0 * self.c[i]) / 3.0
-            self.b.append(tb)
+        self.d = (self.c[1:] - self.c[:-1]) / (3.0 * h)
+        self.b = (self.a[1:] - self.a[:-1]) / h - h * \
+            (self.c[1:] + 2.0 * self.c[:-1]) / 3.0
 
     def calc(self, t):
         """
         Calc position
-
-        if t is outside of the input x, return None
-
         """
-
-        if t < self.x[0]:
-            return None
-        elif t > self.x[-1]:
-            return None
-
-        i = self.__search_index(t)
-        dx = t - self.x[i]
-        result = self.a[i] + self.b[i] * dx + \
-            self.c[i] * dx ** 2.0 + self.d[i] * dx ** 3.0
-
-        return result
+        return self.__evaluate(t, 0)
 
     def calcd(self, t):
         """
         Calc first derivative
-
-        if t is outside of the input x, return None
         """
-
-        if t < self.x[0]:
-            return None
-        elif t > self.x[-1]:
-            return None
-
-        i = self.__search_index(t)
-        dx = t - self.x[i]
-        result = self.b[i] + 2.0 * self.c[i] * dx + 3.0 * self.d[i] * dx ** 2.0
-        return result
+        return self.__evaluate(t, 1)
 
     def calcdd(self, t):
         """
         Calc second derivative
         """
+        return self.__evaluate(t, 2)
 
-        if t < self.x[0]:
-            return None
-        elif t > self.x[-1]:
+    def __evaluate(self, t, order):
+        """
+        evaluate the spline or its first or second derivative at t
+        """
+        scalar = np.ndim(t) == 0
+        t = np.asarray(t, dtype=float)
+
+        outside = (t < self._x[0]) | (t > self._x[-1])
+        if scalar and outside:
             return None
 
         i = self.__search_index(t)
-        dx = t - self.x[i]
-        result = 2.0 * self.c[i] + 6.0 * self.d[i] * dx
-        return result
+        dx = t - self._x[i]
 
-    def __search_index(self, x):
-        """
-        search data segment index
-        """
-        return bisect.bisect(self.x, x) - 1
+        if order == 0:
+            result = self.a[i] + self.b[i] * dx + \
+                self.c[i] * dx ** 2.0 + self.d[i] * dx ** 3.0
+        elif order == 1:
+            result = self.b[i] + 2.0 * self.c[i] * dx + 3.0 * self.d[i] * dx ** 2.0
+        else:
+            result = 2.0 * self.c[i] + 6.0 * self.d[i] * dx
+
+        if scalar:
+            return result[()]
+
+        return np.where(outside, np.nan, result)
 
-    def __calc_A(self, h):
+    def __search_index(self, t):
         """
-        calc matrix A for spline coefficient c
+        search data segment index. The end of the last segment belongs to that segment
         """
-        A = np.zeros((self.nx, self.nx))
-        A[0, 0] = 1.0
-        for i in range(self.nx - 1):
-            if i != (self.nx - 2):
-                A[i + 1, i + 1] = 2.0 * (h[i] + h[i + 1])
-            A[i + 1, i] = h[i]
-            A[i, i + 1] = h[i]
+        i = np.searchsorted(self._x, t, side='right') - 1
+        return np.clip(i, 0, self.nx - 2)
 
-        A[0, 1] = 0.0
-        A[self.nx - 1, self.nx - 2] = 0.0
-        A[self.nx - 1, self.nx - 1] = 1.0
-        #  print(A)
-        return A
-
-    def __calc_B(self, h):
+    def __solve_c(self, h):
         """
-        calc matrix B for spline coefficient c
+        solve the tridiagonal system for spline coefficient c
         """
+        # Bands of the matrix, upper diagonal first, as solve_banded expects
+        ab = np.zeros((3, self.nx))
+        ab[1, 0] = 1.0
+        ab[1, 1:-1] = 2.0 * (h[:-1] + h[1:])
+        ab[1, -1] = 1.0
+        ab[0, 2:] = h[1:]
+        ab[2, :-2] = h[:-1]
+
         B = np.zeros(self.nx)
-        for i in range(self.nx - 2):
-            B[i + 1] = 3.0 * (self.a[i + 2] - self.a[i + 1]) / \
-                h[i + 1] - 3.0 * (self.a[i + 1] - self.a[i]) / h[i]
-        return B
+        B[1:-1] = 3.0 * (self.a[2:] - self.a[1:-1]) / \
+            h[1:] - 3.0 * (self.a[1:-1] - self.a[:-2]) / h[:-1]
+
+        return solve_banded((1, 1), ab, B)
 
 
 class Spline2D:
@@ -165,20 +144,17 @@ class Spline2D:
         """
         dx = self.sx.calcd(s)
         dy = self.sy.calcd(s)
-        yaw = math.atan2(dy, dx)
+        yaw = np.arctan2(dy, dx)
         return yaw
 
 
 def calc_spline_course(x, y, ds=0.1):
     sp = Spline2D(x, y)
-    s = list(np.arange(0, sp.s[-1], ds))
+    s = np.arange(0, sp.s[-1], ds)
 
-    rx, ry, ryaw, rk = [], [], [], []
-    for i_s in s:
-        ix, iy = sp.calc_position(i_s)
-        rx.append(ix)
-        ry.append(iy)
-        ryaw.append(sp.calc_yaw(i_s))
-        rk.append(sp.calc_curvature(i_s))
+    # All samples at once
+    rx, ry = sp.calc_position(s)
+    ryaw = sp.calc_yaw(s)
+    rk = sp.calc_curvature(s)
 
-    return rx, ry, ryaw, rk, s
\ No newline at end of file
+    return rx, ry, ryaw, rk, s
@@ -0,0 +1,166 @@
+from typing import Dict, List
+
+import numpy as np
+
+from parksim.pytypes import VehiclePrediction, VehicleState
+
+# Integer codes of the task names in the "task" column
+TASK_CODES: Dict[str, int] = {"CRUISE": 0, "PARK": 1, "UNPARK": 2, "IDLE": 3, "END": 4}
+TASK_NAMES: Dict[int, str] = {code: name for name, code in TASK_CODES.items()}
+
+class TrajectoryRecorder(object):
+    """
+    Columnar history of a vehicle's state.
+
+    One row per `record` call with the columns t, x, y, psi, v, u_a, u_steer, task (see TASK_CODES, -1 for no task) and braking. Storage grows in chunks, so recording does not allocate every step. With max_length > 0 only the last max_length rows are kept, as a ring buffer.
+    """
+    COLUMNS = {
+        't': float,
+        'x': float,
+        'y': float,
+        'psi': float,
+        'v': float,
+        'u_a': float,
+        'u_steer': float,
+        'task': np.int8,
+        'braking': bool,
+    }
+
+    def __init__(self, chunk_size: int = 1024, max_length: int = 0):
+        """
+        chunk_size: number of rows added each time the storage is full
+        max_length: keep at most this many rows. 0 keeps everything
+        """
+        self.chunk_size = chunk_size
+        self.max_length = max_length
+
+        self.capacity = 0
+        self.length = 0
+        self.head = 0 # index of the oldest row once the ring buffer is full
+
+        self.columns: Dict[str, np.ndarray] = {name: np.zeros(0, dtype=dtype) for name, dtype in self.COLUMNS.items()}
+
+    def _grow(self):
+        new_capacity = self.capacity + self.chunk_size
+        if self.max_length > 0:
+            new_capacity = min(new_capacity, self.max_length)
+
+        for name, column in self.columns.items():
+            new_column = np.zeros(new_capacity, dtype=column.dtype)
+            new_column[:self.capacity] = column
+            self.columns[name] = new_column
+
+        self.capacity = new_capacity
+
+    def record(self, t: float, state: VehicleState, task: str = None, braking: bool = False):
+        """
+        Append one row
+
+        t: time. None is stored as nan
+        state: current state, the values are copied
+        task: name of the current task
+        braking: whether the vehicle is braking
+        """
+        if self.length == self.capacity and (self.max_length <= 0 or self.capacity < self.max_length):
+            self._grow()
+
+        if self.length < self.capacity:
+            i = self.length
+            self.length += 1
+        else:
+            # Full ring buffer, overwrite the oldest row
+            i = self.head
+            self.head = (self.head + 1) % self.capacity
+
+        columns = self.columns
+        columns['t'][i] = np.nan if t is None else t
+        columns['x'][i] = state.x.x
+        columns['y'][i] = state.x.y
+        columns['psi'][i] = state.e.psi
+        columns['v'][i] = state.v.v
+        columns['u_a'][i] = state.u.u_a
+        columns['u_steer'][i] = state.u.u_steer
+        columns['task'][i] = TASK_CODES.get(task, -1)
+        columns['braking'][i] = braking
+
+    def __len__(self):
+        return self.length
+
+    def _order(self) -> np.ndarray:
+        """
+        storage indices of the rows, oldest first
+        """
+        return (self.head + np.arange(self.length)) % max(self.capacity, 1)
+
+    def get(self, name: str) -> np.ndarray:
+        """
+        One column as a new array, oldest row first
+        """
+        if self.head == 0:
+            return self.columns[name][:self.length].copy()
+        return self.columns[name][self._order()]
+
+    def to_dict(self) -> Dict[str, np.ndarray]:
+        return {name: self.get(name) for name in self.columns}
+
+    def __getitem__(self, i: int) -> VehicleState:
+        """
+        The i-th recorded state (negative indices count from the latest), as a VehicleState
+        """
+        if i < 0:
+            i += self.length
+        if i < 0 or i >= self.length:
+            raise IndexError("TrajectoryRecorder index out of range")
+
+        j = (self.head + i) % self.capacity
+        columns = self.columns
+
+        state = VehicleState()
+        state.t = None if np.isnan(columns['t'][j]) else float(columns['t'][j])
+        state.x.x = float(columns['x'][j])
+        state.x.y = float(columns['y'][j])
+        state.e.psi = float(columns['psi'][j])
+        state.v.v = float(columns['v'][j])
+        state.u.u_a = float(columns['u_a'][j])
+        state.u.u_steer = float(columns['u_steer'][j])
+
+        return state
+
+    def to_prediction(self) -> VehiclePrediction:
+        """
+        The recorded t, x, y, psi, v, u_a and u_steer columns as one VehiclePrediction, oldest row first
+        """
+        pred = VehiclePrediction()
+        for name in ['t', 'x', 'y', 'psi', 'v', 'u_a', 'u_steer']:
+            pred.__setattr__(name, self.get(name))
+
+        return pred
+
+    def to_states(self) -> List[VehicleState]:
+        """
+        All recorded states, oldest first, like [recorder[i] for i in range(len(recorder))]
+        """
+        return self.to_prediction().to_states()
+
+    def clear(self):
+        self.length = 0
+        self.head = 0
+
+    def to_npz(self, path: str, compressed: bool = True):
+        """
+        Save all columns to a .npz file
+        """
+        if compressed:
+            np.savez_compressed(path, **self.to_dict())
+        else:
+            np.savez(path, **self.to_dict())
+
+    def to_parquet(self, path: str):
+        """
+        Save all columns to a Parquet file. Needs pandas and pyarrow (or fastparquet)
+        """
+        import pandas as pd
+
+        df = pd.DataFrame(self.to_dict())
+        df['task'] = df['task'].map(TASK_NAMES)
+        df.to_parquet(path)
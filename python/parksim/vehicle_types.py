@@ -51,8 +51,7 @@ class VehicleBody(BasePolytopeObstacle):
         else:
             raise NotImplementedError('Unrecognized vehicle flag: %d'%self.vehicle_flag)
     
-        self.__calc_V__()
-        self.__calc_A_b__()
+        # V, A and b are computed the first time they are read
         return
         
     def __calc_V__(self):
@@ -113,6 +112,9 @@ class VehicleConfig(PythonMsg):
     parking_ahead_angle: float = field(default=np.pi/4)
     leading_trailing_thres: float = field(default=0.25) # Threshold of heading angle difference to check whether two vehicles are leading and trailing. 0.25 is about about 15 degrees
 
+    # Logging Related
+    state_hist_length: int = field(default=0) # how many past states to keep in state_hist. 0 keeps all of them
+
 @dataclass
 class VehicleInfo(PythonMsg):
     ref_pose: VehiclePrediction = field(default=None)
@@ -1,4 +1,5 @@
 import time
+from typing import List
 import numpy as np
 import dearpygui.dearpygui as dpg
 
@@ -7,7 +8,7 @@ from dlp.visualizer import Visualizer as DlpVis
 from parksim.pytypes import VehicleState
 
 from parksim.vehicle_types import VehicleBody
-from parksim.utils.get_corners import get_vehicle_corners
+from parksim.utils.get_corners import get_vehicle_corners, get_vehicle_corners_batch
 
 class RealtimeVisualizer(object):
     """
@@ -201,6 +202,20 @@ class RealtimeVisualizer(object):
         px, py = self._xy2p(corners[:,0], corners[:, 1])
         dpg.draw_quad(p1=[px[0], py[0]], p2=[px[1], py[1]], p3=[px[2], py[2]], p4=[px[3], py[3]], fill=fill, color=(0,0,0,0), parent=self.frame_canvas)
 
+    def draw_vehicles(self, states: List[VehicleState], fills: List[tuple]):
+        """
+        draw many vehicles, with the corners of all of them computed at once
+
+        states: VehicleState objects
+        fills: (r, g, b, a) tuple in range 0-255 for each vehicle
+        """
+        poses = VehicleState.pack_arrays(states, fields=['x.x', 'x.y', 'e.psi'])
+        corners = get_vehicle_corners_batch(poses['x.x'], poses['x.y'], poses['e.psi'], self.vehicle_body)
+
+        for vehicle_corners, fill in zip(corners, fills):
+            px, py = self._xy2p(vehicle_corners[:,0], vehicle_corners[:, 1])
+            dpg.draw_quad(p1=[px[0], py[0]], p2=[px[1], py[1]], p3=[px[2], py[2]], p4=[px[3], py[3]], fill=fill, color=(0,0,0,0), parent=self.frame_canvas)
+
     def draw_frame(self, frame_token):
         frame = self.dlpvis.dataset.get('frame', frame_token)
         
@@ -0,0 +1,80 @@
+import itertools
+import pickle
+
+import numpy as np
+import pytest
+
+from parksim.route_planner.graph import WaypointsGraph
+from parksim.utils import map_assets
+
+def make_waypoints_graph():
+    """
+    Two east-west lanes at y = 0 and y = 20, joined at both ends, with a straight road west to the entrance at (-12, 20)
+    """
+    graph = WaypointsGraph()
+    for y in [0., 20.]:
+        graph.add_waypoint_list(np.array([[x, y] for x in np.arange(0., 61., 3.)]))
+
+    for x in [0., 60.]:
+        graph.add_waypoint_list(np.array([[x, y] for y in np.arange(3., 18., 3.)]))
+        graph.connect([x, 0.], [x, 3.])
+        graph.connect([x, 15.], [x, 20.])
+
+    graph.add_waypoint_list(np.array([[x, 20.] for x in np.arange(-12., 0., 3.)]))
+    graph.connect([-3., 20.], [0., 20.])
+
+    return graph
+
+def make_maneuver_library():
+    """
+    Straight-line maneuvers from the lane into the spot, ending 6.25 m to the side of the lane like the real library
+    """
+    t = np.linspace(0, 4, 41)
+    lib = {}
+    for driving_dir, x_position, spot, heading in itertools.product(['east', 'west'], ['left', 'right'], ['north', 'south'], ['up', 'down']):
+        side = 1 if spot == 'north' else -1
+        start_psi = 0 if driving_dir == 'east' else np.pi
+        end_psi = np.pi / 2 if heading == 'up' else -np.pi / 2
+        x = np.linspace(4 if x_position == 'right' else -4, 0, 41)
+        y = side * np.linspace(0, 6.25, 41)
+        psi = np.linspace(start_psi, end_psi, 41)
+        v = np.concatenate([np.full(40, 1.5), [0.]])
+        lib[(driving_dir, x_position, spot, heading)] = np.vstack([t, x, y, psi, v, np.zeros(41), np.zeros(41)])
+    return lib
+
+def make_spots_data():
+    """
+    North spots between the two lanes at y = 5, south spots at y = 15
+    """
+    xs = np.arange(6., 55., 3.)
+    parking_spaces = np.array([[x, 5.] for x in xs] + [[x, 15.] for x in xs])
+    return {
+        'parking_spaces': parking_spaces,
+        'overshoot_ranges': {'pointed_right': [(3, 5)], 'pointed_left': [(20, 22)]},
+        'north_spot_idx_ranges': [(0, len(xs) - 1)],
+        'spot_y_offset': 5,
+    }
+
+@pytest.fixture
+def parking_lot(tmp_path, monkeypatch):
+    """
+    A small synthetic parking lot written to the asset paths the simulator and vehicles read from ~/ParkSim/data. HOME points to a temporary directory for the test
+    """
+    data_dir = tmp_path / 'ParkSim' / 'data'
+    data_dir.mkdir(parents=True)
+
+    spots_data = make_spots_data()
+    graph = make_waypoints_graph()
+    lib = make_maneuver_library()
+
+    with open(data_dir / 'spots_data.pickle', 'wb') as f:
+        pickle.dump(spots_data, f)
+    with open(data_dir / 'waypoints_graph.pickle', 'wb') as f:
+        pickle.dump({'graph': graph, 'entrance_coords': [-12., 20.]}, f)
+    with open(data_dir / 'parking_maneuvers.pickle', 'wb') as f:
+        pickle.dump(lib, f)
+
+    monkeypatch.setenv('HOME', str(tmp_path))
+    map_assets.invalidate()
+    yield data_dir
+    map_assets.invalidate()
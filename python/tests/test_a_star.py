@@ -0,0 +1,101 @@
+from itertools import count
+from queue import PriorityQueue
+
+import numpy as np
+import pytest
+
+from parksim.route_planner.a_star import AStarGraph, AStarPlanner
+from parksim.route_planner.graph import WaypointsGraph
+from parksim.utils.spline import calc_spline_course
+
+from conftest import make_waypoints_graph
+
+def reference_solve(v_start, v_goal):
+    """
+    A* that copies the path into every fringe entry, as AStarPlanner did before
+    """
+    fringe = PriorityQueue()
+    closed = set()
+    counter = count()
+    fringe.put((0, next(counter), (v_start, [], 0)))
+
+    while not fringe.empty():
+        _, _, (v, path, cost) = fringe.get()
+        if v == v_goal:
+            return AStarGraph(path)
+
+        if v not in closed:
+            closed.add(v)
+            for child, edge in zip(*v.get_children()):
+                new_cost = cost + edge.c
+                fringe.put((new_cost + child.dist(v_goal), next(counter), (child, path + [edge], new_cost)))
+
+    raise Exception('Path is not found')
+
+def random_graph(rng):
+    """
+    a chain of random waypoints with random shortcuts in both directions
+    """
+    graph = WaypointsGraph()
+    points = rng.uniform(0, 100, (60, 2))
+    graph.add_waypoint_list(points)
+    for i, j in rng.integers(len(points), size=(80, 2)):
+        if i != j:
+            graph.connect(points[i], points[j])
+    return graph
+
+@pytest.mark.parametrize('make_graph', [lambda rng: make_waypoints_graph(), random_graph])
+def test_same_paths_as_reference(make_graph):
+    rng = np.random.default_rng(0)
+    graph = make_graph(rng)
+
+    for start, goal in rng.integers(len(graph.vertices), size=(100, 2)):
+        v_start, v_goal = graph.vertices[start], graph.vertices[goal]
+        try:
+            expected = reference_solve(v_start, v_goal)
+        except Exception:
+            with pytest.raises(Exception, match='Path is not found'):
+                AStarPlanner(v_start, v_goal, graph).solve()
+            continue
+
+        for planner in [AStarPlanner(v_start, v_goal, graph), AStarPlanner(v_start, v_goal)]:
+            path = planner.solve()
+            assert path.edges == expected.edges
+            assert path.vertices == expected.vertices
+            assert path.path_cost() == expected.path_cost()
+
+def test_start_is_goal():
+    graph = make_waypoints_graph()
+    path = AStarPlanner(graph.vertices[5], graph.vertices[5], graph).solve()
+    assert path.edges == [] and path.vertices == []
+
+def test_start_outside_the_graph():
+    graph, other = make_waypoints_graph(), make_waypoints_graph()
+    # vertices of another graph are indexed on their own
+    path = AStarPlanner(other.vertices[0], other.vertices[10], graph).solve()
+    assert path.edges == reference_solve(other.vertices[0], other.vertices[10]).edges
+
+def reference_ref_path(path, offset):
+    """
+    ref path with the offset applied point by point on lists, as compute_ref_path did before
+    """
+    axs = [v.coords[0] for v in path.vertices]
+    ays = [v.coords[1] for v in path.vertices]
+    cxs, cys, cyaws, _, _ = calc_spline_course(axs, ays, ds=0.1)
+    cxs = [cxs[j] + offset * np.sin(cyaws[j]) for j in range(len(cxs))]
+    cys = [cys[j] - offset * np.cos(cyaws[j]) for j in range(len(cys))]
+    return cxs, cys, list(cyaws)
+
+def test_ref_path_matches_reference():
+    rng = np.random.default_rng(3)
+    graph = make_waypoints_graph()
+
+    for start, goal in rng.integers(len(graph.vertices), size=(20, 2)):
+        path = AStarPlanner(graph.vertices[start], graph.vertices[goal], graph).solve()
+        if len(path.vertices) < 2:
+            continue
+        for offset in [0, 1.75, -1.75]:
+            ref_path = path.compute_ref_path(offset)
+            for a, b in zip(ref_path, reference_ref_path(path, offset)):
+                assert isinstance(a, np.ndarray) and a.dtype == np.float64 and a.flags.c_contiguous
+                assert np.allclose(a, b, rtol=0, atol=1e-12)
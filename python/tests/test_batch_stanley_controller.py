@@ -0,0 +1,81 @@
+import numpy as np
+
+from parksim.controller.stanley_controller import StanleyController
+from parksim.controller.batch_stanley_controller import BatchStanleyController
+from parksim.pytypes import VehicleState
+from parksim.utils.spline import calc_spline_course
+
+def make_path(rng, num_points):
+    cx, cy, cyaw, _, _ = calc_spline_course(np.cumsum(rng.uniform(5, 15, num_points)), rng.uniform(-5, 5, num_points), ds=0.1)
+    return cx, cy, cyaw
+
+def make_state(x, y, psi, v):
+    state = VehicleState()
+    state.x.x, state.x.y, state.e.psi, state.v.v = x, y, psi, v
+    return state
+
+def test_ragged_paths_and_mixed_braking_match_scalar():
+    rng = np.random.default_rng(1)
+    # very different path lengths, so most rows are padded
+    paths = [make_path(rng, n) for n in [2, 3, 8, 4, 12]]
+    v_ref = rng.uniform(1, 5, len(paths))
+    scalar = StanleyController()
+    batch = BatchStanleyController()
+
+    states = [make_state(p[0][5] - 1, p[1][5] + rng.uniform(-1, 1), p[2][5], rng.uniform(0, 3)) for p in paths]
+    target_idx = np.zeros(len(paths), dtype=int)
+
+    for step in range(150):
+        braking = rng.uniform(size=len(paths)) < 0.3
+        x = np.array([s.x.x for s in states])
+        y = np.array([s.x.y for s in states])
+        psi = np.array([s.e.psi for s in states])
+        v = np.array([s.v.v for s in states])
+
+        batch.set_ref_pose([p[0] for p in paths], [p[1] for p in paths], [p[2] for p in paths])
+        batch.set_ref_v(v_ref)
+        batch.set_target_idx(target_idx)
+        a_batch, d_batch, idx_batch = batch.solve(x, y, psi, v, braking)
+        next_batch = batch.step(x, y, psi, v, a_batch, d_batch)
+
+        for i, (path, state) in enumerate(zip(paths, states)):
+            scalar.set_ref_pose(*path)
+            scalar.set_ref_v(v_ref[i])
+            scalar.set_target_idx(target_idx[i])
+            a, d, idx = scalar.solve(state, braking[i])
+            assert idx == idx_batch[i]
+            assert np.isclose(a, a_batch[i]) and np.isclose(d, d_batch[i])
+
+            scalar.step(state, a, d)
+            assert np.allclose([state.x.x, state.x.y, state.e.psi, state.v.v], [column[i] for column in next_batch])
+            target_idx[i] = idx
+
+def test_padded_arrays_follow_the_paths():
+    rng = np.random.default_rng(2)
+    short, long = make_path(rng, 2), make_path(rng, 6)
+    batch = BatchStanleyController()
+
+    batch.set_ref_pose([short[0], long[0]], [short[1], long[1]], [short[2], long[2]])
+    padded = batch.x_ref
+    assert list(batch.ref_len) == [len(short[0]), len(long[0])]
+    assert np.all(np.isinf(batch.x_ref[0, len(short[0]):]))
+
+    # Same path objects: the padded arrays are reused
+    batch.set_ref_pose([short[0], long[0]], [short[1], long[1]], [short[2], long[2]])
+    assert batch.x_ref is padded
+
+    # Another vehicle set: rebuilt
+    batch.set_ref_pose([long[0]], [long[1]], [long[2]])
+    assert batch.x_ref.shape == (1, len(long[0]))
+    assert np.array_equal(batch.x_ref[0], long[0])
+
+def test_no_vehicles():
+    batch = BatchStanleyController()
+    batch.set_ref_pose([], [], [])
+    batch.set_ref_v([])
+    batch.set_target_idx([])
+
+    empty = np.zeros(0)
+    a, d, idx = batch.solve(empty, empty, empty, empty, np.zeros(0, dtype=bool))
+
+    assert a.shape == d.shape == idx.shape == (0,)
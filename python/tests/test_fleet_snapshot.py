@@ -0,0 +1,50 @@
+import numpy as np
+
+from parksim.agents.rule_based_stanley_vehicle import RuleBasedStanleyVehicle
+from parksim.simulator.rule_based_simulator import RuleBasedSimulator
+from parksim.simulator_types import SimulatorParams
+
+OTHER_INFO = ['state', 'ref_pose', 'ref_v', 'target_idx', 'priority', 'task', 'parking_progress', 'parking_start_time', 'is_braking', 'waiting_for', 'is_all_done']
+
+def copied_other_info(vehicle, active_vehicles, get_other_info):
+    """
+    other_* dicts filled by get_other_info without a snapshot, like the ROS node does
+    """
+    views = {name: getattr(vehicle, 'other_' + name) for name in OTHER_INFO}
+    snapshot, vehicle.fleet_snapshot = vehicle.fleet_snapshot, None
+    for name in OTHER_INFO:
+        setattr(vehicle, 'other_' + name, {})
+
+    get_other_info(vehicle, active_vehicles)
+    copied = {name: getattr(vehicle, 'other_' + name) for name in OTHER_INFO}
+
+    vehicle.fleet_snapshot = snapshot
+    for name in OTHER_INFO:
+        setattr(vehicle, 'other_' + name, views[name])
+
+    return copied
+
+def test_snapshot_matches_copied_info(parking_lot, monkeypatch):
+    checked = []
+    get_other_info = RuleBasedStanleyVehicle.get_other_info
+
+    def compare(vehicle, active_vehicles):
+        copied = copied_other_info(vehicle, active_vehicles, get_other_info)
+        get_other_info(vehicle, active_vehicles)
+
+        assert vehicle.other_vehicles == set(copied['state'])
+        for id in vehicle.other_vehicles:
+            state, copied_state = vehicle.other_state[id], copied['state'][id]
+            assert (state.x.x, state.x.y, state.e.psi, state.v.v) == (copied_state.x.x, copied_state.x.y, copied_state.e.psi, copied_state.v.v)
+
+            for axis in ['x', 'y', 'psi']:
+                assert np.array_equal(getattr(vehicle.other_ref_pose[id], axis), getattr(copied['ref_pose'][id], axis))
+
+            for name in OTHER_INFO[2:]:
+                assert getattr(vehicle, 'other_' + name)[id] == copied[name][id], name
+            checked.append(id)
+
+    monkeypatch.setattr(RuleBasedStanleyVehicle, 'get_other_info', compare)
+    RuleBasedSimulator(params=SimulatorParams(spawn_entering=3, spawn_exiting=3, spawn_interval_mean=1, blocked_spots=[], max_simulation_time=40, seed=4)).run()
+
+    assert len(checked) > 100
@@ -0,0 +1,75 @@
+import numpy as np
+
+from parksim.controller.stanley_controller import StanleyController
+from parksim.pytypes import VehicleState
+from parksim.simulator.fleet_state import FleetState
+from parksim.vehicle_types import VehicleBody, VehicleConfig
+
+def make_state(x, y, psi, v):
+    state = VehicleState()
+    state.x.x, state.x.y, state.e.psi, state.v.v = x, y, psi, v
+    return state
+
+def test_step_matches_scalar_controller():
+    rng = np.random.default_rng(0)
+    body, config = VehicleBody(), VehicleConfig()
+    controller = StanleyController(vehicle_body=body, vehicle_config=config)
+
+    # start small to exercise growing the arrays
+    fleet = FleetState(capacity=2)
+    states, views = [], []
+    for _ in range(10):
+        state = make_state(*rng.uniform(-20, 20, 2), rng.uniform(-np.pi, np.pi), rng.uniform(0, 5))
+        states.append(state)
+        views.append(fleet.add(state.copy(), body.wb, config.delta_max, controller.dt))
+    assert fleet.capacity == 16
+
+    for _ in range(20):
+        inputs = rng.uniform(-1, 1, (len(states), 2))
+        for state, view, (a, d) in zip(states, views, inputs):
+            controller.step(state, a, d)
+            fleet.queue_step(view.slot, a, d)
+        fleet.step()
+
+        for state, view in zip(states, views):
+            assert np.isclose(view.x.x, state.x.x)
+            assert np.isclose(view.x.y, state.x.y)
+            assert np.isclose(view.e.psi, state.e.psi)
+            assert np.isclose(view.v.v, state.v.v)
+            assert view.u.u_a == state.u.u_a and view.u.u_steer == state.u.u_steer
+
+def test_queued_states_are_assigned_at_step():
+    fleet = FleetState()
+    stepped = fleet.add(make_state(0, 0, 0, 1), wb=2.0, max_steer=0.5, dt=0.1)
+    placed = fleet.add(make_state(5, 5, 0, 0), wb=2.0, max_steer=0.5, dt=0.1)
+    idle = fleet.add(make_state(9, 9, 1, 2), wb=2.0, max_steer=0.5, dt=0.1)
+
+    fleet.queue_step(stepped.slot, 0.0, 0.0)
+    fleet.queue_state(placed.slot, 6, 7, 0.5, 1.5, 0.1, 0.2)
+    # nothing moves before step()
+    assert placed.x.x == 5 and stepped.x.x == 0
+
+    fleet.step()
+
+    assert np.isclose(stepped.x.x, 0.1)
+    assert (placed.x.x, placed.x.y, placed.e.psi, placed.v.v, placed.u.u_a, placed.u.u_steer) == (6, 7, 0.5, 1.5, 0.1, 0.2)
+    assert (idle.x.x, idle.x.y, idle.e.psi, idle.v.v) == (9, 9, 1, 2)
+
+    # queued updates are applied once
+    fleet.step()
+    assert np.isclose(stepped.x.x, 0.1) and placed.x.x == 6
+
+def test_view_writes_through():
+    fleet = FleetState()
+    view = fleet.add(make_state(1, 2, 0.3, 4), wb=2.0, max_steer=0.5, dt=0.1)
+
+    view.x.y = -3.0
+    view.v.v = 0.5
+
+    state = view.to_vehicle_state()
+    assert isinstance(state, VehicleState)
+    assert (state.x.x, state.x.y, state.e.psi, state.v.v) == (1, -3, 0.3, 0.5)
+
+    detached = view.copy()
+    detached.x.x = 100
+    assert view.x.x == 1
@@ -0,0 +1,80 @@
+import numpy as np
+
+from parksim.agents.rule_based_stanley_vehicle import RuleBasedStanleyVehicle
+from parksim.pytypes import PlanarState
+from parksim.utils.get_corners import get_vehicle_corners, get_vehicle_corners_batch, get_vehicle_corners_from_dict, get_vehicle_corners_from_dicts
+from parksim.vehicle_types import VehicleBody, VehicleConfig
+
+def reference_corners(x, y, psi, body_shape):
+    """
+    corners of one pose with a rotation matrix, as get_vehicle_corners_from_dict did before
+    """
+    R = np.array([[np.cos(psi), -np.sin(psi)], [np.sin(psi), np.cos(psi)]])
+    return (R @ np.asarray(body_shape).T).T + np.array([x, y])
+
+def reference_has_passed(this_corners, other_corners, this_state, other_state, parking_dist_away=None):
+    """
+    the corner loop of has_passed before the batched corners
+    """
+    this_psi = this_state.e.psi
+    for this_corner in [this_corners[0], this_corners[1]]:
+        for other_corner in [other_corners[2], other_corners[3]]:
+            ang = ((np.arctan2(other_corner[1] - this_corner[1], other_corner[0] - this_corner[0]) - this_psi) + (2*np.pi)) % (2*np.pi)
+            if ang < (np.pi/2) or ang > (3*np.pi)/2:
+                return False
+    if parking_dist_away is not None:
+        if this_psi > np.pi / 2 and this_psi < np.pi * 3 / 2:
+            if this_state.x.x - other_state.x.x > -parking_dist_away:
+                return False
+        else:
+            if this_state.x.x - other_state.x.x < parking_dist_away:
+                return False
+    return True
+
+def random_poses(rng, n):
+    return rng.uniform(-50, 50, n), rng.uniform(-50, 50, n), rng.uniform(-2 * np.pi, 2 * np.pi, n)
+
+def test_batch_matches_per_pose():
+    rng = np.random.default_rng(0)
+    body = VehicleBody()
+    x, y, psi = random_poses(rng, 40)
+
+    expected = np.array([reference_corners(*pose, body.V) for pose in zip(x, y, psi)])
+    assert np.allclose(get_vehicle_corners_batch(x, y, psi, body), expected, rtol=0, atol=1e-12)
+    assert np.allclose(get_vehicle_corners_batch(x, y, psi, body.V), expected, rtol=0, atol=1e-12)
+    for pose, e in zip(zip(x, y, psi), expected):
+        assert np.allclose(get_vehicle_corners(PlanarState(*pose), body), e, rtol=0, atol=1e-12)
+
+    # a body per pose
+    shapes = body.V[None] * rng.uniform(0.5, 1.5, (40, 1, 2))
+    expected = np.array([reference_corners(*pose, shape) for pose, shape in zip(zip(x, y, psi), shapes)])
+    assert np.allclose(get_vehicle_corners_batch(x, y, psi, shapes), expected, rtol=0, atol=1e-12)
+
+    dicts = [{'center-x': a, 'center-y': b, 'heading': c, 'corners': shape} for a, b, c, shape in zip(x, y, psi, shapes)]
+    assert np.allclose(get_vehicle_corners_from_dicts(dicts), expected, rtol=0, atol=1e-12)
+    assert np.allclose(get_vehicle_corners_from_dict(dicts[0]), expected[0], rtol=0, atol=1e-12)
+    assert get_vehicle_corners_from_dicts([]).shape == (0, 4, 2)
+
+def test_has_passed_matches_corner_loop():
+    rng = np.random.default_rng(1)
+    vehicle = RuleBasedStanleyVehicle(vehicle_id=1, vehicle_body=VehicleBody(), vehicle_config=VehicleConfig())
+    body = vehicle.vehicle_body
+
+    decisions = []
+    for _ in range(300):
+        # vehicles along a lane, so both outcomes happen
+        this_state = PlanarState(x=rng.uniform(-10, 10), y=rng.uniform(-1, 1), psi=rng.choice([0, np.pi]) + rng.uniform(-0.3, 0.3))
+        other_state = PlanarState(x=rng.uniform(-10, 10), y=rng.uniform(-1, 1), psi=rng.choice([0, np.pi]) + rng.uniform(-0.3, 0.3))
+        vehicle.set_vehicle_state(state=this_state)
+        vehicle.other_state = {2: other_state}
+
+        this_corners = reference_corners(this_state.x.x, this_state.x.y, this_state.e.psi, body.V)
+        other_corners = reference_corners(other_state.x.x, other_state.x.y, other_state.e.psi, body.V)
+        for parking_dist_away in [None, 2.0]:
+            expected = reference_has_passed(this_corners, other_corners, this_state, other_state, parking_dist_away)
+            assert vehicle.has_passed(other_id=2, parking_dist_away=parking_dist_away) == expected
+            decisions.append(expected)
+
+        assert vehicle.has_passed(this_id=2, other_id=1) == reference_has_passed(other_corners, this_corners, other_state, this_state)
+
+    assert any(decisions) and not all(decisions)
@@ -0,0 +1,69 @@
+import numpy as np
+
+from parksim.route_planner.graph import WaypointsGraph
+
+from conftest import make_waypoints_graph
+
+def linear_search(graph, coords):
+    """
+    nearest vertex by scanning all vertices, as WaypointsGraph.search did before the KD-tree
+    """
+    min_dist = np.inf
+    min_idx = None
+    for idx, v in enumerate(graph.vertices):
+        dist = np.linalg.norm(np.array(coords)[:2] - v.coords)
+        if dist < min_dist:
+            min_idx = idx
+            min_dist = dist
+    return min_idx
+
+def random_graph(rng, num):
+    graph = WaypointsGraph()
+    graph.add_waypoint_list(rng.uniform(-50, 50, (num, 2)))
+    return graph
+
+def test_search_matches_linear_scan():
+    rng = np.random.default_rng(0)
+    graph = random_graph(rng, 200)
+
+    queries = rng.uniform(-60, 60, (300, 2))
+    expected = [linear_search(graph, q) for q in queries]
+
+    assert [graph.search(q) for q in queries] == expected
+    assert graph.search_batch(queries).tolist() == expected
+    # extra state dimensions are ignored
+    assert graph.search(np.append(queries[0], [1.0, 2.0])) == expected[0]
+
+def test_ties_go_to_the_lower_index():
+    graph = make_waypoints_graph()
+
+    # halfway between lattice points, on lattice points, and equidistant from four vertices
+    queries = [[1.5, 0.0], [3.0, 20.0], [0.0, 1.5], [1.5, 1.5], [-7.5, 20.0], [58.5, 18.5]]
+    for q in queries:
+        assert graph.search(q) == linear_search(graph, q)
+    assert graph.search_batch(np.array(queries)).tolist() == [linear_search(graph, q) for q in queries]
+
+def test_search_k_matches_sorted_scan():
+    rng = np.random.default_rng(1)
+    graph = make_waypoints_graph()
+
+    for q in rng.uniform(-15, 65, (50, 2)):
+        dist = [np.linalg.norm(q - v.coords) for v in graph.vertices]
+        expected = sorted(range(len(dist)), key=lambda i: (dist[i], i))[:5]
+        assert graph.search_k(q, 5) == expected
+
+    assert len(graph.search_k([0, 0], 10 * len(graph.vertices))) == len(graph.vertices)
+
+def test_index_follows_graph_changes():
+    rng = np.random.default_rng(2)
+    graph = random_graph(rng, 20)
+    assert WaypointsGraph().search([0, 0]) is None
+
+    graph.search([0, 0])
+    graph.add_waypoint_list(np.array([[100.0, 100.0], [101.0, 100.0]]))
+    assert graph.search([100.2, 100.1]) == len(graph.vertices) - 2
+
+    # moved in place, needs an explicit invalidate
+    graph.vertices[0].coords = np.array([-200.0, -200.0])
+    graph.invalidate_search_index()
+    assert graph.search([-199.0, -199.0]) == 0
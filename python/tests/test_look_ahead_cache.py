@@ -0,0 +1,87 @@
+import numpy as np
+
+from parksim.agents.rule_based_stanley_vehicle import RuleBasedStanleyVehicle
+from parksim.controller.stanley_controller import StanleyController
+from parksim.controller_types import StanleyParams
+from parksim.pytypes import PlanarState
+from parksim.simulator.rule_based_simulator import RuleBasedSimulator
+from parksim.simulator_types import SimulatorParams
+
+def make_simulator(max_simulation_time):
+    return RuleBasedSimulator(params=SimulatorParams(spawn_entering=3, spawn_exiting=3, spawn_interval_mean=1, blocked_spots=[], max_simulation_time=max_simulation_time, seed=4))
+
+def scalar_rollout(vehicle, predictor, timesteps):
+    """
+    look-ahead trajectory of one vehicle, rolled out like the uncached will_crash_with
+    """
+    state = PlanarState.from_state(vehicle.state)
+    trajectory = []
+    for _ in range(timesteps):
+        predictor.set_ref_pose(vehicle.x_ref, vehicle.y_ref, vehicle.yaw_ref)
+        predictor.set_ref_v(vehicle.v_ref)
+        predictor.set_target_idx(vehicle.target_idx)
+        ai, di, _ = predictor.solve(state, vehicle.is_braking)
+        predictor.step(state, ai, di)
+        trajectory.append([state.x.x, state.x.y, state.e.psi])
+    return np.array(trajectory)
+
+def active_vehicles(simulator):
+    return {vehicle.vehicle_id: vehicle for vehicle in simulator.vehicles if not vehicle.is_all_done() and len(vehicle.x_ref) > 0}
+
+def test_cached_crash_checks_match_uncached(parking_lot, monkeypatch):
+    checks = []
+    will_crash_with = RuleBasedStanleyVehicle.will_crash_with
+
+    def compare(vehicle):
+        cached = will_crash_with(vehicle)
+        cache, vehicle.look_ahead_cache = vehicle.look_ahead_cache, None
+        uncached = will_crash_with(vehicle)
+        vehicle.look_ahead_cache = cache
+
+        checks.append((len(vehicle.nearby_vehicles), len(uncached)))
+        assert cached == uncached
+        return cached
+
+    monkeypatch.setattr(RuleBasedStanleyVehicle, 'will_crash_with', compare)
+    make_simulator(40).run()
+
+    # the run had vehicles near each other, and some of them about to crash
+    assert any(nearby > 0 for nearby, _ in checks)
+    assert any(crashes > 0 for _, crashes in checks)
+
+def test_new_path_is_rolled_out_again(parking_lot):
+    simulator = make_simulator(8)
+    simulator.run()
+    vehicles = active_vehicles(simulator)
+    cache = simulator.look_ahead_cache
+    timesteps = cache.look_ahead_timesteps
+
+    cache.update(vehicles)
+    vehicle = next(iter(vehicles.values()))
+    assert np.allclose(cache.get(vehicle.vehicle_id), scalar_rollout(vehicle, StanleyController(), timesteps))
+
+    # A path of the same length and the same target index, only shifted sideways
+    vehicle.set_ref_pose(vehicle.x_ref, vehicle.y_ref + 2.0, vehicle.yaw_ref)
+    vehicle.set_target_idx(cache.keys[vehicle.vehicle_id][3])
+
+    assert np.allclose(cache.get(vehicle.vehicle_id), scalar_rollout(vehicle, StanleyController(), timesteps))
+
+def test_vehicles_are_rolled_out_with_their_own_predictor(parking_lot):
+    simulator = make_simulator(8)
+    simulator.run()
+    vehicles = active_vehicles(simulator)
+    assert len(vehicles) >= 2
+    cache = simulator.look_ahead_cache
+    timesteps = cache.look_ahead_timesteps
+
+    slow, other = list(vehicles.values())[:2]
+    slow.motion_predictor = StanleyController(control_params=StanleyParams(k=2.0, Kp=0.3))
+
+    cache.update(vehicles)
+
+    assert len(cache.batch_predictors) == 2
+    assert np.allclose(cache.get(slow.vehicle_id), scalar_rollout(slow, StanleyController(control_params=StanleyParams(k=2.0, Kp=0.3)), timesteps))
+    assert np.allclose(cache.get(other.vehicle_id), scalar_rollout(other, StanleyController(), timesteps))
+
+    assert cache.predicts_like(other.motion_predictor, [id for id in vehicles if id != slow.vehicle_id])
+    assert not cache.predicts_like(other.motion_predictor, [other.vehicle_id, slow.vehicle_id])
@@ -0,0 +1,77 @@
+import pickle
+import threading
+
+import numpy as np
+import pytest
+
+from parksim.simulator.rule_based_simulator import RuleBasedSimulator
+from parksim.simulator_types import SimulatorParams
+from parksim.utils import map_assets
+
+def load_pickle(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+def test_assets_match_the_pickles(parking_lot):
+    spots_path = str(parking_lot / 'spots_data.pickle')
+    graph_path = str(parking_lot / 'waypoints_graph.pickle')
+    maneuver_path = str(parking_lot / 'parking_maneuvers.pickle')
+
+    spots_data = map_assets.get_spots_data(spots_path)
+    expected = load_pickle(spots_path)
+    assert np.array_equal(spots_data['parking_spaces'], expected['parking_spaces'])
+    assert spots_data['overshoot_ranges'] == expected['overshoot_ranges']
+    assert spots_data['north_spot_idx_ranges'] == expected['north_spot_idx_ranges']
+    with pytest.raises(ValueError):
+        spots_data['parking_spaces'][0, 0] = 1.0
+
+    graph, entrance_coords, entrance_vertex = map_assets.get_waypoints_graph(graph_path)
+    expected = load_pickle(graph_path)
+    assert [v.coords.tolist() for v in graph.vertices] == [v.coords.tolist() for v in expected['graph'].vertices]
+    assert entrance_coords == expected['entrance_coords']
+    # nearest vertex by brute force
+    assert entrance_vertex == int(np.argmin([np.linalg.norm(v.coords - np.array(entrance_coords)) for v in graph.vertices]))
+
+    offline_maneuver = map_assets.get_offline_maneuver(maneuver_path)
+    expected = load_pickle(maneuver_path)
+    assert offline_maneuver.lib.keys() == expected.keys()
+    for key in expected:
+        assert np.array_equal(offline_maneuver.lib[key], expected[key])
+
+def test_loaded_once_and_shared(parking_lot):
+    path = str(parking_lot / 'spots_data.pickle')
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(map_assets.get_spots_data(path))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 8
+    assert all(result is results[0] for result in results)
+
+    simulator = RuleBasedSimulator(params=SimulatorParams(spawn_entering=2, spawn_exiting=1, spawn_interval_mean=1, blocked_spots=[], max_simulation_time=5, seed=0))
+    simulator.run()
+    assert len(simulator.vehicles) == 3
+    assert all(vehicle.graph is simulator.graph for vehicle in simulator.vehicles)
+    assert all(vehicle.offline_maneuver is simulator.vehicles[0].offline_maneuver for vehicle in simulator.vehicles)
+
+def test_invalidate_reloads_from_disk(parking_lot):
+    spots_path = str(parking_lot / 'spots_data.pickle')
+    graph_path = str(parking_lot / 'waypoints_graph.pickle')
+    old_spots = map_assets.get_spots_data(spots_path)
+    old_graph = map_assets.get_waypoints_graph(graph_path)[0]
+
+    data = load_pickle(spots_path)
+    data['parking_spaces'] = data['parking_spaces'][:3]
+    with open(spots_path, 'wb') as f:
+        pickle.dump(data, f)
+
+    # still the cached copy
+    assert map_assets.get_spots_data(spots_path) is old_spots
+
+    map_assets.invalidate(spots_path)
+    assert len(map_assets.get_spots_data(spots_path)['parking_spaces']) == 3
+    # other assets are kept
+    assert map_assets.get_waypoints_graph(graph_path)[0] is old_graph
+    assert len(old_spots['parking_spaces']) == 34
@@ -0,0 +1,108 @@
+import json
+import pickle
+
+import numpy as np
+import pytest
+
+from parksim.route_planner.a_star import AStarPlanner
+from parksim.utils import map_assets
+from parksim.utils.map_file import MAGIC, MapFile, convert_pickles, write_map_file
+
+def load_pickle(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+@pytest.fixture
+def map_file_path(parking_lot):
+    path = str(parking_lot / 'parking_lot.pmap')
+    convert_pickles(str(parking_lot / 'spots_data.pickle'), str(parking_lot / 'waypoints_graph.pickle'), str(parking_lot / 'parking_maneuvers.pickle'), path)
+    return path
+
+def test_graph_round_trip(parking_lot, map_file_path):
+    expected = load_pickle(parking_lot / 'waypoints_graph.pickle')
+    expected_graph = expected['graph']
+    graph, entrance_coords = MapFile(map_file_path).build_graph()
+
+    assert entrance_coords == expected['entrance_coords']
+    assert len(graph.vertices) == len(expected_graph.vertices)
+    assert len(graph.edges) == len(expected_graph.edges)
+
+    index = {id(v): i for i, v in enumerate(expected_graph.vertices)}
+    for v, expected_v in zip(graph.vertices, expected_graph.vertices):
+        assert np.array_equal(v.coords, expected_v.coords)
+        assert [graph.vertices.index(child) for child in v.children] == [index[id(child)] for child in expected_v.children]
+        assert [e.c for e in v.edges] == [e.c for e in expected_v.edges]
+
+    for e, expected_e in zip(graph.edges, expected_graph.edges):
+        assert np.array_equal(e.v1.coords, expected_e.v1.coords) and np.array_equal(e.v2.coords, expected_e.v2.coords)
+
+    # Same routes as on the pickled graph
+    rng = np.random.default_rng(0)
+    for start, goal in rng.integers(len(graph.vertices), size=(20, 2)):
+        path = AStarPlanner(graph.vertices[start], graph.vertices[goal], graph).solve()
+        expected_path = AStarPlanner(expected_graph.vertices[start], expected_graph.vertices[goal], expected_graph).solve()
+        assert [v.coords.tolist() for v in path.vertices] == [v.coords.tolist() for v in expected_path.vertices]
+
+    assert graph.route_table is not None and graph.route_table.matches(graph)
+
+def test_spots_and_maneuvers_round_trip(parking_lot, map_file_path):
+    map_file = MapFile(map_file_path)
+
+    spots_data = map_file.spots_data()
+    expected = load_pickle(parking_lot / 'spots_data.pickle')
+    assert np.array_equal(spots_data['parking_spaces'], expected['parking_spaces'])
+    assert spots_data['overshoot_ranges'] == expected['overshoot_ranges']
+    assert spots_data['north_spot_idx_ranges'] == expected['north_spot_idx_ranges']
+    assert spots_data['spot_y_offset'] == expected['spot_y_offset']
+    # read-only memory map
+    with pytest.raises(ValueError):
+        spots_data['parking_spaces'][0, 0] = 1.0
+
+    lib = map_file.maneuver_library()
+    expected = load_pickle(parking_lot / 'parking_maneuvers.pickle')
+    assert lib.keys() == expected.keys()
+    for key in expected:
+        assert np.array_equal(lib[key], expected[key])
+
+def test_map_assets_read_map_files(parking_lot, map_file_path):
+    spots_data = map_assets.get_spots_data(map_file_path)
+    graph, entrance_coords, entrance_vertex = map_assets.get_waypoints_graph(map_file_path)
+    offline_maneuver = map_assets.get_offline_maneuver(map_file_path)
+
+    expected_graph, expected_coords, expected_vertex = map_assets.get_waypoints_graph(str(parking_lot / 'waypoints_graph.pickle'))
+    assert (entrance_coords, entrance_vertex) == (expected_coords, expected_vertex)
+    assert len(spots_data['parking_spaces']) == 34
+    assert offline_maneuver.lib.keys() == map_assets.get_offline_maneuver(str(parking_lot / 'parking_maneuvers.pickle')).lib.keys()
+    # memory-mapped once for all three assets
+    assert map_assets.get_map_file(map_file_path) is map_assets.get_map_file(map_file_path)
+
+def test_rejects_other_files_and_versions(tmp_path):
+    not_a_map = tmp_path / 'not_a_map.pmap'
+    not_a_map.write_bytes(b'hello world, not a map file')
+    with pytest.raises(ValueError):
+        MapFile(str(not_a_map))
+
+    path = str(tmp_path / 'future.pmap')
+    write_map_file(path, {'a': np.arange(3)}, {})
+    with open(path, 'r+b') as f:
+        f.seek(len(MAGIC))
+        header_len = int(np.frombuffer(f.read(8), dtype='<u8')[0])
+        header = json.loads(f.read(header_len))
+        header['version'] = 2
+        new_header = json.dumps(header).encode('utf-8')
+        assert len(new_header) == header_len
+        f.seek(len(MAGIC) + 8)
+        f.write(new_header)
+    with pytest.raises(ValueError):
+        MapFile(path)
+
+def test_arrays_keep_dtypes_and_shapes(tmp_path):
+    arrays = {'ints': np.arange(5, dtype=np.int32), 'matrix': np.arange(12.0).reshape(3, 4), 'empty': np.zeros((7, 0)), 'flags': np.array([True, False])}
+    path = str(tmp_path / 'arrays.pmap')
+    write_map_file(path, arrays, {'name': 'test'})
+
+    map_file = MapFile(path)
+    assert map_file.meta == {'name': 'test'}
+    for name, a in arrays.items():
+        assert map_file.arrays[name].dtype == a.dtype
+        assert np.array_equal(map_file.arrays[name], a)
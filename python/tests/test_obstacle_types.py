@@ -0,0 +1,81 @@
+import numpy as np
+
+from parksim.obstacle_types import RectangleObstacle, rasterize_obstacles
+from parksim.vehicle_types import VehicleBody
+
+def reference_rectangle(xc, yc, w, h, psi):
+    """
+    xy, V, A and b of a rectangle computed eagerly with matrix products and solves, as RectangleObstacle did before
+    """
+    R = np.array([[np.cos(psi), np.sin(psi)], [-np.sin(psi), np.cos(psi)]])
+    xy = np.array([[-w/2, -h/2], [-w/2, h/2], [w/2, h/2], [w/2, -h/2], [-w/2, -h/2]]) @ R + np.array([[xc, yc]])
+    A = np.array([[1, 0], [0, 1], [-1, 0], [0, -1]]) @ R
+    l = np.linalg.solve(R.T, np.array([[-xc], [-yc]])).squeeze() + np.array([w/2, h/2])
+    u = np.linalg.solve(R.T, np.array([[xc], [yc]])).squeeze() + np.array([w/2, h/2])
+    return {'xy': xy, 'V': xy[:-1], 'A': A, 'b': np.concatenate([u, l])}
+
+def reference_rasterize(obstacles, grid_size):
+    """
+    the edge sampling loop of the HOBCA warm start
+    """
+    ox, oy = [], []
+    for obs in obstacles:
+        for i in range(4):
+            num_steps = int(np.linalg.norm(obs.xy[i] - obs.xy[i+1])/grid_size)
+            for x, y in zip(np.linspace(obs.xy[i, 0], obs.xy[i+1, 0], num_steps), np.linspace(obs.xy[i, 1], obs.xy[i+1, 1], num_steps)):
+                ox.append(x)
+                oy.append(y)
+    return ox, oy
+
+def assert_matches(obs, expected):
+    for name, value in expected.items():
+        assert np.allclose(getattr(obs, name), value, rtol=0, atol=1e-12)
+
+def random_rectangles(rng, n):
+    return rng.uniform(-20, 20, n), rng.uniform(-20, 20, n), rng.uniform(0.5, 6, n), rng.uniform(0.5, 6, n), rng.uniform(-np.pi, np.pi, n)
+
+def test_lazy_rectangle_matches_eager():
+    rng = np.random.default_rng(0)
+    for xc, yc, w, h, psi in zip(*random_rectangles(rng, 30)):
+        obs = RectangleObstacle(xc=xc, yc=yc, w=w, h=h, psi=psi)
+        assert 'V' not in obs.__dict__
+        assert_matches(obs, reference_rectangle(xc, yc, w, h, psi))
+
+        # a changed field is picked up on the next read
+        obs.psi = psi + 0.5
+        obs.xc = xc - 1.0
+        assert_matches(obs, reference_rectangle(xc - 1.0, yc, w, h, psi + 0.5))
+
+def test_from_arrays_matches_individual():
+    rng = np.random.default_rng(1)
+    xc, yc, w, h, psi = random_rectangles(rng, 25)
+
+    batch = RectangleObstacle.from_arrays(xc, yc, w, h, psi)
+    assert len(batch) == 25
+    for obs, args in zip(batch, zip(xc, yc, w, h, psi)):
+        assert_matches(obs, reference_rectangle(*args))
+        single = RectangleObstacle(xc=args[0], yc=args[1], w=args[2], h=args[3], psi=args[4])
+        assert (obs.xc, obs.yc, obs.w, obs.h, obs.psi) == (single.xc, single.yc, single.w, single.h, single.psi)
+
+    # scalars are shared by all rectangles, and batch members still follow changes
+    batch = RectangleObstacle.from_arrays(xc=[-3.8, 3.8], yc=-6.11, w=5, h=5.22)
+    assert_matches(batch[1], reference_rectangle(3.8, -6.11, 5, 5.22, 0))
+    batch[1].w = 2.0
+    assert_matches(batch[1], reference_rectangle(3.8, -6.11, 2.0, 5.22, 0))
+
+def test_vehicle_body():
+    body = VehicleBody()
+    l, w = body.l, body.w
+    assert np.array_equal(body.V, np.array([[l/2, w/2], [-l/2, w/2], [-l/2, -w/2], [l/2, -w/2]]))
+    assert np.array_equal(body.b, np.array([l/2, w/2, l/2, w/2]))
+
+    body.w = 2.0
+    assert np.array_equal(body.b, np.array([l/2, 1.0, l/2, 1.0]))
+
+def test_rasterize_matches_edge_loop():
+    rng = np.random.default_rng(2)
+    obstacles = RectangleObstacle.from_arrays(*random_rectangles(rng, 10))
+    for grid_size in [0.4625, 1.0]:
+        ox, oy = rasterize_obstacles(obstacles, grid_size)
+        expected_ox, expected_oy = reference_rasterize(obstacles, grid_size)
+        assert np.allclose(ox, expected_ox) and np.allclose(oy, expected_oy)
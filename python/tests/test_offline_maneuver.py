@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from parksim.utils import map_assets
+from parksim.utils.interpolation import interpolate_states_inputs
+
+FIELDS = ['t', 'x', 'y', 'psi', 'v', 'u_a', 'u_steer']
+
+@pytest.fixture
+def offline_maneuver(parking_lot):
+    return map_assets.get_offline_maneuver(str(parking_lot / 'parking_maneuvers.pickle'))
+
+def test_resampled_matches_interpolation(offline_maneuver):
+    rng = np.random.default_rng(0)
+    for dt in [0.1, 0.05]:
+        for key in offline_maneuver.lib:
+            xy_offset = rng.uniform(-50, 50, 2)
+            maneuver = offline_maneuver.get_maneuver(xy_offset, *key)
+            expected = interpolate_states_inputs(maneuver, np.arange(start=maneuver.t[0], stop=maneuver.t[-1], step=dt))
+
+            result = offline_maneuver.get_resampled_maneuver(xy_offset, *key, dt)
+            for name in FIELDS:
+                assert np.allclose(getattr(result, name), getattr(expected, name), rtol=0, atol=1e-12)
+
+def test_resampled_once_per_dt(offline_maneuver):
+    offline_maneuver.resample_all(0.1)
+    assert len(offline_maneuver.resampled) == len(offline_maneuver.lib)
+
+    key = next(iter(offline_maneuver.lib))
+    first = offline_maneuver.get_resampled_maneuver([1.0, 2.0], *key, 0.1)
+    second = offline_maneuver.get_resampled_maneuver([3.0, 4.0], *key, 0.1)
+    assert len(offline_maneuver.resampled) == len(offline_maneuver.lib)
+
+    # offsets stay with their request, the rest is shared and read-only
+    assert np.allclose(second.x - first.x, 2.0) and np.allclose(second.y - first.y, 2.0)
+    assert first.psi is second.psi and not first.psi.flags.writeable
+    with pytest.raises(ValueError):
+        first.v[0] = 1.0
+
+    offline_maneuver.get_resampled_maneuver([0, 0], *key, 0.2)
+    assert len(offline_maneuver.resampled) == len(offline_maneuver.lib) + 1
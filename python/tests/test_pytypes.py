@@ -0,0 +1,160 @@
+import math
+import operator
+
+import numpy as np
+
+from parksim.controller.stanley_controller import StanleyController
+from parksim.pytypes import PlanarState, VehiclePrediction, VehicleState
+from parksim.simulator.fleet_state import FleetState
+from parksim.utils.spline import calc_spline_course
+from parksim.utils.trajectory_recorder import TrajectoryRecorder
+
+PLANAR_FIELDS = ['x.x', 'x.y', 'e.psi', 'v.v', 'u.u_a', 'u.u_steer']
+
+def planar_fields(state):
+    return [state.t] + [getattr(getattr(state, name.split('.')[0]), name.split('.')[1]) for name in PLANAR_FIELDS]
+
+def make_states(n, seed=0):
+    rng = np.random.default_rng(seed)
+    states = []
+    for k in range(n):
+        state = VehicleState()
+        state.t = None if k % 3 == 0 else float(k)
+        state.x.x, state.x.y = rng.uniform(-50, 50, 2).tolist()
+        state.e.psi = float(rng.uniform(-np.pi, np.pi))
+        state.v.v = float(rng.uniform(0, 5))
+        state.u.u_a, state.u.u_steer = rng.uniform(-1, 1, 2).tolist()
+        state.p.s = float(rng.uniform(0, 100))
+        state.vehicle_id = k
+        states.append(state)
+    return states
+
+def test_planar_state_round_trip():
+    for state in make_states(6):
+        planar = PlanarState.from_state(state)
+        assert planar_fields(planar) == planar_fields(state)
+
+        back = planar.to_vehicle_state()
+        assert planar_fields(back) == planar_fields(state)
+        # fields PlanarState does not hold keep their defaults
+        assert back.p.s == VehicleState().p.s and back.vehicle_id == VehicleState().vehicle_id
+
+        copy = planar.copy()
+        assert planar_fields(copy) == planar_fields(planar)
+        copy.x.x += 1.0
+        copy.u.u_steer = 0.5
+        assert planar_fields(planar) == planar_fields(state)
+
+def test_controller_on_planar_state_matches_vehicle_state():
+    cx, cy, cyaw, _, _ = calc_spline_course(np.array([0.0, 15.0, 30.0, 45.0]), np.array([0.0, 4.0, -2.0, 3.0]), ds=0.1)
+    controllers = []
+    for _ in range(2):
+        controller = StanleyController()
+        controller.set_ref_pose(cx, cy, cyaw)
+        controller.set_ref_v(4.0)
+        controller.set_target_idx(0)
+        controllers.append(controller)
+
+    state = make_states(1)[0]
+    state.x.x, state.x.y, state.e.psi, state.v.v = 0.5, -0.5, 0.1, 1.0
+    states = [state, PlanarState.from_state(state)]
+
+    for k in range(100):
+        for controller, s in zip(controllers, states):
+            acceleration, delta, _ = controller.solve(s, braking=k > 80)
+            controller.step(s, acceleration, delta)
+        assert planar_fields(states[1])[1:] == planar_fields(states[0])[1:]
+
+    # copies are taken from the fleet arrays as PlanarStates
+    fleet = FleetState()
+    view = fleet.add(state, wb=controllers[0].L, max_steer=controllers[0].max_steer, dt=controllers[0].dt)
+    assert isinstance(view.copy(), PlanarState)
+    assert planar_fields(view.copy())[1:] == planar_fields(fleet.get_state(view.slot))[1:]
+
+def test_pack_unpack_round_trip():
+    states = make_states(10)
+
+    arrays = VehicleState.pack_arrays(states)
+    assert arrays['x.x'].dtype == np.float64 and len(arrays['x.x']) == 10
+    assert np.isnan(arrays['t'][0]) and arrays['t'][1] == 1.0
+
+    unpacked = VehicleState.unpack_arrays(arrays)
+    assert unpacked == states
+
+def test_pack_selected_fields_of_planar_states():
+    states = [PlanarState(x=k, y=-k, psi=0.1 * k) for k in range(5)]
+
+    arrays = VehicleState.pack_arrays(states, fields=['x.x', 'x.y', 'e.psi'])
+
+    assert list(arrays) == ['x.x', 'x.y', 'e.psi']
+    assert np.array_equal(arrays['x.y'], -np.arange(5))
+    assert np.allclose(arrays['e.psi'], 0.1 * np.arange(5))
+
+def test_prediction_to_states():
+    pred = VehiclePrediction()
+    pred.x = np.array([0.0, 1.0, 2.0])
+    pred.y = np.array([3.0, 4.0, 5.0])
+    pred.psi = np.array([0.1, 0.2, 0.3])
+    # not one value per step, so not unpacked
+    pred.u_a = np.array([1.0])
+
+    states = pred.to_states()
+
+    assert [s.x.x for s in states] == [0.0, 1.0, 2.0]
+    assert [s.x.y for s in states] == [3.0, 4.0, 5.0]
+    assert [s.e.psi for s in states] == [0.1, 0.2, 0.3]
+    assert all(s.u.u_a == 0 and s.t is None for s in states)
+
+def test_recorder_to_states_matches_indexing():
+    recorder = TrajectoryRecorder(chunk_size=4, max_length=7)
+    states = make_states(12)
+    for k, state in enumerate(states):
+        recorder.record(None if k == 8 else float(k), state, "CRUISE")
+
+    exported = recorder.to_states()
+
+    assert len(exported) == 7
+    assert exported == [recorder[i] for i in range(len(recorder))]
+    assert exported[0].x.x == states[5].x.x
+    assert exported[3].t is None
+
+    pred = recorder.to_prediction()
+    assert np.array_equal(pred.x, recorder.get('x'))
+
+def test_pack_list_matches_per_state_fields():
+    states = make_states(7)
+    for use_numpy in [False, True]:
+        packed = VehicleState.pack_list(states, use_numpy=use_numpy)
+        for name in ['t', 'vehicle_id', 'x.x', 'x.y', 'e.psi', 'v.v', 'p.s', 'u.u_a', 'u.u_steer']:
+            expected = [operator.attrgetter(name)(state) for state in states]
+            values = operator.attrgetter(name)(packed)
+            if use_numpy:
+                assert isinstance(values, np.ndarray)
+                assert np.allclose(values, np.array(expected, dtype=float), equal_nan=True)
+            else:
+                assert values == expected
+
+def test_velocity_frames_match_scalar_formulas():
+    rng = np.random.default_rng(2)
+    pred = VehiclePrediction()
+    pred.psi = rng.uniform(-np.pi, np.pi, 6).tolist()
+    pred.v_x, pred.v_y, pred.a_x, pred.a_y = rng.uniform(-3, 3, (4, 6)).tolist()
+
+    pred.update_body_velocity_from_global()
+    for name in ['v_long', 'v_tran', 'a_long', 'a_tran']:
+        assert isinstance(getattr(pred, name), list)
+    for k, psi in enumerate(pred.psi):
+        c, s = math.cos(psi), math.sin(psi)
+        assert np.isclose(pred.v_long[k], pred.v_x[k] * c + pred.v_y[k] * s)
+        assert np.isclose(pred.v_tran[k], -pred.v_x[k] * s + pred.v_y[k] * c)
+        assert np.isclose(pred.a_long[k], pred.a_x[k] * c + pred.a_y[k] * s)
+        # a_tran has always been computed from a_y alone
+        assert np.isclose(pred.a_tran[k], -pred.a_y[k] * s + pred.a_y[k] * c)
+
+    v_x, v_y = pred.v_x, pred.v_y
+    pred.update_global_velocity_from_body()
+    for name in ['v_x', 'v_y', 'a_x', 'a_y']:
+        assert isinstance(getattr(pred, name), list)
+    assert np.allclose(pred.v_x, v_x) and np.allclose(pred.v_y, v_y)
+    # lists can still be concatenated
+    assert len(pred.v_x + pred.v_y) == 12
@@ -0,0 +1,70 @@
+from itertools import product
+
+import numpy as np
+
+from parksim.agents.abstract_agent import AbstractAgent
+from parksim.pytypes import VehicleState
+from parksim.utils.rectangle_to_circles import circles_collide, v2c
+from parksim.vehicle_types import VehicleBody
+
+def make_state(x, y, psi):
+    state = VehicleState()
+    state.x.x, state.x.y, state.e.psi = x, y, psi
+    return state
+
+def reference_circles(state, vehicle_body):
+    """
+    circles placed by interpolating between the rear and front circle, as v2c did before
+    """
+    start_xc = state.x.x - vehicle_body.cr * np.cos(state.e.psi)
+    start_yc = state.x.y - vehicle_body.cr * np.sin(state.e.psi)
+    end_xc = state.x.x + vehicle_body.cf * np.cos(state.e.psi)
+    end_yc = state.x.y + vehicle_body.cf * np.sin(state.e.psi)
+
+    xcs = np.linspace(start_xc, end_xc, vehicle_body.num_circles)
+    ycs = np.linspace(start_yc, end_yc, vehicle_body.num_circles)
+    return [(xc, yc, vehicle_body.w / 2) for xc, yc in zip(xcs, ycs)]
+
+def reference_collide(this_state, other_state, vehicle_body):
+    for circle_a, circle_b in product(reference_circles(this_state, vehicle_body), reference_circles(other_state, vehicle_body)):
+        if np.linalg.norm([circle_a[0] - circle_b[0], circle_a[1] - circle_b[1]]) < circle_a[2] + circle_b[2]:
+            return True
+    return False
+
+def random_poses(rng, shape):
+    return np.stack([rng.uniform(0, 12, shape), rng.uniform(0, 12, shape), rng.uniform(-np.pi, np.pi, shape)], axis=-1)
+
+def test_v2c_matches_reference():
+    rng = np.random.default_rng(0)
+    body = VehicleBody()
+    for pose in random_poses(rng, 20):
+        state = make_state(*pose)
+        assert np.allclose(v2c(state, body), reference_circles(state, body))
+
+def test_will_collide_matches_reference():
+    rng = np.random.default_rng(1)
+    body = VehicleBody()
+    agent = AbstractAgent(0, VehicleState(), body)
+
+    results = []
+    for this_pose, other_pose in zip(random_poses(rng, 300), random_poses(rng, 300)):
+        this_state, other_state = make_state(*this_pose), make_state(*other_pose)
+        expected = reference_collide(this_state, other_state, body)
+        assert agent.will_collide(this_state, other_state, body) == expected
+        results.append(expected)
+
+    # both outcomes were checked
+    assert any(results) and not all(results)
+
+def test_broadcast_matches_pairwise():
+    rng = np.random.default_rng(2)
+    body = VehicleBody()
+    # T time steps of one vehicle against K others
+    this_trajectory = random_poses(rng, (15, 1))
+    other_trajectories = random_poses(rng, (15, 6))
+
+    collide = circles_collide(this_trajectory, other_trajectories, body)
+
+    assert collide.shape == (15, 6)
+    for t, k in np.ndindex(collide.shape):
+        assert collide[t, k] == reference_collide(make_state(*this_trajectory[t, 0]), make_state(*other_trajectories[t, k]), body)
@@ -0,0 +1,87 @@
+import numpy as np
+
+from parksim.agents.rule_based_stanley_vehicle import RuleBasedStanleyVehicle
+from parksim.route_planner.ref_path_cache import RefPathCache
+from parksim.simulator import rule_based_simulator
+from parksim.simulator.rule_based_simulator import RuleBasedSimulator
+from parksim.simulator_types import SimulatorParams
+from parksim.vehicle_types import VehicleBody, VehicleConfig
+
+def make_params(prewarm_ref_paths=False, seed=4):
+    return SimulatorParams(spawn_entering=3, spawn_exiting=3, spawn_interval_mean=1, blocked_spots=[2], max_simulation_time=40, seed=seed, prewarm_ref_paths=prewarm_ref_paths)
+
+def make_planner():
+    vehicle = RuleBasedStanleyVehicle(vehicle_id=0, vehicle_body=VehicleBody(), vehicle_config=VehicleConfig())
+    vehicle.load_parking_spaces(spots_data_path=rule_based_simulator.spots_data_path)
+    vehicle.load_graph(waypoints_graph_path=rule_based_simulator.waypoints_graph_path)
+    return vehicle
+
+def test_cached_paths_match_uncached_planning(parking_lot):
+    cached, uncached = make_planner(), make_planner()
+    cached.set_ref_path_cache(RefPathCache())
+
+    # the entrance road and both connectors
+    starts = [cached.graph.search(coords) for coords in [[-9.0, 20.0], [0.0, 10.0], [60.0, 10.0]]]
+    spots = list(range(len(cached.parking_spaces)))
+    for _ in range(2):
+        for start in starts:
+            for spot in spots:
+                paths = [cached.plan_ref_path_to_spot(start, spot), uncached.plan_ref_path_to_spot(start, spot)]
+                for a, b in zip(*paths):
+                    assert np.array_equal(a, b)
+                assert cached.should_overshoot == uncached.should_overshoot
+
+            goal = (start + 7) % len(cached.graph.vertices)
+            for a, b in zip(cached.plan_ref_path_to_vertex(start, goal), uncached.plan_ref_path_to_vertex(start, goal)):
+                assert np.array_equal(a, b)
+
+    assert cached.ref_path_cache.misses == len(starts) * (len(spots) + 1)
+    assert cached.ref_path_cache.hits == cached.ref_path_cache.misses
+
+def test_prewarm_from_the_entrance(parking_lot):
+    simulator = RuleBasedSimulator(params=make_params(prewarm_ref_paths=True))
+    cache = simulator.ref_path_cache
+
+    # One path per free spot, planned before any vehicle is added
+    assert simulator.vehicles == []
+    assert len(cache) == len(simulator.parking_spaces) - 1
+    entrance_vertex_idx = simulator.graph.search([simulator.entrance_coords[0] - VehicleConfig().offset, simulator.entrance_coords[1]])
+    assert all(key[:2] == ('spot', entrance_vertex_idx) for key in cache.entries)
+
+    planner = make_planner()
+    for (_, start, spot, _), (x_ref, y_ref, yaw_ref, should_overshoot) in cache.entries.items():
+        for a, b in zip((x_ref, y_ref, yaw_ref), planner.plan_ref_path_to_spot(start, spot)):
+            assert np.array_equal(a, b)
+        assert should_overshoot == planner.should_overshoot
+
+def test_prewarm_does_not_change_the_run(parking_lot):
+    results = []
+    for prewarm_ref_paths in [False, True]:
+        simulator = RuleBasedSimulator(params=make_params(prewarm_ref_paths=prewarm_ref_paths))
+        simulator.run()
+        results.append({vehicle.vehicle_id: np.vstack([vehicle.state_hist.get('x'), vehicle.state_hist.get('y')]) for vehicle in simulator.vehicles})
+
+    assert results[0].keys() == results[1].keys()
+    for vehicle_id in results[0]:
+        assert np.array_equal(results[0][vehicle_id], results[1][vehicle_id])
+
+def test_eviction():
+    cache = RefPathCache(max_entries=2)
+    graph, other_graph = object(), object()
+    for key in 'abc':
+        cache.put(graph, key, np.zeros(4), np.zeros(4), np.zeros(4))
+    assert list(cache.entries) == ['b', 'c']
+
+    cache.get(graph, 'b')
+    cache.put(graph, 'd', np.zeros(4), np.zeros(4), np.zeros(4))
+    assert list(cache.entries) == ['b', 'd']
+    assert cache.nbytes == 2 * 3 * 4 * 8
+
+    small = RefPathCache(max_bytes=3 * 4 * 8)
+    small.put(graph, 'a', np.zeros(4), np.zeros(4), np.zeros(4))
+    x_ref, _, _, _ = small.put(graph, 'b', np.zeros(8), np.zeros(8), np.zeros(8))
+    assert len(x_ref) == 8 and not x_ref.flags.writeable
+    assert list(small.entries) == ['a']
+
+    # another graph drops every path
+    assert cache.get(other_graph, 'b') is None and len(cache) == 0
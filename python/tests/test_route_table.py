@@ -0,0 +1,129 @@
+import numpy as np
+import pytest
+
+from parksim.route_planner.a_star import AStarPlanner
+from parksim.route_planner.graph import Edge, WaypointsGraph
+from parksim.route_planner.route_table import RouteTable, plan_dist_dir_batch, plan_route, route_table_path
+from parksim.utils import map_assets
+
+from conftest import make_waypoints_graph
+
+def random_graph(rng):
+    graph = WaypointsGraph()
+    points = rng.uniform(0, 100, (50, 2))
+    graph.add_waypoint_list(points)
+    for i, j in rng.integers(len(points), size=(70, 2)):
+        if i != j:
+            graph.connect(points[i], points[j])
+    return graph
+
+def astar_cost(graph, start, goal):
+    try:
+        return AStarPlanner(graph.vertices[start], graph.vertices[goal], graph).solve().path_cost()
+    except Exception:
+        return np.inf
+
+@pytest.mark.parametrize('make_graph', [lambda rng: make_waypoints_graph(), random_graph])
+def test_routes_are_as_short_as_astar(make_graph):
+    rng = np.random.default_rng(0)
+    graph = make_graph(rng)
+    table = RouteTable.build(graph)
+    index = {id(v): i for i, v in enumerate(graph.vertices)}
+
+    for start, goal in rng.integers(len(graph.vertices), size=(150, 2)):
+        expected = astar_cost(graph, start, goal)
+        assert np.isclose(table.distance(start, goal), expected) or (np.isinf(expected) and np.isinf(table.distance(start, goal)))
+
+        if np.isinf(expected):
+            assert table.route(start, goal) == []
+            with pytest.raises(Exception, match='Path is not found'):
+                plan_route(graph, start, goal)
+            continue
+
+        path = table.astar_graph(graph, start, goal)
+        assert np.isclose(path.path_cost(), expected)
+        # a connected path from start to goal
+        if start != goal:
+            assert [index[id(v)] for v in path.vertices] == table.route(start, goal)
+            assert all(e.v2 is f.v1 for e, f in zip(path.edges[:-1], path.edges[1:]))
+
+            first = path.edges[0]
+            direction = first.v2.coords - first.v1.coords
+            assert np.allclose(table.first_direction(graph, start, goal), direction / np.linalg.norm(direction))
+
+def test_cheapest_parallel_edge():
+    graph = WaypointsGraph()
+    graph.add_waypoint_list(np.array([[0.0, 0.0], [1.0, 0.0]]))
+    v1, v2 = graph.vertices
+    cheap = Edge(v1, v2, 0.5)
+    v1.add_child(v2, cheap)
+    graph.edges.append(cheap)
+
+    table = RouteTable.build(graph)
+    assert table.distance(0, 1) == 0.5
+    assert table.astar_graph(graph, 0, 1).edges == [cheap]
+
+def test_save_load_and_fallback(parking_lot):
+    graph_path = str(parking_lot / 'waypoints_graph.pickle')
+    graph = map_assets.get_waypoints_graph(graph_path)[0]
+    assert graph.route_table is None
+
+    table = RouteTable.build(graph)
+    table.save(route_table_path(graph_path))
+    map_assets.invalidate()
+    graph = map_assets.get_waypoints_graph(graph_path)[0]
+
+    loaded = graph.route_table
+    assert np.array_equal(loaded.dist, table.dist) and np.array_equal(loaded.next_hop, table.next_hop)
+    assert loaded.signature == table.signature and loaded.matches(graph)
+
+    # Once the graph changes, plan_route plans with A* again
+    graph.add_waypoint_list(np.array([[30.0, 10.0], [33.0, 10.0]]))
+    graph.connect([30.0, 20.0], [30.0, 10.0])
+    assert not loaded.matches(graph)
+    start, goal = graph.search([60.0, 20.0]), len(graph.vertices) - 1
+    assert np.isclose(plan_route(graph, start, goal).path_cost(), astar_cost(graph, start, goal))
+
+def scalar_dist_dir(graph, vehicle_coords, heading, target_coords):
+    """
+    A* distance and direction to one target, as compute_Astar_dist_dir does in the intent feature builders
+    """
+    current_vertex_idx = graph.search(np.array(vehicle_coords))
+    spot_vertex_idx = graph.search(target_coords)
+    if spot_vertex_idx == current_vertex_idx:
+        return 0, 0, []
+
+    astar_graph = AStarPlanner(graph.vertices[current_vertex_idx], graph.vertices[spot_vertex_idx], graph).solve()
+    path_vector = astar_graph.vertices[1].coords - astar_graph.vertices[0].coords
+    heading_vector = np.array([np.cos(heading), np.sin(heading)])
+
+    return astar_graph.path_cost(), path_vector @ heading_vector / np.linalg.norm(path_vector), astar_graph.edges
+
+def test_dist_dir_batch_matches_scalar_astar(parking_lot):
+    graph = map_assets.get_waypoints_graph(str(parking_lot / 'waypoints_graph.pickle'))[0]
+    spot_centers = list(map_assets.get_spots_data(str(parking_lot / 'spots_data.pickle'))['parking_spaces'])
+
+    rng = np.random.default_rng(0)
+    # the first vehicle sits on a spot center, so one target is its own vertex
+    for vehicle_coords, heading in zip([spot_centers[3]] + list(rng.uniform(0, 60, (5, 2))), rng.uniform(-np.pi, np.pi, 6)):
+        for with_table in [False, True]:
+            graph.route_table = RouteTable.build(graph) if with_table else None
+            expected = [scalar_dist_dir(graph, vehicle_coords, heading, c) for c in spot_centers]
+
+            dists, dirs = plan_dist_dir_batch(graph, vehicle_coords, heading, spot_centers)
+            assert np.allclose(dists, [e[0] for e in expected])
+            assert np.allclose(dirs, [e[1] for e in expected])
+
+            dists, dirs, paths = plan_dist_dir_batch(graph, vehicle_coords, heading, spot_centers, return_paths=True)
+            for path, e in zip(paths, expected):
+                assert np.isclose(path.path_cost(), e[0])
+                assert [edge.v2.coords.tolist() for edge in path.edges] == [edge.v2.coords.tolist() for edge in e[2]]
+
+def test_dist_dir_batch_empty_and_unreachable():
+    graph = make_waypoints_graph()
+    assert [len(a) for a in plan_dist_dir_batch(graph, [0, 0], 0.0, [])] == [0, 0]
+    assert [len(a) for a in plan_dist_dir_batch(graph, [0, 0], 0.0, [], return_paths=True)] == [0, 0, 0]
+
+    graph.add_waypoint_list(np.array([[200.0, 200.0]]))
+    with pytest.raises(Exception, match='Path is not found'):
+        plan_dist_dir_batch(graph, [0, 0], 0.0, [np.array([30.0, 0.0]), np.array([200.0, 200.0])])
@@ -0,0 +1,85 @@
+import numpy as np
+
+from parksim.simulator.observers import SimulatorObserver
+from parksim.simulator.rule_based_simulator import RuleBasedSimulator
+from parksim.simulator_types import SimulatorParams
+
+def make_params(seed=1, max_simulation_time=60.0):
+    return SimulatorParams(spawn_entering=2, spawn_exiting=2, spawn_interval_mean=3, blocked_spots=[], max_simulation_time=max_simulation_time, seed=seed)
+
+def trajectories(simulator):
+    return {vehicle.vehicle_id: np.vstack([vehicle.state_hist.get('x'), vehicle.state_hist.get('y'), vehicle.state_hist.get('psi')]) for vehicle in simulator.vehicles}
+
+class CountingObserver(SimulatorObserver):
+    def __init__(self, paused_calls=0):
+        self.paused_calls = paused_calls
+        self.waits = 0
+        self.steps = []
+        self.finishes = 0
+
+    def is_running(self):
+        if self.paused_calls > 0:
+            self.paused_calls -= 1
+            return False
+        return True
+
+    def wait(self):
+        self.waits += 1
+
+    def on_step(self, simulator):
+        self.steps.append(simulator.time)
+
+    def on_finish(self, simulator):
+        self.finishes += 1
+
+class StubVisualizer(object):
+    def __init__(self):
+        self.frames = 0
+        self.drawn = []
+
+    def is_running(self):
+        return True
+
+    def render(self):
+        self.frames += 1
+
+    def clear_frame(self):
+        return
+
+    def draw_vehicles(self, states, fills):
+        self.drawn.append(len(states))
+
+def test_headless_run_without_dataset(parking_lot):
+    simulator = RuleBasedSimulator(params=make_params())
+    simulator.run()
+
+    assert simulator.dlpvis is None
+    assert len(simulator.vehicles) == 4
+    assert all(vehicle.is_all_done() for vehicle in simulator.vehicles)
+    assert simulator.time < simulator.max_simulation_time
+
+def test_observer_hooks(parking_lot):
+    observer = CountingObserver(paused_calls=3)
+    simulator = RuleBasedSimulator(observers=[observer], params=make_params())
+    simulator.run()
+
+    assert observer.waits == 3
+    assert len(observer.steps) == simulator.loops
+    assert np.allclose(observer.steps, 0.1 * np.arange(1, simulator.loops + 1))
+    assert observer.finishes == 1
+
+def test_visualizer_does_not_change_the_simulation(parking_lot):
+    headless = RuleBasedSimulator(params=make_params())
+    headless.run()
+
+    vis = StubVisualizer()
+    drawn = RuleBasedSimulator(vis=vis, params=make_params())
+    drawn.run()
+
+    assert vis.frames == drawn.loops
+    assert vis.drawn[-1] == len(drawn.vehicles)
+
+    expected, actual = trajectories(headless), trajectories(drawn)
+    assert expected.keys() == actual.keys()
+    for vehicle_id in expected:
+        assert np.array_equal(expected[vehicle_id], actual[vehicle_id])
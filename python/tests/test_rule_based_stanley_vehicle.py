@@ -0,0 +1,46 @@
+import array
+
+import numpy as np
+
+from parksim.agents.rule_based_stanley_vehicle import RuleBasedStanleyVehicle
+from parksim.pytypes import VehicleState
+from parksim.vehicle_types import VehicleBody, VehicleConfig
+
+def make_vehicle():
+    vehicle = RuleBasedStanleyVehicle(vehicle_id=1, vehicle_body=VehicleBody(), vehicle_config=VehicleConfig())
+    state = VehicleState()
+    state.x.x, state.x.y, state.e.psi = 1.0, 0.5, 0.1
+    vehicle.set_vehicle_state(state=state)
+    return vehicle
+
+def test_ref_pose_arrays_match_lists():
+    vehicle, listed = make_vehicle(), make_vehicle()
+    x_ref = np.linspace(0, 10, 101)
+    y_ref = np.sin(x_ref)
+    yaw_ref = np.arctan(np.cos(x_ref))
+
+    vehicle.set_ref_pose(x_ref, y_ref, yaw_ref)
+    listed.set_ref_pose(x_ref.tolist(), y_ref.tolist(), yaw_ref.tolist())
+
+    for a, b in zip((vehicle.x_ref, vehicle.y_ref, vehicle.yaw_ref), (listed.x_ref, listed.y_ref, listed.yaw_ref)):
+        assert a.dtype == np.float64 and a.flags.c_contiguous
+        assert np.array_equal(a, b)
+    assert vehicle.target_idx == listed.target_idx
+    assert vehicle.controller.calc_target_index(vehicle.state) == listed.controller.calc_target_index(listed.state)
+
+    # read-only float64 paths, as the ref path cache stores them, are shared without copying
+    x_ref.setflags(write=False)
+    vehicle.set_ref_pose(x_ref, y_ref, yaw_ref)
+    assert vehicle.x_ref is x_ref and vehicle.y_ref is y_ref
+
+def test_info_follows_the_ref_pose():
+    vehicle = make_vehicle()
+    for n in [11, 5, 5]:
+        x_ref, y_ref, yaw_ref = np.arange(float(n)), np.full(n, 2.0), np.zeros(n)
+        vehicle.set_ref_pose(x_ref, y_ref, yaw_ref)
+        vehicle.get_info()
+
+        info = vehicle.get_info()
+        assert info.ref_pose.x == array.array('d', x_ref.tolist())
+        assert info.ref_pose.y == array.array('d', y_ref.tolist())
+        assert info.ref_pose.psi == array.array('d', yaw_ref.tolist())
@@ -0,0 +1,125 @@
+import numpy as np
+
+from parksim.pytypes import VehicleState
+from parksim.simulator.rule_based_simulator import RuleBasedSimulator
+from parksim.simulator.scenario_runner import KPIObserver, make_sweep, run_scenario, run_scenarios
+from parksim.simulator_types import SimulatorParams
+from parksim.utils.rectangle_to_circles import circles_collide
+from parksim.vehicle_types import VehicleBody
+
+class StubVehicle(object):
+    def __init__(self, vehicle_id, x, current_task, y=0.0, psi=0.0):
+        self.vehicle_id = vehicle_id
+        self.state = VehicleState()
+        self.state.x.x = x
+        self.state.x.y = y
+        self.state.e.psi = psi
+        self.current_task = current_task
+        self.task_history = []
+
+    def is_all_done(self):
+        return self.current_task == "END"
+
+class StubSimulator(object):
+    def __init__(self, vehicles):
+        self.vehicles = vehicles
+        self.time = 0.0
+
+def run(simulator, observer, duration, dt=0.1):
+    for _ in range(int(round(duration / dt))):
+        simulator.time += dt
+        observer.on_step(simulator)
+
+def test_only_blocked_driving_vehicles_are_deadlocked():
+    blocked_cruiser = StubVehicle(1, 0, "CRUISE")
+    blocked_parker = StubVehicle(2, 20, "PARK")
+    waiting_unparker = StubVehicle(3, 40, "UNPARK")
+    idler = StubVehicle(4, 60, "IDLE")
+    # idled for most of the run and only stopped in a driving task at the end
+    late_cruiser = StubVehicle(5, 80, "IDLE")
+
+    simulator = StubSimulator([blocked_cruiser, blocked_parker, waiting_unparker, idler, late_cruiser])
+    observer = KPIObserver(deadlock_time=10.0)
+
+    run(simulator, observer, 15.0)
+    late_cruiser.current_task = "CRUISE"
+    run(simulator, observer, 2.0)
+    observer.on_finish(simulator)
+
+    assert observer.kpis['deadlocks'] == 2
+    assert observer.kpis['crashes'] == 0
+
+def test_moving_vehicle_is_not_deadlocked():
+    cruiser = StubVehicle(1, 0, "CRUISE")
+    cruiser.state.v.v = 2.0
+
+    simulator = StubSimulator([cruiser])
+    observer = KPIObserver(deadlock_time=10.0)
+
+    run(simulator, observer, 15.0)
+    observer.on_finish(simulator)
+
+    assert observer.kpis['deadlocks'] == 0
+
+def test_crashes_match_pairwise_check():
+    rng = np.random.default_rng(0)
+    vehicles = [StubVehicle(k, rng.uniform(0, 15), "CRUISE", y=rng.uniform(0, 15), psi=rng.uniform(-np.pi, np.pi)) for k in range(12)]
+    body = VehicleBody()
+
+    simulator = StubSimulator(vehicles)
+    observer = KPIObserver(vehicle_body=body)
+    run(simulator, observer, 0.1)
+
+    expected = set()
+    for i, this in enumerate(vehicles):
+        for other in vehicles[i + 1:]:
+            this_pose = [this.state.x.x, this.state.x.y, this.state.e.psi]
+            other_pose = [other.state.x.x, other.state.x.y, other.state.e.psi]
+            if circles_collide(np.array(this_pose), np.array(other_pose), body):
+                expected.add((this.vehicle_id, other.vehicle_id))
+
+    assert expected
+    assert observer.crashed_pairs == expected
+
+def make_scenarios():
+    return make_sweep(seeds=[1, 3], spawn_entering=[2], spawn_exiting=[2], spawn_interval_mean=[3], blocked_spots=[[]], max_simulation_time=60)
+
+def without_wall_time(row):
+    return {key: value for key, value in row.items() if key != 'wall_time'}
+
+def test_run_scenario_without_dataset(parking_lot):
+    row = run_scenario(make_scenarios()[0])
+
+    assert row['seed'] == 1 and row['blocked_spots'] == ''
+    assert row['num_vehicles'] == 4 and row['completed'] == 4
+    assert row['crashes'] == 0 and row['deadlocks'] == 0
+    assert row['mean_time_to_park'] > 0
+
+def test_seeded_runs_do_not_depend_on_worker_or_order(parking_lot):
+    scenarios = make_scenarios()
+
+    serial = [without_wall_time(run_scenario(params)) for params in reversed(scenarios)][::-1]
+    pooled = [without_wall_time(row) for row in run_scenarios(scenarios, max_workers=2)]
+
+    assert [row['seed'] for row in pooled] == [1, 3]
+    assert pooled == serial
+    assert serial[0] != serial[1]
+
+def run_default_seed():
+    simulator = RuleBasedSimulator(params=SimulatorParams(spawn_entering=2, spawn_exiting=2, blocked_spots=[], max_simulation_time=40))
+    simulator.run()
+    return [(vehicle.spot_index, vehicle.state_hist.get('x'), vehicle.state_hist.get('y')) for vehicle in simulator.vehicles]
+
+def test_default_runs_are_reproducible_and_leave_global_state_alone(parking_lot):
+    np.random.seed(123)
+    global_state = np.random.get_state()
+
+    first, second = run_default_seed(), run_default_seed()
+
+    assert len(first) == len(second) == 4
+    for (spot, x, y), (other_spot, other_x, other_y) in zip(first, second):
+        assert spot == other_spot
+        assert np.array_equal(x, other_x) and np.array_equal(y, other_y)
+
+    after = np.random.get_state()
+    assert after[0] == global_state[0] and np.array_equal(after[1], global_state[1]) and after[2:] == global_state[2:]
@@ -0,0 +1,67 @@
+import numpy as np
+
+from parksim.route_planner.graph import Edge, Vertex, WaypointsGraph
+from parksim.route_planner.segment_index import SegmentIndex
+
+from conftest import make_waypoints_graph
+
+def linear_dist_to_graph(graph, point):
+    """
+    distance to the closest edge by checking every edge, as dist_to_graph did before the index
+    """
+    min_dist = np.inf
+    for e in graph.edges:
+        dist = graph._dist_to_edge(np.asarray(point, dtype=float), e)
+        if dist < min_dist:
+            min_dist = dist
+    return min_dist
+
+def random_graph(rng, num_edges):
+    graph = WaypointsGraph()
+    for _ in range(num_edges):
+        start = rng.uniform(-50, 50, 2)
+        v1, v2 = Vertex(start), Vertex(start + rng.uniform(-8, 8, 2))
+        e = Edge(v1, v2, v1.dist(v2))
+        v1.add_child(v2, e)
+        graph.vertices += [v1, v2]
+        graph.edges.append(e)
+    return graph
+
+def test_dist_to_graph_matches_edge_loop():
+    rng = np.random.default_rng(0)
+    for graph in [random_graph(rng, 150), make_waypoints_graph()]:
+        # points inside the lot, and far outside the grid
+        points = np.vstack([rng.uniform(-60, 60, (200, 2)), rng.uniform(-500, 500, (20, 2))])
+        expected = [linear_dist_to_graph(graph, p) for p in points]
+
+        assert np.allclose([graph.dist_to_graph(p) for p in points], expected)
+        assert np.allclose(graph.dist_to_graph_batch(points), expected)
+
+def test_points_on_the_graph():
+    graph = make_waypoints_graph()
+    for v in graph.vertices:
+        assert graph.dist_to_graph(v.coords) == 0
+    assert np.isclose(graph.dist_to_graph([1.0, 0.0]), 0)
+
+def test_large_batches_use_the_grid():
+    rng = np.random.default_rng(1)
+    v1 = rng.uniform(-200, 200, (2000, 2))
+    v2 = v1 + rng.uniform(-5, 5, (2000, 2))
+    index = SegmentIndex(v1, v2)
+
+    points = rng.uniform(-250, 250, (600, 2))
+    graph = WaypointsGraph()
+    graph.edges = [Edge(Vertex(a), Vertex(b), 0) for a, b in zip(v1, v2)]
+    expected = [linear_dist_to_graph(graph, p) for p in points[:50]]
+
+    assert np.allclose(index.query_batch(points)[:50], expected)
+
+def test_zero_length_segment_is_a_point():
+    index = SegmentIndex(np.array([[0.0, 0.0], [5.0, 5.0]]), np.array([[3.0, 0.0], [5.0, 5.0]]))
+    assert np.isclose(index.query([5.5, 5.5]), np.hypot(0.5, 0.5))
+    assert np.isclose(index.query_batch(np.array([[5.5, 5.5], [1.0, 1.0]]))[0], np.hypot(0.5, 0.5))
+
+def test_empty_graph():
+    graph = WaypointsGraph()
+    assert graph.dist_to_graph([0, 0]) == np.inf
+    assert np.all(np.isinf(graph.dist_to_graph_batch(np.zeros((3, 2)))))
@@ -0,0 +1,47 @@
+import numpy as np
+
+from parksim.agents.rule_based_stanley_vehicle import RuleBasedStanleyVehicle
+from parksim.simulator.rule_based_simulator import RuleBasedSimulator
+from parksim.simulator_types import SimulatorParams
+from parksim.utils.spatial_grid import SpatialGrid
+
+def test_query_matches_brute_force():
+    rng = np.random.default_rng(0)
+    x, y = rng.uniform(-40, 40, 300), rng.uniform(-40, 40, 300)
+    ids = list(range(100, 400))
+    grid = SpatialGrid(cell_size=5.0)
+    grid.build(ids, x, y)
+
+    for qx, qy, radius in zip(rng.uniform(-45, 45, 50), rng.uniform(-45, 45, 50), rng.uniform(0.5, 12, 50)):
+        candidates = grid.query(qx, qy, radius)
+        within = {id for id, px, py in zip(ids, x, y) if np.hypot(px - qx, py - qy) < radius}
+
+        assert len(candidates) == len(set(candidates))
+        assert within <= set(candidates)
+        assert {id for id in candidates if np.hypot(x[id - 100] - qx, y[id - 100] - qy) < radius} == within
+
+def test_points_on_cell_borders():
+    grid = SpatialGrid(cell_size=2.0)
+    grid.build([0, 1, 2], [0.0, 2.0, -2.0], [2.0, 0.0, -2.0])
+
+    assert set(grid.query(0.0, 0.0, 2.0)) == {0, 1, 2}
+    assert grid.query(10.0, 10.0, 1.0) == []
+
+def test_nearby_vehicles_match_all_pairs(parking_lot, monkeypatch):
+    checks = []
+    update_nearby_vehicles = RuleBasedStanleyVehicle.update_nearby_vehicles
+
+    def compare(vehicle, radius=None):
+        query, vehicle.method_to_query_neighbors = vehicle.method_to_query_neighbors, None
+        update_nearby_vehicles(vehicle, radius)
+        expected = set(vehicle.nearby_vehicles)
+        vehicle.method_to_query_neighbors = query
+
+        update_nearby_vehicles(vehicle, radius)
+        assert vehicle.nearby_vehicles == expected
+        checks.append(len(expected))
+
+    monkeypatch.setattr(RuleBasedStanleyVehicle, 'update_nearby_vehicles', compare)
+    RuleBasedSimulator(params=SimulatorParams(spawn_entering=3, spawn_exiting=3, spawn_interval_mean=1, blocked_spots=[], max_simulation_time=30, seed=4)).run()
+
+    assert any(checks)
@@ -0,0 +1,102 @@
+import bisect
+import math
+
+import numpy as np
+
+from parksim.utils.spline import Spline, Spline2D, calc_spline_course
+
+class ReferenceSpline(object):
+    """
+    cubic spline with a dense solve and one bisect per sample, as Spline did before
+    """
+    def __init__(self, x, y):
+        self.x = list(x)
+        self.nx = len(x)
+        h = np.diff(x)
+        self.a = list(y)
+
+        A = np.zeros((self.nx, self.nx))
+        A[0, 0] = 1.0
+        for i in range(self.nx - 1):
+            if i != (self.nx - 2):
+                A[i + 1, i + 1] = 2.0 * (h[i] + h[i + 1])
+            A[i + 1, i] = h[i]
+            A[i, i + 1] = h[i]
+        A[0, 1] = 0.0
+        A[self.nx - 1, self.nx - 2] = 0.0
+        A[self.nx - 1, self.nx - 1] = 1.0
+
+        B = np.zeros(self.nx)
+        for i in range(self.nx - 2):
+            B[i + 1] = 3.0 * (self.a[i + 2] - self.a[i + 1]) / h[i + 1] - 3.0 * (self.a[i + 1] - self.a[i]) / h[i]
+        self.c = np.linalg.solve(A, B)
+
+        self.b, self.d = [], []
+        for i in range(self.nx - 1):
+            self.d.append((self.c[i + 1] - self.c[i]) / (3.0 * h[i]))
+            self.b.append((self.a[i + 1] - self.a[i]) / h[i] - h[i] * (self.c[i + 1] + 2.0 * self.c[i]) / 3.0)
+
+    def calc(self, t, order=0):
+        if t < self.x[0] or t > self.x[-1]:
+            return None
+        i = bisect.bisect(self.x, t) - 1
+        dx = t - self.x[i]
+        if order == 0:
+            return self.a[i] + self.b[i] * dx + self.c[i] * dx ** 2.0 + self.d[i] * dx ** 3.0
+        if order == 1:
+            return self.b[i] + 2.0 * self.c[i] * dx + 3.0 * self.d[i] * dx ** 2.0
+        return 2.0 * self.c[i] + 6.0 * self.d[i] * dx
+
+def reference_course(x, y, ds=0.1):
+    dist = np.hypot(np.diff(x), np.diff(y))
+    s_knots = [0] + list(np.cumsum(dist))
+    sx, sy = ReferenceSpline(s_knots, x), ReferenceSpline(s_knots, y)
+
+    rx, ry, ryaw, rk = [], [], [], []
+    for s in np.arange(0, s_knots[-1], ds):
+        dx, dy = sx.calc(s, 1), sy.calc(s, 1)
+        ddx, ddy = sx.calc(s, 2), sy.calc(s, 2)
+        rx.append(sx.calc(s))
+        ry.append(sy.calc(s))
+        ryaw.append(math.atan2(dy, dx))
+        rk.append((ddy * dx - ddx * dy) / ((dx ** 2 + dy ** 2)**(3 / 2)))
+    return rx, ry, ryaw, rk
+
+def random_course(rng, num):
+    steps = rng.uniform(0.5, 4.0, num)
+    headings = np.cumsum(rng.uniform(-0.6, 0.6, num))
+    return np.cumsum(steps * np.cos(headings)), np.cumsum(steps * np.sin(headings))
+
+def test_course_matches_reference():
+    rng = np.random.default_rng(0)
+    for num in [3, 5, 20, 60]:
+        x, y = random_course(rng, num)
+        expected = reference_course(x, y)
+        result = calc_spline_course(x, y)
+
+        assert len(result[0]) == len(expected[0])
+        for a, b in zip(result[:4], expected):
+            assert np.allclose(a, b, rtol=1e-9, atol=1e-9)
+
+def test_scalar_and_array_samples_match_reference():
+    rng = np.random.default_rng(1)
+    knots = np.cumsum(rng.uniform(0.5, 2.0, 12))
+    values = rng.normal(size=12)
+    spline, expected = Spline(knots, values), ReferenceSpline(knots, values)
+
+    # inside the knots, on the knots and outside
+    t = np.concatenate([rng.uniform(knots[0], knots[-1], 50), knots[:-1], [knots[0] - 1, knots[-1] + 1]])
+    for order, calc in enumerate([spline.calc, spline.calcd, spline.calcdd]):
+        reference = [expected.calc(ti, order) for ti in t]
+        for ti, e in zip(t, reference):
+            assert (calc(ti) is None) if e is None else np.isclose(calc(ti), e)
+        assert np.allclose(calc(t), [np.nan if e is None else e for e in reference], equal_nan=True)
+
+    # the last knot is part of the last segment. Spline used to index past its coefficients there
+    assert np.isclose(spline.calc(knots[-1]), values[-1])
+
+def test_spline2d_yaw_of_a_straight_line():
+    sp = Spline2D([0.0, 1.0, 2.0, 3.0], [0.0, 1.0, 2.0, 3.0])
+    assert np.isclose(sp.calc_yaw(1.0), np.pi / 4)
+    assert np.allclose(sp.calc_yaw(np.array([0.5, 2.5])), np.pi / 4)
+    assert np.allclose(sp.calc_curvature(np.array([0.5, 2.5])), 0)
@@ -0,0 +1,164 @@
+import numpy as np
+
+from parksim.controller.stanley_controller import StanleyController
+from parksim.controller.batch_stanley_controller import BatchStanleyController
+from parksim.pytypes import VehicleState
+from parksim.utils.spline import calc_spline_course
+
+def make_path(xs, ys):
+    cx, cy, cyaw, _, _ = calc_spline_course(np.array(xs, dtype=float), np.array(ys, dtype=float), ds=0.1)
+    return cx, cy, cyaw
+
+def make_state(x, y, psi, v=0.0):
+    state = VehicleState()
+    state.x.x = x
+    state.x.y = y
+    state.e.psi = psi
+    state.v.v = v
+    return state
+
+def full_search(controller, state):
+    """
+    nearest waypoint to the front axle over the whole path, as before the windowed search
+    """
+    fx = state.x.x + controller.L * np.cos(state.e.psi)
+    fy = state.x.y + controller.L * np.sin(state.e.psi)
+    return int(np.argmin(np.hypot(fx - controller.x_ref, fy - controller.y_ref)))
+
+def count_full_scans(controller):
+    calls = []
+    search = controller._search_nearest
+    def counting(fx, fy, start, end):
+        if start == 0 and end == len(controller.x_ref):
+            calls.append((start, end))
+        return search(fx, fy, start, end)
+    controller._search_nearest = counting
+    return calls
+
+def test_stopped_vehicle_stays_in_window():
+    cx, cy, cyaw = make_path([0, 20, 40, 60], [0, 5, 0, 5])
+    controller = StanleyController()
+    full_scans = count_full_scans(controller)
+
+    # stopped with its front axle at its own target waypoint, in the middle of the path
+    target_idx = 300
+    psi = cyaw[target_idx]
+    state = make_state(cx[target_idx] - controller.L * np.cos(psi), cy[target_idx] - controller.L * np.sin(psi), psi)
+
+    for _ in range(20):
+        controller.set_ref_pose(cx, cy, cyaw)
+        controller.set_ref_v(0)
+        controller.set_target_idx(target_idx)
+        _, _, target_idx = controller.solve(state, braking=True)
+
+    assert target_idx == 300
+    assert full_scans == []
+
+def test_set_ref_pose_resets_target_idx():
+    cx, cy, cyaw = make_path([0, 20, 40], [0, 5, 0])
+    controller = StanleyController()
+    controller.set_ref_pose(cx, cy, cyaw)
+    controller.set_target_idx(350)
+
+    # Another vehicle on the same (shared) path
+    controller.set_ref_pose(cx, cy, cyaw)
+    assert controller.target_idx is None
+    # the search starts from the beginning of the path, not from the other vehicle's index
+    assert controller.calc_target_index(make_state(cx[0] - 2.7, cy[0], cyaw[0]))[0] < 10
+
+def test_matches_full_search_on_simple_path():
+    cx, cy, cyaw = make_path([0, 15, 30, 45, 60], [0, 6, -4, 3, 0])
+    controller = StanleyController()
+    state = make_state(cx[0] + 0.3, cy[0] + 0.5, cyaw[0])
+    target_idx = 0
+
+    for step in range(300):
+        controller.set_ref_pose(cx, cy, cyaw)
+        controller.set_ref_v(5 if step < 100 else 0)
+        controller.set_target_idx(target_idx)
+        assert controller.calc_target_index(state)[0] == full_search(controller, state)
+
+        a, d, target_idx = controller.solve(state, braking=step % 50 > 40)
+        controller.step(state, a, d)
+
+def test_keeps_tracking_current_segment_of_hairpin():
+    # The path turns back and passes 3 m from its first straight
+    x_out = np.arange(0, 30, 0.1)
+    theta = np.linspace(-np.pi / 2, np.pi / 2, 48)
+    x_turn = 30 + 1.5 * np.cos(theta)
+    y_turn = 1.5 + 1.5 * np.sin(theta)
+    x_back = np.arange(30, 0, -0.1)
+    cx = np.concatenate([x_out, x_turn, x_back])
+    cy = np.concatenate([np.zeros_like(x_out), y_turn, np.full_like(x_back, 3.0)])
+    cyaw = np.concatenate([np.zeros_like(x_out), theta + np.pi / 2, np.full_like(x_back, np.pi)])
+
+    controller = StanleyController()
+    controller.set_ref_pose(cx, cy, cyaw)
+    controller.set_target_idx(100)
+
+    # Drifted 2 m to the left of the first straight: the way back is closer to the front axle
+    state = make_state(10 - controller.L, 2.0, 0.0)
+    assert cx[full_search(controller, state)] < 25 and full_search(controller, state) > len(x_out)
+
+    # The windowed search stays on the first straight, where the vehicle is driving
+    target_idx, _ = controller.calc_target_index(state)
+    assert target_idx < len(x_out)
+    assert abs(cx[target_idx] - 10) < 0.2
+
+def test_batch_matches_scalar():
+    rng = np.random.default_rng(0)
+    paths = [make_path(np.cumsum(rng.uniform(5, 15, 5)), rng.uniform(-5, 5, 5)) for _ in range(6)]
+    scalar = StanleyController()
+    batch = BatchStanleyController()
+
+    states = [make_state(p[0][0], p[1][0] + 0.5, p[2][0]) for p in paths]
+    target_idx = [0] * len(paths)
+
+    for step in range(200):
+        braking = np.array([step % 30 > 25] * len(paths))
+        batch.set_ref_pose([p[0] for p in paths], [p[1] for p in paths], [p[2] for p in paths])
+        batch.set_ref_v([5.0] * len(paths))
+        batch.set_target_idx(target_idx)
+        x = np.array([s.x.x for s in states])
+        y = np.array([s.x.y for s in states])
+        psi = np.array([s.e.psi for s in states])
+        v = np.array([s.v.v for s in states])
+        a_batch, d_batch, idx_batch = batch.solve(x, y, psi, v, braking)
+
+        for i, (path, state) in enumerate(zip(paths, states)):
+            scalar.set_ref_pose(*path)
+            scalar.set_ref_v(5.0)
+            scalar.set_target_idx(target_idx[i])
+            a, d, idx = scalar.solve(state, braking[i])
+
+            assert idx == idx_batch[i]
+            assert np.isclose(a, a_batch[i]) and np.isclose(d, d_batch[i])
+
+            scalar.step(state, a, d)
+            target_idx[i] = idx
+
+def test_batch_window_matches_full_search():
+    rng = np.random.default_rng(3)
+    paths = [make_path(np.cumsum(rng.uniform(5, 15, 6)), rng.uniform(-5, 5, 6)) for _ in range(8)]
+    scalar = StanleyController()
+    batch = BatchStanleyController()
+    batch.set_ref_pose([p[0] for p in paths], [p[1] for p in paths], [p[2] for p in paths])
+
+    for _ in range(50):
+        # random poses near random points of the paths, with random last target indices
+        last_idx = np.array([rng.integers(len(p[0])) for p in paths])
+        near = np.array([rng.integers(len(p[0])) for p in paths])
+        x = np.array([p[0][k] for p, k in zip(paths, near)]) + rng.uniform(-2, 2, len(paths))
+        y = np.array([p[1][k] for p, k in zip(paths, near)]) + rng.uniform(-2, 2, len(paths))
+        psi = np.array([p[2][k] for p, k in zip(paths, near)])
+
+        batch.set_target_idx(last_idx)
+        target_idx, _ = batch.calc_target_index(x, y, psi)
+
+        for i, path in enumerate(paths):
+            scalar.set_ref_pose(*path)
+            scalar.set_target_idx(last_idx[i])
+            state = make_state(x[i], y[i], psi[i])
+            assert target_idx[i] == scalar.calc_target_index(state)[0]
+            if abs(near[i] - last_idx[i]) < scalar.search_window // 2:
+                assert target_idx[i] == full_search(scalar, state)
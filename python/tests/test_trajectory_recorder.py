@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from parksim.pytypes import VehicleState
+from parksim.utils.trajectory_recorder import TASK_CODES, TrajectoryRecorder
+
+def random_state(rng):
+    state = VehicleState()
+    state.x.x, state.x.y = rng.uniform(-50, 50, 2).tolist()
+    state.e.psi = float(rng.uniform(-np.pi, np.pi))
+    state.v.v = float(rng.uniform(0, 5))
+    state.u.u_a, state.u.u_steer = rng.uniform(-1, 1, 2).tolist()
+    return state
+
+def record_both(recorder, num, seed=0):
+    """
+    record the same states into the recorder and into a list of copies, like state_hist did before
+    """
+    rng = np.random.default_rng(seed)
+    tasks = list(TASK_CODES) + [None]
+    copies, rows = [], []
+    state = VehicleState()
+    for k in range(num):
+        # the recorder must copy, the state object is reused
+        new_state = random_state(rng)
+        state.x, state.e, state.v, state.u = new_state.x, new_state.e, new_state.v, new_state.u
+        task, braking = tasks[k % len(tasks)], k % 4 == 0
+
+        recorder.record(0.1 * k, state, task, braking)
+        copy = state.copy()
+        copy.t = 0.1 * k
+        copies.append(copy)
+        rows.append((task, braking))
+    return copies, rows
+
+@pytest.mark.parametrize('chunk_size, max_length', [(1024, 0), (3, 0), (4, 10), (16, 10)])
+def test_matches_list_of_copies(chunk_size, max_length):
+    recorder = TrajectoryRecorder(chunk_size=chunk_size, max_length=max_length)
+    copies, rows = record_both(recorder, 37)
+    if max_length > 0:
+        copies, rows = copies[-max_length:], rows[-max_length:]
+
+    assert len(recorder) == len(copies)
+    assert np.array_equal(recorder.get('x'), [s.x.x for s in copies])
+    assert np.array_equal(recorder.get('y'), [s.x.y for s in copies])
+    assert np.array_equal(recorder.get('psi'), [s.e.psi for s in copies])
+    assert np.array_equal(recorder.get('v'), [s.v.v for s in copies])
+    assert np.array_equal(recorder.get('u_steer'), [s.u.u_steer for s in copies])
+    assert np.allclose(recorder.get('t'), [s.t for s in copies])
+    assert list(recorder.get('task')) == [TASK_CODES.get(task, -1) for task, _ in rows]
+    assert list(recorder.get('braking')) == [braking for _, braking in rows]
+
+    assert [recorder[i] for i in range(len(recorder))] == copies
+    assert recorder[-1] == copies[-1]
+    with pytest.raises(IndexError):
+        recorder[len(copies)]
+
+def test_npz_round_trip(tmp_path):
+    recorder = TrajectoryRecorder(chunk_size=8, max_length=20)
+    record_both(recorder, 30)
+
+    recorder.to_npz(tmp_path / 'hist.npz')
+    with np.load(tmp_path / 'hist.npz') as data:
+        for name, column in recorder.to_dict().items():
+            assert np.array_equal(data[name], column)
+            assert data[name].dtype == column.dtype
+
+def test_clear():
+    recorder = TrajectoryRecorder(chunk_size=4, max_length=6)
+    record_both(recorder, 9)
+    recorder.clear()
+    assert len(recorder) == 0 and len(recorder.get('x')) == 0
+
+    copies, _ = record_both(recorder, 3, seed=1)
+    assert recorder.to_states() == copies